@@ -0,0 +1,104 @@
+"""Задержка маленьких отчётов под смешанной нагрузкой: общая очередь против маршрутизации.
+
+Ставит heavy тяжёлых детальных отчётов и small маленьких сводок (каждый с уникальным
+диапазоном, чтобы не попасть в кэш), ждёт завершения сводок и печатает
+p50/p95 от создания задачи до готовности. Воркеры должны быть запущены
+по топологии из src/tasks/celery_app.py.
+
+Запуск:
+    python scripts/bench_queue_latency.py manager@example.com 20 50
+    python scripts/bench_queue_latency.py manager@example.com 20 50 --single-queue
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+from src.database import async_session_maker_null_pооl
+from src.init import redis_manager
+from src.services.report import ReportServiceS
+from src.tasks.celery_app import REPORTS_FAST_QUEUE
+from src.tasks.report import ReportService
+from src.utils.db_manager import DBManager
+
+HEAVY_REPORT = "sales_by_products"
+SMALL_REPORT = "daily_sales_summary"
+HEAVY_RANGE_DAYS = 730
+POLL_SECONDS = 0.5
+TIMEOUT_SECONDS = 1800
+
+
+async def submit(db, user_id, heavy: int, small: int) -> list:
+    service = ReportServiceS(db)
+    for i in range(heavy):
+        await service.generate_report_task(
+            user_id,
+            HEAVY_REPORT,
+            {
+                "date_from": str(date.today() - timedelta(days=HEAVY_RANGE_DAYS + i)),
+                "date_to": str(date.today() - timedelta(days=i)),
+            },
+        )
+    small_ids = []
+    for i in range(small):
+        day = date.today() - timedelta(days=30 + i)
+        task, _ = await service.generate_report_task(
+            user_id,
+            SMALL_REPORT,
+            {"date_from": str(day - timedelta(days=6)), "date_to": str(day)},
+        )
+        small_ids.append(task.id)
+    return small_ids
+
+
+async def wait_latencies(db, task_ids) -> list[float]:
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        tasks = [await db.report_task.get_one_or_none(id=id) for id in task_ids]
+        if all(task.status != "pending" for task in tasks):
+            return [
+                (task.finished_at - task.created_at).total_seconds()
+                for task in tasks
+                if task.finished_at
+            ]
+        await db.session.rollback()
+        await asyncio.sleep(POLL_SECONDS)
+    raise TimeoutError("Маленькие отчёты не завершились за отведённое время")
+
+
+async def main(email: str, heavy: int, small: int, single_queue: bool):
+    if single_queue:
+        # всё в одну очередь — поведение до маршрутизации
+        ReportService.report_route = lambda self, *args: (REPORTS_FAST_QUEUE, 5)
+
+    await redis_manager.connect()
+    async with DBManager(session_factory=async_session_maker_null_pооl) as db:
+        user = await db.user.get_one_or_none(email=email)
+        small_ids = await submit(db, user.id, heavy, small)
+        latencies = sorted(await wait_latencies(db, small_ids))
+    await redis_manager.close()
+
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    mode = "single queue" if single_queue else "routed"
+    print(
+        f"{mode}: {len(latencies)} small reports, "
+        f"p50={statistics.median(latencies):.2f}s p95={p95:.2f}s max={latencies[-1]:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            sys.argv[1],
+            int(sys.argv[2]),
+            int(sys.argv[3]),
+            "--single-queue" in sys.argv,
+        )
+    )
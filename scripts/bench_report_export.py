@@ -0,0 +1,92 @@
+"""Сравнение Python-выгрузки и COPY-выгрузки детального отчёта.
+
+Запуск:
+    python scripts/bench_report_export.py sales_by_products 2022-01-01 2026-01-31
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import asyncio
+import csv
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, select
+
+from src.database import async_session_maker_null_pооl
+from src.tasks.report import ReportService
+from src.utils.db_manager import DBManager
+from src.utils.report_serializer import build_column_plan
+from src.utils.report_writer import CsvReportWriter
+
+
+def normalize(value: str) -> str:
+    try:
+        return str(Decimal(value).quantize(Decimal("0.01")))
+    except InvalidOperation:
+        return value
+
+
+def read_rows(file_path: str):
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = next(reader)
+        return header, [[normalize(v) for v in row] for row in reader]
+
+
+async def run_python(service, config, query, file_path):
+    plan = build_column_plan(config["row_schema"], list(query.selected_columns.keys()))
+    writer = CsvReportWriter(file_path, plan)
+    return await service._save_report(writer, config["repository"].stream(query))
+
+
+async def run_copy(service, config, query, file_path):
+    return await service._copy_report_to_csv(file_path, config["repository"], query)
+
+
+async def measure(name, runner, service, config, query):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    file_path = f"report/bench_{name}.csv"
+    await runner(service, config, query, file_path)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    size = os.path.getsize(file_path)
+    print(f"{name:>7}: wall={wall:.3f}s cpu={cpu:.3f}s size={size} bytes")
+    return file_path, cpu
+
+
+async def main(report_name: str, date_from: str, date_to: str):
+    async with DBManager(session_factory=async_session_maker_null_pооl) as db:
+        os.makedirs("report", exist_ok=True)
+        service = ReportService(db)
+        config = service.report_config[report_name]
+        params = config["param_model"](date_from=date_from, date_to=date_to)
+        query = config["query_method"](**params.model_dump())
+
+        rows = await db.session.scalar(
+            select(func.count()).select_from(query.subquery())
+        )
+        if not rows:
+            print("Нет данных за период")
+            return
+        print(f"{report_name}: {rows} rows")
+
+        python_file, python_cpu = await measure(
+            "python", run_python, service, config, query
+        )
+        copy_file, copy_cpu = await measure("copy", run_copy, service, config, query)
+
+    same = read_rows(python_file) == read_rows(copy_file)
+    print(f"cpu speedup: x{python_cpu / max(copy_cpu, 1e-6):.1f}, same output: {same}")
+    os.remove(python_file)
+    os.remove(copy_file)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*sys.argv[1:4]))
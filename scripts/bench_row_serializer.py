@@ -0,0 +1,97 @@
+"""Сериализация строк отчёта: прежний цикл format_row против плана колонок.
+
+Запуск:
+    python scripts/bench_row_serializer.py 200000
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import csv
+import io
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from src.schemas.report.sales_by_product_category_daily import SalesByProductDaily
+from src.utils.report_serializer import INT_COLUMNS, ROUND_COLUMNS, build_column_plan
+
+COLUMNS = [
+    "order_date",
+    "product_id",
+    "product_name",
+    "total_quantity",
+    "total_amount",
+    "total_orders",
+    "total_payments",
+]
+BATCH_SIZE = 5000
+
+
+def format_row(columns: list[str], row) -> list:
+    """Прежняя построчная обработка (до плана колонок)"""
+    values = []
+    for key, value in zip(columns, row):
+        if isinstance(value, (int, float, Decimal)):
+            if key in ROUND_COLUMNS:
+                value = round(float(value), 2)
+            elif key in INT_COLUMNS:
+                value = int(value)
+        values.append(value)
+    return values
+
+
+def make_rows(count: int) -> list[tuple]:
+    start = date(2024, 1, 1)
+    return [
+        (
+            start + timedelta(days=i % 365),
+            i % 1000,
+            f"Товар {i % 1000}",
+            random.randint(1, 500),
+            Decimal(random.randint(100, 10_000_000)) / 1000,
+            random.randint(1, 100),
+            Decimal(random.randint(100, 10_000_000)) / 1000,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(name: str, write_batch, batches) -> float:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    started = time.perf_counter()
+    for batch in batches:
+        write_batch(writer, batch)
+    elapsed = time.perf_counter() - started
+    rows = sum(len(batch) for batch in batches)
+    print(f"{name:>8}: {elapsed:.3f}s, {rows / elapsed:,.0f} rows/s")
+    return elapsed
+
+
+def main(count: int):
+    rows = make_rows(count)
+    batches = [rows[i : i + BATCH_SIZE] for i in range(0, count, BATCH_SIZE)]
+    plan = build_column_plan(SalesByProductDaily, COLUMNS)
+
+    before = measure(
+        "before",
+        lambda writer, batch: writer.writerows(
+            format_row(COLUMNS, row) for row in batch
+        ),
+        batches,
+    )
+    after = measure(
+        "after",
+        lambda writer, batch: writer.writerows(plan.format_batch(batch)),
+        batches,
+    )
+    print(f"speedup: x{before / after:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,111 @@
+"""Пачка отчётов на одном представлении: отдельные сканирования против общего.
+
+Генерирует count случайных отчётов четырёх типов на mv_sales_by_product_category_daily
+с пересекающимися диапазонами (как при всплеске заявок), строит их по очереди
+и одним общим сканированием, печатает число сканирований и отчётов в секунду.
+
+Запуск:
+    python scripts/bench_shared_scan.py 2025-01-01 2025-03-31 40
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from src.database import async_session_maker_null_pооl
+from src.init import redis_manager
+from src.tasks.report import ReportService
+from src.utils.db_manager import DBManager
+
+REPORTS = [
+    "sales_by_products",
+    "sales_by_products_summary",
+    "sales_by_categories",
+    "sales_by_categories_summary",
+]
+MAX_RANGE_DAYS = 31
+
+
+def random_items(service, date_from: date, date_to: date, count: int) -> list:
+    random.seed(42)
+    span = (date_to - date_from).days
+    items = []
+    for _ in range(count):
+        report_name = random.choice(REPORTS)
+        config = service.report_config[report_name]
+        start = date_from + timedelta(days=random.randint(0, span))
+        end = min(start + timedelta(days=random.randint(0, MAX_RANGE_DAYS)), date_to)
+        params = config["param_model"](
+            date_from=start, date_to=end, top=random.choice([None, 10, 100])
+        )
+        items.append((uuid.uuid4(), config, params, "csv", None))
+    return items
+
+
+async def run_separately(service, items) -> list:
+    results = []
+    for task_id, config, params, output_format, _ in items:
+        file_path, compression = service._report_file(task_id, output_format)
+        rows = await service._export_query(
+            file_path,
+            config["repository"],
+            config["query_method"](**params.model_dump()),
+            config["is_summary"],
+            output_format,
+            compression,
+            config["row_schema"],
+        )
+        results.append((file_path, rows))
+    return results
+
+
+async def main(date_from: str, date_to: str, count: int):
+    await redis_manager.connect()
+    async with DBManager(session_factory=async_session_maker_null_pооl) as db:
+        service = ReportService(db)
+        items = random_items(
+            service, date.fromisoformat(date_from), date.fromisoformat(date_to), count
+        )
+
+        started = time.perf_counter()
+        separate = await run_separately(service, items)
+        elapsed = time.perf_counter() - started
+        print(
+            f"separate: scans={count} seconds={elapsed:.3f} "
+            f"reports_per_sec={count / elapsed:.1f}"
+        )
+
+        started = time.perf_counter()
+        shared = await service._shared_scan(items)
+        elapsed = time.perf_counter() - started
+        print(
+            f"  shared: scans=1 seconds={elapsed:.3f} "
+            f"reports_per_sec={count / elapsed:.1f}"
+        )
+
+    mismatched = 0
+    for (file_path, rows), result in zip(separate, shared):
+        if isinstance(result, BaseException):
+            print(f"shared scan failed: {result!r}")
+            mismatched += 1
+            continue
+        shared_rows = result[1].rows if result[0] else 0
+        mismatched += rows != shared_rows
+        for path in (file_path, result[0]):
+            if path and os.path.exists(path):
+                os.remove(path)
+    print(f"row count mismatches: {mismatched}")
+    await redis_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1], sys.argv[2], int(sys.argv[3])))
@@ -0,0 +1,69 @@
+"""Накладные расходы на задачу: asyncio.run + NullPool против loop и пула воркера.
+
+Запуск:
+    python scripts/bench_task_overhead.py 200
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from src.database import async_session_maker_null_pооl
+from src.tasks.worker import worker_runtime
+from src.utils.db_manager import DBManager
+
+DATE_FROM = date(2024, 1, 1)
+DATE_TO = date(2024, 1, 31)
+
+
+async def small_summary_report(session_factory):
+    """Тот же путь, что и у задачи: сессия, запрос сводного отчёта, чтение строк"""
+    async with DBManager(session_factory=session_factory) as db:
+        query = db.sales_daily.sales_summary_query(DATE_FROM, DATE_TO)
+        async for _ in db.sales_daily.stream(query):
+            pass
+
+
+def measure(name: str, run_task, runs: int):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_task()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:>8}: mean={statistics.mean(timings):.2f}ms "
+        f"p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms"
+    )
+
+
+def main(runs: int):
+    measure(
+        "before",
+        lambda: asyncio.run(small_summary_report(async_session_maker_null_pооl)),
+        runs,
+    )
+
+    worker_runtime.start()
+    try:
+        measure(
+            "after",
+            lambda: worker_runtime.run(
+                small_summary_report(worker_runtime.session_maker)
+            ),
+            runs,
+        )
+    finally:
+        worker_runtime.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -1,9 +1,22 @@
-from fastapi import APIRouter, Request
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Query, Request
 from services.admin import AdminService
 from services.audit import AuditService
 from schemas.auth.user import UserRoleUpdate, UserRoleUpdateConfirm
+from schemas.report.report_task import (
+    RefreshSchedulerStats,
+    ReportTemplateStats,
+    ViewRefreshStats,
+)
 from schemas.security.audit import AuditLogCreate, AuditAction
 from src.api.dependencies import DBDep, get_current_active_admin_Dep
+from src.repositories.report.report_aggregate import (
+    DAILY_AGGREGATES,
+    ROLLUP_AGGREGATES,
+)
+from src.utils.refresh_scheduler import get_refresh_decisions, get_scheduler_state
+from src.utils.view_refresh import get_view_refresh
 
 
 router = APIRouter(prefix="/admin", tags=["Администрирование"])
@@ -134,3 +147,54 @@ async def confirm_user_role_update(
     )
 
     return result
+
+
+@router.get(
+    "/reports/stats",
+    summary="Длительность генерации отчётов по шаблонам",
+    description="""Агрегирует телеметрию задач за последние days дней по каждому шаблону:
+p50/p95 длительности выполнения, p95 ожидания в очереди, средние строки и размер файла.
+
+Шаблоны отсортированы по убыванию p95 — самые медленные отчёты сверху.""",
+    response_model=list[ReportTemplateStats],
+    responses={
+        200: {"description": "Статистика по шаблонам"},
+        403: {"description": "Недостаточно прав"},
+    },
+)
+async def report_stats(
+    current_user: get_current_active_admin_Dep,
+    db: DBDep,
+    days: int = Query(7, ge=1, le=365),
+):
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = await db.report_task.duration_stats(since)
+    return [ReportTemplateStats.model_validate(dict(row)) for row in rows]
+
+
+@router.get(
+    "/reports/refresh",
+    summary="Состояние обновления агрегатов",
+    description="""Метрики адаптивного обновления дневных агрегатов и свёрток:
+накопленные с прошлого обновления записи, устаревание данных, счётчики решений
+планировщика по причинам и длительность последнего обновления каждого представления.""",
+    response_model=RefreshSchedulerStats,
+    responses={
+        200: {"description": "Состояние планировщика"},
+        403: {"description": "Недостаточно прав"},
+    },
+)
+async def refresh_stats(current_user: get_current_active_admin_Dep):
+    state = await get_scheduler_state()
+    views = [*DAILY_AGGREGATES, *ROLLUP_AGGREGATES]
+    return RefreshSchedulerStats(
+        checked_at=state.get("checked_at"),
+        refreshed_at=state.get("refreshed_at"),
+        pending_writes=int(state.get("pending_writes", 0)),
+        staleness_seconds=state.get("staleness_seconds", 0),
+        decisions=await get_refresh_decisions(),
+        views=[
+            ViewRefreshStats(view=view, **await get_view_refresh(view))
+            for view in views
+        ],
+    )
@@ -1,17 +1,27 @@
+import os
 import uuid
 from fastapi import APIRouter, Body, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 
 from api.dependencies import DBDep
 from exceptions import (
     ObjectIsNotExistsException,
     PermissionDeniedException,
+    ReportFileExpiredException,
     ReportIsNotReady,
+    ReportNotCancellableException,
+    ReportNotCancellableHTTPException,
     ReportParametersValidationException,
     ReportParametersValidationHTTPException,
+    ReportQuotaExceededException,
+    ReportQuotaExceededHTTPException,
+    ReportTooLargeException,
+    ReportTooLargeHTTPException,
     TempelateIsNotExistsException,
 )
 from schemas.report.report_task import ReportRequest, ReportTaskStatus
+from src.schemas.report.report_bundle import ReportBundleRequest, ReportBundleStatus
+from src.schemas.report.report_template import ReportTemplateInfo
 from schemas.security.audit import AuditLogCreate, AuditAction
 from services.report import ReportServiceS
 from services.audit import AuditService
@@ -21,6 +31,14 @@ from src.api.dependencies import (
     get_current_active_user_Dep,
 )
 from src.schemas.report.example import REPORT_EXAMPLES
+from src.utils.report_bundle import bundle_member_name, iter_zip
+from src.utils.report_compression import (
+    accepts_encoding,
+    file_compression,
+    iter_decompressed,
+)
+from src.utils.report_telemetry import get_progress
+from src.utils.report_writer import REPORT_WRITERS
 
 
 router = APIRouter(prefix="/report", tags=["Отчёты"])
@@ -33,6 +51,14 @@ router = APIRouter(prefix="/report", tags=["Отчёты"])
 
 Отчёт генерируется асинхронно через Celery и может занять некоторое время.
 После создания задачи используйте /status/{task_id} для проверки готовности.
+Если такой же отчёт по тем же данным уже построен, задача сразу получает статус ready.
+
+Перед постановкой в очередь отчёт оценивается по плану запроса (EXPLAIN):
+ожидаемые строки, объём файла и длительность возвращаются в поле estimate.
+Отчёты сверх лимитов отклоняются (422) либо уходят в очередь тяжёлых задач.
+
+Квоты на пользователя: частота заявок и число задач в работе (у admin выше).
+При превышении возвращается 429 с заголовком Retry-After.
 
 Доступные типы отчётов: /report/info
 
@@ -47,13 +73,25 @@ router = APIRouter(prefix="/report", tags=["Отчёты"])
                     "example": {
                         "task_id": "123e4567-e89b-12d3-a456-426614174000",
                         "status": "pending",
+                        "estimate": {
+                            "rows": 120000,
+                            "scanned_rows": 120000,
+                            "bytes": 9600000,
+                            "duration_ms": 600,
+                            "days": 365,
+                            "sharded": False,
+                            "queue": "reports_bulk",
+                        },
                     }
                 }
             },
         },
-        422: {"description": "Некорректные параметры отчёта"},
+        422: {
+            "description": "Некорректные параметры отчёта или отчёт превышает лимиты"
+        },
         403: {"description": "Недостаточно прав (требуется роль manager)"},
         404: {"description": "Шаблон отчёта не найден"},
+        429: {"description": "Превышена квота на генерацию отчётов"},
     },
 )
 async def generate_report(
@@ -67,16 +105,18 @@ async def generate_report(
         user_id=user.id,
         details={
             "report.template": request.report_name,
-            "report.format": request.format,
-            "client.ip": request.client.host,
-            "http.user_agent": request.headers.get("user-agent"),
+            "report.format": request.format.value,
+            "client.ip": http_request.client.host,
+            "http.user_agent": http_request.headers.get("user-agent"),
         },
     )
     try:
-        task = await ReportServiceS(db).generate_report_task(
+        task, estimate = await ReportServiceS(db).generate_report_task(
             user_id=user.id,
             report_name=request.report_name,
             parameters=request.parameters,
+            output_format=request.format,
+            role=user.role,
         )
 
         await AuditService(db).log(
@@ -88,6 +128,7 @@ async def generate_report(
                 new_values={
                     "report_name": request.report_name,
                     "parameters": request.parameters,
+                    "format": request.format.value,
                 },
                 ip_address=http_request.client.host,
                 user_agent=http_request.headers.get("user-agent"),
@@ -95,12 +136,16 @@ async def generate_report(
             )
         )
 
-        return {"task_id": task.id, "status": "pending"}
+        return {"task_id": task.id, "status": task.status, "estimate": estimate}
 
     except ValueError:
         raise TempelateIsNotExistsException
     except ReportParametersValidationException:
         raise ReportParametersValidationHTTPException
+    except ReportTooLargeException:
+        raise ReportTooLargeHTTPException
+    except ReportQuotaExceededException as exc:
+        raise ReportQuotaExceededHTTPException(exc.retry_after)
 
 
 @router.get(
@@ -112,6 +157,12 @@ async def generate_report(
 - pending - задача в очереди или выполняется
 - ready - отчёт готов к скачиванию
 - error - произошла ошибка
+- cancelled - задача отменена пользователем
+- timeout - запрос превысил statement_timeout шаблона
+
+Для выполняющейся задачи возвращается прогресс (сколько строк уже записано),
+для завершённой — телеметрия: ожидание в очереди, время запроса и записи,
+число строк и размер файла.
 
 Пользователь может проверять только свои задачи.
 Администраторы могут проверять любые задачи.
@@ -151,24 +202,42 @@ async def get_report_status(
         )
         raise PermissionDeniedException
 
-    status = task.status
-    file_path = task.result_file
-    error_message = task.error_message
+    progress = None
+    if task.status == "pending":
+        progress = await get_progress(str(task_id))
 
+    return _task_status(task, progress)
+
+
+def _task_status(task, progress=None) -> ReportTaskStatus:
     return ReportTaskStatus(
-        task_id=task_id,
-        status=status,
-        result_file=file_path,
-        error_message=error_message,
+        task_id=task.id,
+        status=task.status,
+        result_file=task.result_file,
+        error_message=task.error_message,
+        progress=progress,
+        started_at=task.started_at,
+        finished_at=task.finished_at,
+        queue_wait_ms=task.queue_wait_ms,
+        query_ms=task.query_ms,
+        write_ms=task.write_ms,
+        rows=task.rows,
+        bytes=task.bytes,
+        worker=task.worker,
+        data_generation=task.data_generation,
+        data_as_of=task.data_as_of,
     )
 
 
 @router.get(
     "/download/{task_id}",
     summary="Скачивание готового отчёта",
-    description="""Скачивает сгенерированный отчёт в формате CSV.
+    description="""Скачивает сгенерированный отчёт в запрошенном формате (CSV, Parquet или Arrow IPC).
 
 Отчёт должен иметь статус 'ready'.
+CSV хранится сжатым (gzip/zstd): клиентам с подходящим Accept-Encoding файл
+отдаётся как есть с заголовком Content-Encoding, остальным — распакованным на лету.
+Заголовки X-Data-Generation и X-Data-As-Of — поколение и время обновления данных отчёта.
 Пользователь может скачивать только свои отчёты.
 Администраторы могут скачивать любые отчёты.
 
@@ -177,9 +246,17 @@ async def get_report_status(
 - Попытки несанкционированного доступа фиксируются
 - Файлы хранятся вне web-root директории""",
     responses={
-        200: {"description": "CSV файл с отчётом", "content": {"text/csv": {}}},
+        200: {
+            "description": "Файл с отчётом",
+            "content": {
+                "text/csv": {},
+                "application/vnd.apache.parquet": {},
+                "application/vnd.apache.arrow.file": {},
+            },
+        },
         403: {"description": "Попытка скачать чужой отчёт"},
         404: {"description": "Отчёт не найден"},
+        410: {"description": "Файл отчёта вытеснен из хранилища"},
     },
 )
 async def download_report(
@@ -212,6 +289,9 @@ async def download_report(
     if task.status != "ready" or not task.result_file:
         raise ReportIsNotReady
 
+    if not os.path.exists(task.result_file):
+        raise ReportFileExpiredException
+
     await AuditService(db).log(
         AuditLogCreate(
             action=AuditAction.REPORT_DOWNLOAD,
@@ -224,8 +304,304 @@ async def download_report(
         )
     )
 
-    return FileResponse(
-        path=task.result_file, filename=f"report_{task_id}.csv", media_type="text/csv"
+    writer_class = REPORT_WRITERS[task.format]
+    filename = f"report_{task_id}.{writer_class.extension}"
+    encoding = file_compression(task.result_file)
+    headers = _data_headers(task)
+    if encoding is None:
+        return FileResponse(
+            path=task.result_file,
+            filename=filename,
+            media_type=writer_class.media_type,
+            headers=headers,
+        )
+
+    # сжатый артефакт отдаём как есть, если клиент его принимает
+    if accepts_encoding(request.headers.get("accept-encoding"), encoding):
+        return FileResponse(
+            path=task.result_file,
+            filename=filename,
+            media_type=writer_class.media_type,
+            headers={
+                **headers,
+                "Content-Encoding": encoding,
+                "Vary": "Accept-Encoding",
+            },
+        )
+    return StreamingResponse(
+        iter_decompressed(task.result_file),
+        media_type=writer_class.media_type,
+        headers={
+            **headers,
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Vary": "Accept-Encoding",
+        },
+    )
+
+
+def _data_headers(task) -> dict[str, str]:
+    """Поколение и свежесть данных, на которых построен отчёт"""
+    headers = {}
+    if task.data_generation is not None:
+        headers["X-Data-Generation"] = str(task.data_generation)
+    if task.data_as_of is not None:
+        headers["X-Data-As-Of"] = task.data_as_of.isoformat()
+    return headers
+
+
+@router.delete(
+    "/tasks/{task_id}",
+    summary="Отмена задачи на генерацию отчёта",
+    description="""Отменяет задачу в статусе pending.
+
+Задача в очереди снимается (сообщение Celery отзывается), у выполняющейся
+отменяется запрос в БД (pg_cancel_backend), а воркер удаляет недописанный файл.
+Задача получает статус cancelled.
+
+Пользователь может отменять только свои задачи.
+Администраторы могут отменять любые задачи.
+
+Действие записывается в аудит-лог.""",
+    responses={
+        200: {"description": "Задача отменена"},
+        403: {"description": "Попытка отменить чужую задачу"},
+        404: {"description": "Задача не найдена"},
+        409: {"description": "Задача уже завершена"},
+    },
+)
+async def cancel_report(
+    task_id: uuid.UUID,
+    db: DBDep,
+    current_user: get_current_active_user_Dep,
+    request: Request,
+):
+    task = await db.report_task.get_one_or_none(id=task_id)
+    if task is None:
+        raise ObjectIsNotExistsException
+
+    if task.user_id != current_user.id and current_user.role not in [
+        "admin",
+        "superadmin",
+    ]:
+        await AuditService(db).log(
+            AuditLogCreate(
+                action=AuditAction.ACCESS_DENIED,
+                user_id=current_user.id,
+                table_name="report_tasks",
+                record_id=str(task_id),
+                ip_address=request.client.host,
+                user_agent=request.headers.get("user-agent"),
+                details=f"User {current_user.email} tried to cancel report owned by user_id={task.user_id}",
+            )
+        )
+        raise PermissionDeniedException
+
+    try:
+        task = await ReportServiceS(db).cancel_report_task(task)
+    except ReportNotCancellableException:
+        raise ReportNotCancellableHTTPException
+
+    await AuditService(db).log(
+        AuditLogCreate(
+            action=AuditAction.REPORT_CANCEL,
+            user_id=current_user.id,
+            table_name="report_tasks",
+            record_id=str(task_id),
+            ip_address=request.client.host,
+            user_agent=request.headers.get("user-agent"),
+            details=f"User {current_user.email} cancelled report {task_id}",
+        )
+    )
+
+    return {"task_id": task_id, "status": task.status}
+
+
+@router.post(
+    "/bundles",
+    summary="Создание пакета отчётов",
+    description="""Создаёт одну фоновую задачу на несколько отчётов (например, месячный пакет).
+
+Все отчёты пакета строятся в одной задаче на общем снимке данных
+(REPEATABLE READ, экспортированный снимок используется параллельными
+соединениями), поэтому результаты согласованы даже при обновлении
+материализованных представлений. По завершении отправляется одно письмо.
+
+Каждый отчёт пакета — отдельная задача: её статус и файл доступны через
+/status/{task_id} и /download/{task_id}, весь пакет — одним ZIP через
+/bundles/{bundle_id}/download.
+
+Требуется роль: manager, admin
+
+Действие записывается в аудит-лог.""",
+    responses={
+        200: {"description": "Пакет создан"},
+        404: {"description": "Шаблон отчёта не найден"},
+        422: {"description": "Некорректные параметры или отчёт превышает лимиты"},
+        429: {"description": "Превышена квота на генерацию отчётов"},
+    },
+)
+async def generate_bundle(
+    db: DBDep,
+    user: get_current_active_manager_Dep,
+    http_request: Request,
+    request: ReportBundleRequest,
+):
+    try:
+        bundle, tasks = await ReportServiceS(db).generate_report_bundle(
+            user_id=user.id, items=request.items, role=user.role
+        )
+    except ValueError:
+        raise TempelateIsNotExistsException
+    except ReportParametersValidationException:
+        raise ReportParametersValidationHTTPException
+    except ReportTooLargeException:
+        raise ReportTooLargeHTTPException
+    except ReportQuotaExceededException as exc:
+        raise ReportQuotaExceededHTTPException(exc.retry_after)
+
+    await AuditService(db).log(
+        AuditLogCreate(
+            action=AuditAction.REPORT_GENERATE,
+            user_id=user.id,
+            table_name="report_bundles",
+            record_id=str(bundle.id),
+            new_values={
+                "reports": [item.model_dump(mode="json") for item in request.items]
+            },
+            ip_address=http_request.client.host,
+            user_agent=http_request.headers.get("user-agent"),
+            details=f"User {user.email} requested bundle of {len(tasks)} reports",
+        )
+    )
+
+    return {
+        "bundle_id": bundle.id,
+        "status": bundle.status,
+        "task_ids": [task.id for task in tasks],
+    }
+
+
+async def _get_own_bundle(db, bundle_id, current_user, request: Request):
+    bundle = await db.report_bundle.get_one_or_none(id=bundle_id)
+    if bundle is None:
+        raise ObjectIsNotExistsException
+
+    if bundle.user_id != current_user.id and current_user.role not in [
+        "admin",
+        "superadmin",
+    ]:
+        await AuditService(db).log(
+            AuditLogCreate(
+                action=AuditAction.ACCESS_DENIED,
+                user_id=current_user.id,
+                table_name="report_bundles",
+                record_id=str(bundle_id),
+                ip_address=request.client.host,
+                user_agent=request.headers.get("user-agent"),
+                details=f"User {current_user.email} tried to access bundle owned by user_id={bundle.user_id}",
+            )
+        )
+        raise PermissionDeniedException
+    return bundle
+
+
+@router.get(
+    "/bundles/{bundle_id}",
+    summary="Статус пакета отчётов",
+    description="""Возвращает статус пакета и статусы всех его отчётов.""",
+    response_model=ReportBundleStatus,
+    responses={
+        403: {"description": "Попытка доступа к чужому пакету"},
+        404: {"description": "Пакет не найден"},
+    },
+)
+async def get_bundle_status(
+    bundle_id: uuid.UUID,
+    db: DBDep,
+    current_user: get_current_active_user_Dep,
+    request: Request,
+):
+    bundle = await _get_own_bundle(db, bundle_id, current_user, request)
+    tasks = await db.report_task.get_all(bundle_id=bundle_id)
+    return ReportBundleStatus(
+        bundle_id=bundle.id,
+        status=bundle.status,
+        error_message=bundle.error_message,
+        started_at=bundle.started_at,
+        finished_at=bundle.finished_at,
+        tasks=[
+            _task_status(
+                task,
+                await get_progress(str(task.id)) if task.status == "pending" else None,
+            )
+            for task in sorted(tasks, key=lambda task: task.created_at)
+        ],
+    )
+
+
+@router.get(
+    "/bundles/{bundle_id}/download",
+    summary="Скачивание пакета отчётов одним ZIP",
+    description="""Отдаёт готовые отчёты пакета одним ZIP-архивом, собираемым потоком.
+
+CSV в архиве распакованы (сжаты deflate), Parquet/Arrow кладутся как есть.
+Отчёты без данных в архив не попадают.
+
+Скачивание записывается в аудит-лог.""",
+    responses={
+        200: {"description": "ZIP с отчётами", "content": {"application/zip": {}}},
+        403: {"description": "Попытка скачать чужой пакет"},
+        404: {"description": "Пакет не найден"},
+        410: {"description": "Файлы отчётов вытеснены из хранилища"},
+    },
+)
+async def download_bundle(
+    bundle_id: uuid.UUID,
+    db: DBDep,
+    current_user: get_current_active_user_Dep,
+    request: Request,
+):
+    bundle = await _get_own_bundle(db, bundle_id, current_user, request)
+    if bundle.status != "ready":
+        raise ReportIsNotReady
+
+    tasks = sorted(
+        await db.report_task.get_all(bundle_id=bundle_id, status="ready"),
+        key=lambda task: task.created_at,
+    )
+    templates = {
+        template.id: template for template in await db.report_template.get_all()
+    }
+    members = [
+        (
+            bundle_member_name(
+                index, templates[task.template_id].name, task.result_file
+            ),
+            task.result_file,
+        )
+        for index, task in enumerate(tasks, start=1)
+    ]
+    if not all(os.path.exists(file_path) for _, file_path in members):
+        raise ReportFileExpiredException
+
+    await AuditService(db).log(
+        AuditLogCreate(
+            action=AuditAction.REPORT_DOWNLOAD,
+            user_id=current_user.id,
+            table_name="report_bundles",
+            record_id=str(bundle_id),
+            ip_address=request.client.host,
+            user_agent=request.headers.get("user-agent"),
+            details=f"User {current_user.email} downloaded bundle {bundle_id}",
+        )
+    )
+
+    return StreamingResponse(
+        iter_zip(members),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="reports_{bundle_id}.zip"'
+        },
     )
 
 
@@ -234,7 +610,7 @@ async def download_report(
     summary="Список моих задач на генерацию отчётов",
     description="""Возвращает список всех задач на генерацию отчётов текущего пользователя.
 
-Включает задачи со всеми статусами: pending, ready, error.""",
+Включает задачи со всеми статусами: pending, ready, error, cancelled, timeout.""",
     responses={
         200: {"description": "Список задач пользователя"},
         401: {"description": "Не авторизован"},
@@ -253,8 +629,10 @@ async def get_my_report(current_user: get_current_active_user_Dep, db: DBDep):
 - Названии отчёта
 - Описании
 - Требуемых параметрах
-- Ролях, которым доступен отчёт""",
+- Ролях, которым доступен отчёт
+- Свежести данных (data): поколение, время обновления и последняя дата источника""",
+    response_model=list[ReportTemplateInfo],
     responses={200: {"description": "Список шаблонов отчётов"}},
 )
 async def get_all_template(db: DBDep):
-    return await db.report_template.get_all()
+    return await ReportServiceS(db).templates_info()
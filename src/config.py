@@ -33,6 +33,81 @@ class Settings(BaseSettings):
     FAILED_TTL_SECONDS: int
     ELASTICSEARCH_URL: str
 
+    REPORT_STREAM_BATCH_SIZE: int = 5000
+    REPORT_PIPELINE_DEPTH: int = 4
+    REPORT_EXPORT_ENGINE: Literal["python", "copy"] = "copy"
+    REPORT_SHARD_DAYS: int = 90
+    REPORT_SHARD_PARALLELISM: int = 4
+    REPORT_SHARD_ROW_THRESHOLD: int = 500_000
+    REPORT_PARQUET_COMPRESSION: str = "zstd"
+    REPORT_PARQUET_ROW_GROUP_SIZE: int = 100_000
+    REPORT_ARROW_COMPRESSION: str | None = "zstd"
+    REPORT_CSV_COMPRESSION: Literal["none", "gzip", "zstd"] = "gzip"
+    REPORT_GZIP_LEVEL: int = 6
+    REPORT_ZSTD_LEVEL: int = 3
+
+    WORKER_DB_POOL_SIZE: int = 5
+    WORKER_DB_MAX_OVERFLOW: int = 5
+    WORKER_DB_POOL_RECYCLE: int = 1800
+
+    REPORT_CACHE_MAX_BYTES: int = 5 * 1024**3
+    # столько живёт результат готовой задачи: до этого срока объект не вытесняется
+    REPORT_RESULT_RETENTION_SECONDS: int = 7 * 24 * 3600
+    REPORT_FLIGHT_LEASE_SECONDS: int = 60
+    REPORT_FLIGHT_FOLLOWERS_TTL_SECONDS: int = 3600
+
+    REPORT_PROGRESS_INTERVAL_SECONDS: float = 1.0
+    REPORT_PROGRESS_TTL_SECONDS: int = 3600
+
+    REPORT_FAST_MAX_DAYS: int = 31
+    REPORT_FAST_PRIORITY: int = 2
+    REPORT_BULK_PRIORITY: int = 6
+    REPORT_AGING_INTERVAL_SECONDS: int = 300
+    REPORT_AGING_CHECK_SECONDS: int = 60
+
+    REPORT_ESTIMATE_ROWS_PER_SECOND: int = 200_000
+    REPORT_BULK_MIN_ESTIMATED_ROWS: int = 200_000
+    REPORT_MAX_RANGE_DAYS: int = 1096
+    REPORT_MAX_ESTIMATED_ROWS: int = 10_000_000
+    REPORT_MAX_ESTIMATED_BYTES: int = 2 * 1024**3
+    REPORT_OVERSIZE_POLICY: Literal["reject", "bulk"] = "reject"
+
+    REPORT_QUOTA_MAX_ACTIVE_PER_USER: int = 5
+    REPORT_QUOTA_RATE_PER_MINUTE: float = 10
+    REPORT_QUOTA_BURST: int = 20
+    REPORT_QUOTA_ROLE_MULTIPLIER: dict[str, float] = {"admin": 4.0, "superadmin": 4.0}
+    REPORT_QUOTA_ACTIVE_TTL_SECONDS: int = 6 * 3600
+    REPORT_QUOTA_AVG_TASK_SECONDS: int = 30
+    REPORT_QUOTA_FAIR_SHARE_STEPS: int = 3
+    REPORT_QUOTA_MAX_HEAVY: int = 2
+    REPORT_QUOTA_HEAVY_RETRY_SECONDS: int = 30
+
+    # значения по умолчанию; шаблон может переопределить их в report_templates
+    REPORT_STATEMENT_TIMEOUT_MS: int = 10 * 60 * 1000
+    REPORT_WORK_MEM: str = "64MB"
+    REPORT_CANCEL_TTL_SECONDS: int = 6 * 3600
+
+    REPORT_BUNDLE_PARALLELISM: int = 4
+
+    # общее сканирование: окно сбора задач на одном представлении (0 — выключено)
+    REPORT_BATCH_WINDOW_MS: int = 200
+    REPORT_BATCH_MAX_DAYS: int = 92
+
+    # сборка отчётов из помесячных кусков (закрытые месяцы берутся из кэша)
+    REPORT_CHUNK_CACHE: bool = True
+
+    # куб сводок в .npy (mmap), общий для процессов воркера
+    REPORT_CUBE_ENABLED: bool = True
+    REPORT_CUBE_DIR: str = "report/cube"
+    REPORT_CUBE_MAX_BYTES: int = 1024**3
+
+    # адаптивное обновление агрегатов по объёму записей в orders/order_items/payments
+    REPORT_REFRESH_CHECK_SECONDS: int = 30
+    REPORT_REFRESH_MIN_INTERVAL_SECONDS: int = 60
+    REPORT_REFRESH_MAX_STALENESS_SECONDS: int = 900
+    REPORT_REFRESH_DEBOUNCE_SECONDS: int = 60
+    REPORT_REFRESH_WRITE_THRESHOLD: int = 5000
+
     @property
     def DB_URL(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
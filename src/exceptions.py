@@ -108,6 +108,34 @@ class ReportIsNotReady(MainException):
     detail = "Отчёт ещё не готов, проверьте его статус"
 
 
+class ReportFileExpiredException(MainException):
+    status_code = status.HTTP_410_GONE
+    detail = "Файл отчёта удалён из хранилища, сформируйте отчёт заново"
+
+
+class ReportTooLargeHTTPException(MainException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    detail = "Отчёт слишком большой: сузьте диапазон дат или добавьте фильтры"
+
+
+class ReportNotCancellableHTTPException(MainException):
+    status_code = status.HTTP_409_CONFLICT
+    detail = "Задача уже завершена, отменить её нельзя"
+
+
+class ReportQuotaExceededHTTPException(MainException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    detail = "Превышена квота на генерацию отчётов, повторите позже"
+
+    def __init__(self, retry_after: int):
+        HTTPException.__init__(
+            self,
+            status_code=self.status_code,
+            detail=self.detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 # Базовые бизнес-исключения приложения (не HTTP)
 
 
@@ -127,3 +155,29 @@ class ReportParametersValidationException(AppException):
     """Вызывается, когда параметры отчёта не проходят валидацию."""
 
     pass
+
+
+class ReportTooLargeException(AppException):
+    """Вызывается, когда оценка отчёта превышает допустимые лимиты."""
+
+    pass
+
+
+class ReportQuotaExceededException(AppException):
+    """Вызывается, когда пользователь превысил квоту на генерацию отчётов."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class ReportNotCancellableException(AppException):
+    """Вызывается при попытке отменить уже завершённую задачу."""
+
+    pass
+
+
+class ReportCancelledException(AppException):
+    """Вызывается в воркере, когда выполнение задачи отменено пользователем."""
+
+    pass
@@ -21,7 +21,12 @@ from src.models.commerce import (
     supplier,
 )
 from src.models.security import audit
-from src.models.report import report_task, report_template
+from src.models.report import (
+    report_bundle,
+    report_task,
+    report_template,
+    report_view_state,
+)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
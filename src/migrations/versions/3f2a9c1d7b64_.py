@@ -0,0 +1,32 @@
+"""Add format column to report_tasks
+
+Revision ID: 3f2a9c1d7b64
+Revises: 152f5cba0eba
+Create Date: 2026-10-18 10:12:41.204417
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7b64"
+down_revision: Union[str, Sequence[str], None] = "152f5cba0eba"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "report_tasks",
+        sa.Column("format", sa.String(length=20), server_default="csv", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("report_tasks", "format")
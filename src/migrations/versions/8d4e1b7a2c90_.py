@@ -0,0 +1,53 @@
+"""Add execution telemetry to report_tasks
+
+Revision ID: 8d4e1b7a2c90
+Revises: 3f2a9c1d7b64
+Create Date: 2026-10-18 12:40:05.118342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d4e1b7a2c90"
+down_revision: Union[str, Sequence[str], None] = "3f2a9c1d7b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "report_tasks",
+        sa.Column("started_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "report_tasks",
+        sa.Column("finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "report_tasks", sa.Column("queue_wait_ms", sa.Integer(), nullable=True)
+    )
+    op.add_column("report_tasks", sa.Column("query_ms", sa.Integer(), nullable=True))
+    op.add_column("report_tasks", sa.Column("write_ms", sa.Integer(), nullable=True))
+    op.add_column("report_tasks", sa.Column("rows", sa.BigInteger(), nullable=True))
+    op.add_column("report_tasks", sa.Column("bytes", sa.BigInteger(), nullable=True))
+    op.add_column(
+        "report_tasks", sa.Column("worker", sa.String(length=255), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("report_tasks", "worker")
+    op.drop_column("report_tasks", "bytes")
+    op.drop_column("report_tasks", "rows")
+    op.drop_column("report_tasks", "write_ms")
+    op.drop_column("report_tasks", "query_ms")
+    op.drop_column("report_tasks", "queue_wait_ms")
+    op.drop_column("report_tasks", "finished_at")
+    op.drop_column("report_tasks", "started_at")
@@ -0,0 +1,313 @@
+"""Maintain daily report aggregates incrementally via dirty dates
+
+Revision ID: a6c2d8e4f1b7
+Revises: f3a8c1e6b2d4
+Create Date: 2026-10-18 20:31:44.260518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c2d8e4f1b7"
+down_revision: Union[str, Sequence[str], None] = "f3a8c1e6b2d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# дневной агрегат -> естественный ключ
+DAILY_KEYS = {
+    "mv_sales_daily": ["date"],
+    "mv_sales_by_product_category_daily": ["order_date", "product_id", "category_id"],
+    "mv_sales_by_customer_daily": ["order_date", "customer_id"],
+    "mv_payments_by_method_daily": ["payment_date", "payment_method"],
+}
+# свёртки (зависят от дневных агрегатов): источник -> (колонка даты, ключи, подписи)
+ROLLUP_SOURCES = {
+    "mv_sales_by_product_category": (
+        "order_date",
+        ["product_id", "category_id"],
+        ["product_name", "category_name"],
+    ),
+    "mv_sales_by_customer": (
+        "order_date",
+        ["customer_id"],
+        ["customer_name", "customer_email"],
+    ),
+    "mv_payments_by_method": ("payment_date", ["payment_method"], []),
+}
+METRICS = ["total_quantity", "total_amount", "total_orders", "total_payments"]
+GRAINS = ["week", "month"]
+
+# исходные определения представлений (для downgrade)
+DAILY_VIEWS = {
+    "mv_sales_daily": """
+    WITH payments_agg AS (
+        SELECT order_id, SUM(amount) AS total_payments
+        FROM payments
+        GROUP BY order_id
+    ),
+    items_agg AS (
+        SELECT order_id, SUM(quantity) AS total_items
+        FROM order_items
+        GROUP BY order_id
+    )
+    SELECT
+        o.order_date::date AS date,
+        COUNT(*) AS total_orders,
+        SUM(o.total_amount) AS total_amount,
+        AVG(o.total_amount) AS avg_check,
+        SUM(COALESCE(i.total_items, 0)) AS total_items,
+        SUM(COALESCE(p.total_payments, 0)) AS total_payments
+    FROM orders o
+    LEFT JOIN items_agg i ON i.order_id = o.id
+    LEFT JOIN payments_agg p ON p.order_id = o.id
+    GROUP BY o.order_date::date
+    """,
+    "mv_sales_by_product_category_daily": """
+    SELECT
+        o.order_date::date AS order_date,
+        p.id AS product_id,
+        p.name AS product_name,
+        c.id AS category_id,
+        c.name AS category_name,
+        SUM(oi.quantity) AS total_quantity,
+        SUM(oi.total_cost) AS total_amount,
+        COUNT(DISTINCT o.id) AS total_orders,
+        COALESCE(SUM(pay.amount), 0) AS total_payments
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.id
+    JOIN categories c ON p.category_id = c.id
+    JOIN orders o ON oi.order_id = o.id
+    LEFT JOIN payments pay ON pay.order_id = o.id
+    GROUP BY o.order_date::date, p.id, p.name, c.id, c.name
+    """,
+    "mv_sales_by_customer_daily": """
+    SELECT
+        o.order_date::date AS order_date,
+        cu.id AS customer_id,
+        cu.name AS customer_name,
+        cu.email AS customer_email,
+        SUM(oi.quantity) AS total_quantity,
+        SUM(oi.total_cost) AS total_amount,
+        COUNT(DISTINCT o.id) AS total_orders,
+        COALESCE(SUM(pay.amount), 0) AS total_payments
+    FROM orders o
+    JOIN customers cu ON o.customer_id = cu.id
+    JOIN order_items oi ON oi.order_id = o.id
+    LEFT JOIN payments pay ON pay.order_id = o.id
+    GROUP BY o.order_date::date, cu.id, cu.name, cu.email
+    """,
+    "mv_payments_by_method_daily": """
+    SELECT
+        p.payment_date::date AS payment_date,
+        p.method AS payment_method,
+        COUNT(DISTINCT o.id) AS total_orders,
+        SUM(oi.quantity) AS total_quantity,
+        SUM(oi.total_cost) AS total_amount,
+        SUM(p.amount) AS total_payments
+    FROM payments p
+    JOIN orders o ON o.id = p.order_id
+    JOIN order_items oi ON oi.order_id = o.id
+    GROUP BY p.payment_date::date, p.method
+    """,
+}
+
+# Триггеры пишут даты, чьи агрегаты затронуты изменением строки.
+# Заказ влияет на дату заказа и на даты своих платежей (агрегат по методам оплаты).
+TRIGGERS_SQL = """
+CREATE TABLE report_dirty_dates (day date PRIMARY KEY);
+
+CREATE FUNCTION report_mark_orders(order_ids integer[]) RETURNS void AS $$
+    INSERT INTO report_dirty_dates (day)
+    SELECT order_date::date FROM orders WHERE id = ANY(order_ids)
+    UNION
+    SELECT payment_date::date FROM payments WHERE order_id = ANY(order_ids)
+    ON CONFLICT DO NOTHING;
+$$ LANGUAGE sql;
+
+CREATE FUNCTION report_orders_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO report_dirty_dates VALUES (OLD.order_date::date)
+        ON CONFLICT DO NOTHING;
+        PERFORM report_mark_orders(ARRAY[OLD.id]);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM report_mark_orders(ARRAY[NEW.id]);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION report_order_items_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM report_mark_orders(ARRAY[OLD.order_id]);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM report_mark_orders(ARRAY[NEW.order_id]);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION report_payments_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO report_dirty_dates VALUES (OLD.payment_date::date)
+        ON CONFLICT DO NOTHING;
+        PERFORM report_mark_orders(ARRAY[OLD.order_id]);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM report_mark_orders(ARRAY[NEW.order_id]);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- переименования в справочниках меняют подписи во всех датах их заказов
+CREATE FUNCTION report_products_dirty() RETURNS trigger AS $$
+BEGIN
+    PERFORM report_mark_orders(
+        ARRAY(SELECT DISTINCT order_id FROM order_items WHERE product_id = NEW.id)
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION report_categories_dirty() RETURNS trigger AS $$
+BEGIN
+    PERFORM report_mark_orders(
+        ARRAY(
+            SELECT DISTINCT oi.order_id
+            FROM order_items oi
+            JOIN products p ON p.id = oi.product_id
+            WHERE p.category_id = NEW.id
+        )
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION report_customers_dirty() RETURNS trigger AS $$
+BEGIN
+    PERFORM report_mark_orders(
+        ARRAY(SELECT id FROM orders WHERE customer_id = NEW.id)
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER report_orders_dirty
+AFTER INSERT OR UPDATE OR DELETE ON orders
+FOR EACH ROW EXECUTE FUNCTION report_orders_dirty();
+
+CREATE TRIGGER report_order_items_dirty
+AFTER INSERT OR UPDATE OR DELETE ON order_items
+FOR EACH ROW EXECUTE FUNCTION report_order_items_dirty();
+
+CREATE TRIGGER report_payments_dirty
+AFTER INSERT OR UPDATE OR DELETE ON payments
+FOR EACH ROW EXECUTE FUNCTION report_payments_dirty();
+
+CREATE TRIGGER report_products_dirty
+AFTER UPDATE ON products
+FOR EACH ROW
+WHEN (OLD.name IS DISTINCT FROM NEW.name
+      OR OLD.category_id IS DISTINCT FROM NEW.category_id)
+EXECUTE FUNCTION report_products_dirty();
+
+CREATE TRIGGER report_categories_dirty
+AFTER UPDATE ON categories
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE FUNCTION report_categories_dirty();
+
+CREATE TRIGGER report_customers_dirty
+AFTER UPDATE ON customers
+FOR EACH ROW
+WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD.email IS DISTINCT FROM NEW.email)
+EXECUTE FUNCTION report_customers_dirty();
+
+-- выборка платежей по дням при пересчёте
+CREATE INDEX ix_payments_payment_day ON payments ((payment_date::date));
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP INDEX IF EXISTS ix_payments_payment_day;
+DROP TRIGGER IF EXISTS report_orders_dirty ON orders;
+DROP TRIGGER IF EXISTS report_order_items_dirty ON order_items;
+DROP TRIGGER IF EXISTS report_payments_dirty ON payments;
+DROP TRIGGER IF EXISTS report_products_dirty ON products;
+DROP TRIGGER IF EXISTS report_categories_dirty ON categories;
+DROP TRIGGER IF EXISTS report_customers_dirty ON customers;
+DROP FUNCTION IF EXISTS report_orders_dirty();
+DROP FUNCTION IF EXISTS report_order_items_dirty();
+DROP FUNCTION IF EXISTS report_payments_dirty();
+DROP FUNCTION IF EXISTS report_products_dirty();
+DROP FUNCTION IF EXISTS report_categories_dirty();
+DROP FUNCTION IF EXISTS report_customers_dirty();
+DROP FUNCTION IF EXISTS report_mark_orders(integer[]);
+DROP TABLE IF EXISTS report_dirty_dates;
+"""
+
+
+def _drop_rollups():
+    for source in ROLLUP_SOURCES:
+        for grain in GRAINS:
+            op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {source}_{grain}ly;")
+
+
+def _create_rollups():
+    for source, (day, keys, labels) in ROLLUP_SOURCES.items():
+        for grain in GRAINS:
+            view = f"{source}_{grain}ly"
+            columns = [f"date_trunc('{grain}', {day})::date AS {day}"]
+            columns += keys
+            columns += [f"MAX({label}) AS {label}" for label in labels]
+            columns += [f"SUM({metric}) AS {metric}" for metric in METRICS]
+            op.execute(
+                f"""
+            CREATE MATERIALIZED VIEW {view} AS
+            SELECT
+                {", ".join(columns)}
+            FROM {source}_daily
+            GROUP BY 1, {", ".join(keys)};
+            """
+            )
+            op.create_index(f"ux_{view}", view, [day, *keys], unique=True)
+
+
+def upgrade() -> None:
+    """Replace daily materialized views with incrementally maintained tables"""
+    _drop_rollups()
+    for table, keys in DAILY_KEYS.items():
+        # таблица того же имени и формы с текущими данными представления
+        op.execute(f"ALTER MATERIALIZED VIEW {table} RENAME TO {table}_old;")
+        op.execute(f"CREATE TABLE {table} AS SELECT * FROM {table}_old;")
+        op.execute(f"DROP MATERIALIZED VIEW {table}_old;")
+        columns = ", ".join(f'"{key}"' for key in keys)
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({columns});")
+    _create_rollups()
+    op.execute(TRIGGERS_SQL)
+    # первый запуск обслуживания догоняет изменения с последнего REFRESH
+    op.execute(
+        """
+    INSERT INTO report_dirty_dates (day)
+    SELECT order_date::date FROM orders
+    UNION
+    SELECT payment_date::date FROM payments;
+    """
+    )
+
+
+def downgrade() -> None:
+    """Restore daily materialized views"""
+    op.execute(DROP_TRIGGERS_SQL)
+    _drop_rollups()
+    for table, keys in DAILY_KEYS.items():
+        op.execute(f"DROP TABLE IF EXISTS {table};")
+        op.execute(f"CREATE MATERIALIZED VIEW {table} AS {DAILY_VIEWS[table]};")
+        op.create_index(f"ux_{table}", table, keys, unique=True)
+    _create_rollups()
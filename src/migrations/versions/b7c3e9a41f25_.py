@@ -0,0 +1,33 @@
+"""Add queue and priority to report_tasks
+
+Revision ID: b7c3e9a41f25
+Revises: 8d4e1b7a2c90
+Create Date: 2026-10-18 14:05:52.730114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7c3e9a41f25"
+down_revision: Union[str, Sequence[str], None] = "8d4e1b7a2c90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "report_tasks", sa.Column("queue", sa.String(length=50), nullable=True)
+    )
+    op.add_column("report_tasks", sa.Column("priority", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("report_tasks", "priority")
+    op.drop_column("report_tasks", "queue")
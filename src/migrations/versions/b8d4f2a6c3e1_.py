@@ -0,0 +1,69 @@
+"""Report view state: generation and freshness of every reporting view
+
+Revision ID: b8d4f2a6c3e1
+Revises: a6c2d8e4f1b7
+Create Date: 2026-10-18 21:12:05.418306
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d4f2a6c3e1"
+down_revision: Union[str, Sequence[str], None] = "a6c2d8e4f1b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# агрегат -> (таблица-источник, колонка даты)
+VIEW_SOURCES = {
+    "mv_sales_daily": ("orders", "order_date"),
+    "mv_sales_by_product_category_daily": ("orders", "order_date"),
+    "mv_sales_by_product_category_weekly": ("orders", "order_date"),
+    "mv_sales_by_product_category_monthly": ("orders", "order_date"),
+    "mv_sales_by_customer_daily": ("orders", "order_date"),
+    "mv_sales_by_customer_weekly": ("orders", "order_date"),
+    "mv_sales_by_customer_monthly": ("orders", "order_date"),
+    "mv_payments_by_method_daily": ("payments", "payment_date"),
+    "mv_payments_by_method_weekly": ("payments", "payment_date"),
+    "mv_payments_by_method_monthly": ("payments", "payment_date"),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "report_view_state",
+        sa.Column("view_name", sa.String(length=100), nullable=False),
+        sa.Column("generation", sa.BigInteger(), nullable=False),
+        sa.Column("refreshed_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("source_max_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("row_count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("view_name"),
+    )
+    # текущее содержимое агрегатов — первое поколение
+    for view, (source, column) in VIEW_SOURCES.items():
+        op.execute(
+            "INSERT INTO report_view_state "
+            "(view_name, generation, refreshed_at, source_max_at, row_count) "
+            f"SELECT '{view}', 1, now(), "
+            f"(SELECT max({column})::timestamptz FROM {source}), count(*) "
+            f"FROM {view}"
+        )
+
+    op.add_column(
+        "report_tasks", sa.Column("data_generation", sa.BigInteger(), nullable=True)
+    )
+    op.add_column(
+        "report_tasks",
+        sa.Column("data_as_of", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("report_tasks", "data_as_of")
+    op.drop_column("report_tasks", "data_generation")
+    op.drop_table("report_view_state")
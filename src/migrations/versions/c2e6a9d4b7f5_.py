@@ -0,0 +1,49 @@
+"""Range-scan indexes on reporting aggregates by entity
+
+Revision ID: c2e6a9d4b7f5
+Revises: b8d4f2a6c3e1
+Create Date: 2026-10-18 21:47:36.902114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c2e6a9d4b7f5"
+down_revision: Union[str, Sequence[str], None] = "b8d4f2a6c3e1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Диапазоны дат по всем сущностям уже покрыты первичными ключами дневных
+# таблиц и уникальными индексами свёрток (дата — первая колонка). Фильтр по
+# одной сущности за длинный период читает по индексу (сущность, дата).
+ENTITY_INDEXES = {
+    "mv_sales_by_product_category": [
+        ("product_id", "order_date"),
+        ("category_id", "order_date"),
+    ],
+    "mv_sales_by_customer": [("customer_id", "order_date")],
+}
+GRAINS = ("daily", "weekly", "monthly")
+
+
+def _indexes():
+    for source, indexes in ENTITY_INDEXES.items():
+        for grain in GRAINS:
+            table = f"{source}_{grain}"
+            for columns in indexes:
+                yield f"ix_{table}_{columns[0]}", table, list(columns)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in _indexes():
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in _indexes():
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""Add statement_timeout_ms and work_mem to report_templates
+
+Revision ID: c4e8a2f61d37
+Revises: b7c3e9a41f25
+Create Date: 2026-10-18 16:21:07.418305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e8a2f61d37"
+down_revision: Union[str, Sequence[str], None] = "b7c3e9a41f25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "report_templates",
+        sa.Column("statement_timeout_ms", sa.Integer(), nullable=True),
+    )
+    op.add_column(
+        "report_templates", sa.Column("work_mem", sa.String(length=20), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("report_templates", "work_mem")
+    op.drop_column("report_templates", "statement_timeout_ms")
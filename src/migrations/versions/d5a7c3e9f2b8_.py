@@ -0,0 +1,85 @@
+"""Maintain weekly/monthly rollups incrementally as tables
+
+Revision ID: d5a7c3e9f2b8
+Revises: c2e6a9d4b7f5
+Create Date: 2026-10-19 10:05:27.631844
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a7c3e9f2b8"
+down_revision: Union[str, Sequence[str], None] = "c2e6a9d4b7f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# свёртка -> (колонка даты, ключи, подписи)
+ROLLUP_SOURCES = {
+    "mv_sales_by_product_category": (
+        "order_date",
+        ["product_id", "category_id"],
+        ["product_name", "category_name"],
+    ),
+    "mv_sales_by_customer": (
+        "order_date",
+        ["customer_id"],
+        ["customer_name", "customer_email"],
+    ),
+    "mv_payments_by_method": ("payment_date", ["payment_method"], []),
+}
+METRICS = ["total_quantity", "total_amount", "total_orders", "total_payments"]
+GRAINS = ["week", "month"]
+# индексы (сущность, дата) из c2e6a9d4b7f5 удаляются вместе с представлением
+ENTITY_INDEXES = {
+    "mv_sales_by_product_category": [
+        ("product_id", "order_date"),
+        ("category_id", "order_date"),
+    ],
+    "mv_sales_by_customer": [("customer_id", "order_date")],
+}
+
+
+def _rollups():
+    for source, (day, keys, labels) in ROLLUP_SOURCES.items():
+        for grain in GRAINS:
+            yield source, f"{source}_{grain}ly", grain, day, keys, labels
+
+
+def _create_entity_indexes(source: str, view: str):
+    for columns in ENTITY_INDEXES.get(source, []):
+        op.create_index(f"ix_{view}_{columns[0]}", view, list(columns))
+
+
+def upgrade() -> None:
+    """Replace rollup materialized views with tables rebuilt per changed period"""
+    for source, view, _, day, keys, _ in _rollups():
+        op.execute(f"ALTER MATERIALIZED VIEW {view} RENAME TO {view}_old;")
+        op.execute(f"CREATE TABLE {view} AS SELECT * FROM {view}_old;")
+        op.execute(f"DROP MATERIALIZED VIEW {view}_old;")
+        columns = ", ".join(f'"{column}"' for column in [day, *keys])
+        op.execute(f"ALTER TABLE {view} ADD PRIMARY KEY ({columns});")
+        _create_entity_indexes(source, view)
+
+
+def downgrade() -> None:
+    """Restore rollup materialized views"""
+    for source, view, grain, day, keys, labels in _rollups():
+        op.execute(f"DROP TABLE IF EXISTS {view};")
+        columns = [f"date_trunc('{grain}', {day})::date AS {day}"]
+        columns += keys
+        columns += [f"MAX({label}) AS {label}" for label in labels]
+        columns += [f"SUM({metric}) AS {metric}" for metric in METRICS]
+        op.execute(
+            f"""
+        CREATE MATERIALIZED VIEW {view} AS
+        SELECT
+            {", ".join(columns)}
+        FROM {source}_daily
+        GROUP BY 1, {", ".join(keys)};
+        """
+        )
+        op.create_index(f"ux_{view}", view, [day, *keys], unique=True)
+        _create_entity_indexes(source, view)
@@ -0,0 +1,64 @@
+"""Add report_bundles and report_tasks.bundle_id
+
+Revision ID: d9a1f3c5b286
+Revises: c4e8a2f61d37
+Create Date: 2026-10-18 17:48:33.602915
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9a1f3c5b286"
+down_revision: Union[str, Sequence[str], None] = "c4e8a2f61d37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "report_bundles",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("started_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.add_column("report_tasks", sa.Column("bundle_id", sa.UUID(), nullable=True))
+    op.create_foreign_key(
+        "report_tasks_bundle_id_fkey",
+        "report_tasks",
+        "report_bundles",
+        ["bundle_id"],
+        ["id"],
+    )
+    op.create_index(
+        "ix_report_tasks_bundle_id", "report_tasks", ["bundle_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_report_tasks_bundle_id", table_name="report_tasks")
+    op.drop_constraint(
+        "report_tasks_bundle_id_fkey", "report_tasks", type_="foreignkey"
+    )
+    op.drop_column("report_tasks", "bundle_id")
+    op.drop_table("report_bundles")
@@ -0,0 +1,60 @@
+"""Create weekly and monthly rollup materialized views
+
+Revision ID: e7b2c4d8f913
+Revises: d9a1f3c5b286
+Create Date: 2026-10-18 19:12:05.418233
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b2c4d8f913"
+down_revision: Union[str, Sequence[str], None] = "d9a1f3c5b286"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# дневное представление -> (колонка даты, ключи, подписи)
+ROLLUP_SOURCES = {
+    "mv_sales_by_product_category": (
+        "order_date",
+        ["product_id", "category_id"],
+        ["product_name", "category_name"],
+    ),
+    "mv_sales_by_customer": (
+        "order_date",
+        ["customer_id"],
+        ["customer_name", "customer_email"],
+    ),
+    "mv_payments_by_method": ("payment_date", ["payment_method"], []),
+}
+METRICS = ["total_quantity", "total_amount", "total_orders", "total_payments"]
+GRAINS = ["week", "month"]
+
+
+def upgrade() -> None:
+    """Create weekly and monthly rollups over the daily views"""
+    for source, (day, keys, labels) in ROLLUP_SOURCES.items():
+        for grain in GRAINS:
+            columns = [f"date_trunc('{grain}', {day})::date AS {day}"]
+            columns += keys
+            columns += [f"MAX({label}) AS {label}" for label in labels]
+            columns += [f"SUM({metric}) AS {metric}" for metric in METRICS]
+            op.execute(
+                f"""
+            CREATE MATERIALIZED VIEW {source}_{grain}ly AS
+            SELECT
+                {", ".join(columns)}
+            FROM {source}_daily
+            GROUP BY 1, {", ".join(keys)};
+            """
+            )
+
+
+def downgrade() -> None:
+    """Drop rollup views"""
+    for source in ROLLUP_SOURCES:
+        for grain in GRAINS:
+            op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {source}_{grain}ly;")
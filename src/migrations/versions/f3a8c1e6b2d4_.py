@@ -0,0 +1,45 @@
+"""Add unique indexes on materialized views for REFRESH CONCURRENTLY
+
+Revision ID: f3a8c1e6b2d4
+Revises: e7b2c4d8f913
+Create Date: 2026-10-18 19:47:31.902114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a8c1e6b2d4"
+down_revision: Union[str, Sequence[str], None] = "e7b2c4d8f913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# представление -> естественный ключ строки
+VIEW_KEYS = {
+    "mv_sales_daily": ["date"],
+    "mv_sales_by_product_category_daily": ["order_date", "product_id", "category_id"],
+    "mv_sales_by_product_category_weekly": ["order_date", "product_id", "category_id"],
+    "mv_sales_by_product_category_monthly": [
+        "order_date",
+        "product_id",
+        "category_id",
+    ],
+    "mv_sales_by_customer_daily": ["order_date", "customer_id"],
+    "mv_sales_by_customer_weekly": ["order_date", "customer_id"],
+    "mv_sales_by_customer_monthly": ["order_date", "customer_id"],
+    "mv_payments_by_method_daily": ["payment_date", "payment_method"],
+    "mv_payments_by_method_weekly": ["payment_date", "payment_method"],
+    "mv_payments_by_method_monthly": ["payment_date", "payment_method"],
+}
+
+
+def upgrade() -> None:
+    for view, columns in VIEW_KEYS.items():
+        op.create_index(f"ux_{view}", view, columns, unique=True)
+
+
+def downgrade() -> None:
+    for view in VIEW_KEYS:
+        op.drop_index(f"ux_{view}", table_name=view)
@@ -0,0 +1,26 @@
+from datetime import datetime
+import uuid
+
+import sqlalchemy as sa
+from sqlalchemy import ForeignKey, String, Text, func, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.database import Base
+
+
+class ReportBundleORM(Base):
+    """Пакет отчётов, строящийся в одной задаче на общем снимке данных"""
+
+    __tablename__ = "report_bundles"
+    id: Mapped[uuid.UUID] = mapped_column(UUID, primary_key=True, default=uuid.uuid4)
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id"))
+    status: Mapped[str] = mapped_column(
+        String(50), default="pending"
+    )  # pending, ready, error
+    error_message: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        sa.TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[datetime | None] = mapped_column(sa.TIMESTAMP(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(sa.TIMESTAMP(timezone=True))
@@ -14,10 +14,13 @@ class ReportTaskORM(Base):
 
     user_id: Mapped[uuid.UUID] = mapped_column(UUID, ForeignKey("users.id"))
     template_id: Mapped[int] = mapped_column(ForeignKey("report_templates.id"))
+    bundle_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID, ForeignKey("report_bundles.id"), index=True
+    )
 
     status: Mapped[str] = mapped_column(
         String(50), default="pending"
-    )  # pending, ready, error
+    )  # pending, ready, error, cancelled, timeout
     parameters: Mapped[str | None] = mapped_column(
         Text
     )  # например: JSON-строка с фильтрами
@@ -25,6 +28,25 @@ class ReportTaskORM(Base):
         String(255)
     )  # путь или ссылка на файл
     error_message: Mapped[str | None] = mapped_column(Text)
+    format: Mapped[str] = mapped_column(
+        String(20), default="csv", server_default="csv"
+    )  # csv, parquet, arrow
+    queue: Mapped[str | None] = mapped_column(String(50))  # reports_fast, reports_bulk
+    priority: Mapped[int | None] = mapped_column(sa.Integer)  # 0 — наивысший
     created_at: Mapped[datetime] = mapped_column(
         sa.TIMESTAMP(timezone=True), server_default=func.now()
     )
+
+    # телеметрия выполнения
+    started_at: Mapped[datetime | None] = mapped_column(sa.TIMESTAMP(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(sa.TIMESTAMP(timezone=True))
+    queue_wait_ms: Mapped[int | None] = mapped_column(sa.Integer)
+    query_ms: Mapped[int | None] = mapped_column(sa.Integer)
+    write_ms: Mapped[int | None] = mapped_column(sa.Integer)
+    rows: Mapped[int | None] = mapped_column(sa.BigInteger)
+    bytes: Mapped[int | None] = mapped_column(sa.BigInteger)
+    worker: Mapped[str | None] = mapped_column(String(255))
+
+    # поколение и свежесть данных, на которых построен результат
+    data_generation: Mapped[int | None] = mapped_column(sa.BigInteger)
+    data_as_of: Mapped[datetime | None] = mapped_column(sa.TIMESTAMP(timezone=True))
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Text
+from sqlalchemy import Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.database import Base
@@ -11,3 +11,6 @@ class ReportTemplateORM(Base):
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
     allowed_roles: Mapped[str | None] = mapped_column(String(200))
+    # лимиты сессии отчёта; NULL — значения из настроек
+    statement_timeout_ms: Mapped[int | None] = mapped_column(Integer)
+    work_mem: Mapped[str | None] = mapped_column(String(20))
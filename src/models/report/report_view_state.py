@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.database import Base
+
+
+class ReportViewStateORM(Base):
+    """Свежесть агрегата отчётов: поколение данных и время последнего обновления"""
+
+    __tablename__ = "report_view_state"
+
+    view_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    generation: Mapped[int] = mapped_column(sa.BigInteger, default=0)
+    refreshed_at: Mapped[datetime] = mapped_column(sa.TIMESTAMP(timezone=True))
+    # последняя дата источника (orders.order_date / payments.payment_date) в данных
+    source_max_at: Mapped[datetime | None] = mapped_column(sa.TIMESTAMP(timezone=True))
+    row_count: Mapped[int] = mapped_column(sa.BigInteger, default=0)
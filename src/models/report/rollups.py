@@ -0,0 +1,42 @@
+from sqlalchemy import Index, Table
+
+from src.database import Base
+from src.models.report.payments_by_method import PaymentsByMethodDailyORM
+from src.models.report.sales_by_customer import SalesByCustomerDailyORM
+from src.models.report.sales_by_product_category_daily import (
+    SalesByProductCategoryDailyORM,
+)
+
+ROLLUP_GRAINS = ("week", "month")
+
+
+def rollup_table(model, grain: str) -> Table:
+    """Недельная/месячная свёртка дневного представления с теми же колонками и индексами.
+
+    Колонка даты хранит начало периода.
+    """
+    name = f"{model.__tablename__.removesuffix('_daily')}_{grain}ly"
+    return Table(
+        name,
+        Base.metadata,
+        *(column._copy() for column in model.__table__.columns),
+        *(
+            Index(
+                index.name.replace(model.__tablename__, name),
+                *(column.name for column in index.columns),
+            )
+            for index in model.__table__.indexes
+        ),
+    )
+
+
+PRODUCT_CATEGORY_ROLLUPS = {
+    grain: rollup_table(SalesByProductCategoryDailyORM, grain)
+    for grain in ROLLUP_GRAINS
+}
+CUSTOMER_ROLLUPS = {
+    grain: rollup_table(SalesByCustomerDailyORM, grain) for grain in ROLLUP_GRAINS
+}
+PAYMENTS_ROLLUPS = {
+    grain: rollup_table(PaymentsByMethodDailyORM, grain) for grain in ROLLUP_GRAINS
+}
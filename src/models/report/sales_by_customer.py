@@ -1,10 +1,14 @@
-from sqlalchemy import String, Numeric, Integer, Date
+from sqlalchemy import String, Numeric, Integer, Date, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from src.database import Base
 
 
 class SalesByCustomerDailyORM(Base):
     __tablename__ = "mv_sales_by_customer_daily"
+    # диапазон дат по одному клиенту; диапазон по всем — первичный ключ
+    __table_args__ = (
+        Index("ix_mv_sales_by_customer_daily_customer_id", "customer_id", "order_date"),
+    )
 
     # PK: комбинация дня и клиента
     order_date: Mapped[Date] = mapped_column(Date, primary_key=True)
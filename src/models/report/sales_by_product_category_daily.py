@@ -1,4 +1,4 @@
-from sqlalchemy import Date, String, Numeric, Integer
+from sqlalchemy import Date, Index, String, Numeric, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 from src.database import Base
 from datetime import datetime
@@ -6,6 +6,19 @@ from datetime import datetime
 
 class SalesByProductCategoryDailyORM(Base):
     __tablename__ = "mv_sales_by_product_category_daily"
+    # диапазон дат по одному товару/категории; диапазон по всем — первичный ключ
+    __table_args__ = (
+        Index(
+            "ix_mv_sales_by_product_category_daily_product_id",
+            "product_id",
+            "order_date",
+        ),
+        Index(
+            "ix_mv_sales_by_product_category_daily_category_id",
+            "category_id",
+            "order_date",
+        ),
+    )
 
     order_date: Mapped[datetime] = mapped_column(Date, primary_key=True)
 
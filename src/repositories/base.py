@@ -1,16 +1,27 @@
+import json
+
 from asyncpg import UniqueViolationError
 from pydantic import BaseModel
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import Date, delete, func, insert, select, text, union_all, update
 from sqlalchemy.exc import IntegrityError
 
+from src.config import settings
 from src.exceptions import ObjectAlreadyExistsException
 from src.repositories.mapper.base import DataMapper
+from src.schemas.report.report_view_state import ReportViewState
+from src.utils.report_batch import retarget
+from src.utils.report_estimate import plan_estimate
+from src.utils.report_rollup import rollup_pieces
+from src.utils.report_serializer import INT_COLUMNS, ROUND_COLUMNS
+from src.utils.view_state import get_view_state
 
 
 class BaseRepository:
     model = None
     schema: BaseModel = None
     mapper: DataMapper = None
+    # недельные/месячные свёртки дневного представления: grain -> Table
+    rollups: dict = {}
 
     def __init__(self, session):
         self.session = session
@@ -22,6 +33,120 @@ class BaseRepository:
             self.mapper.map_to_domain_entity(model) for model in result.scalars().all()
         ]
 
+    async def stream(self, query, batch_size: int | None = None):
+        """Построчная выборка через серверный курсор: отдаёт строки пачками по batch_size"""
+        batch_size = batch_size or settings.REPORT_STREAM_BATCH_SIZE
+        result = await self.session.stream(
+            query.execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def _driver_query(self, query):
+        """Компилирует запрос под asyncpg: соединение драйвера, SQL с $n и аргументы"""
+        connection = await self.session.connection()
+        compiled = query.compile(dialect=connection.dialect)
+        args = [compiled.params[name] for name in compiled.positiontup]
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection, str(compiled), args
+
+    async def copy_to(self, query, output) -> int:
+        """Выгрузка запроса через COPY ... TO STDOUT (CSV, ';', с заголовком), возвращает число строк"""
+        driver_connection, sql, args = await self._driver_query(query)
+        status = await driver_connection.copy_from_query(
+            sql,
+            *args,
+            output=output,
+            format="csv",
+            delimiter=";",
+            header=True,
+        )
+        return int(status.split()[-1])
+
+    async def explain(self, query) -> dict:
+        """План запроса из EXPLAIN (FORMAT JSON): корневой узел Plan"""
+        driver_connection, sql, args = await self._driver_query(query)
+        plan = json.loads(
+            await driver_connection.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+        )
+        return plan[0]["Plan"]
+
+    async def estimate_rows(self, query) -> int:
+        """Оценка планировщика: наибольшее число строк среди узлов плана (обычно сканирование)"""
+        _, scanned_rows, _ = plan_estimate(await self.explain(query))
+        return scanned_rows
+
+    async def month_fingerprints(self, since=None) -> dict[str, str]:
+        """Отпечаток данных каждого месяца представления: число строк и сумма хэшей строк.
+
+        С since — только месяцы начиная с since (первого числа месяца).
+        """
+        table = self.model.__table__
+        date_column = next(c for c in table.columns if isinstance(c.type, Date))
+        where = f'WHERE v."{date_column.name}" >= :since ' if since else ""
+        result = await self.session.execute(
+            text(
+                f"SELECT to_char(date_trunc('month', v.{date_column.name}), 'YYYY-MM'), "
+                f"count(*) || ':' || sum(hashtext(v::text)) "
+                f"FROM {table.name} v {where}GROUP BY 1"
+            ),
+            {"since": since} if since else {},
+        )
+        return {month: fingerprint for month, fingerprint in result.all()}
+
+    async def view_state(self) -> ReportViewState | None:
+        """Поколение и свежесть данных представления (см. src/utils/view_state.py)"""
+        return await get_view_state(self.model.__tablename__, self.session)
+
+    def rollup_query(self, query, date_from, date_to, granularity=None):
+        """Тот же запрос отчёта, читающий самые крупные свёртки, точно покрывающие диапазон.
+
+        Целые месяцы и недели берутся из свёрток, края — из дневного представления.
+        С granularity строки сворачиваются до начала периода (не раньше date_from).
+        """
+        if not self.rollups:
+            return query
+        pieces = rollup_pieces(date_from, date_to, granularity)
+        if granularity in (None, "day") and all(p[0] == "day" for p in pieces):
+            return query
+
+        table = self.model.__table__
+        day = next(c for c in table.columns if isinstance(c.type, Date))
+        parts = []
+        for grain, start, end in pieces:
+            source = table if grain == "day" else self.rollups[grain]
+            parts.append(
+                select(*source.columns)
+                .where(source.c[day.name] >= start)
+                .where(source.c[day.name] <= end)
+            )
+        rows = union_all(*parts).subquery()
+
+        if granularity not in (None, "day"):
+            bucket = func.greatest(
+                func.date_trunc(granularity, rows.c[day.name]).cast(Date), date_from
+            )
+            keys = [c.name for c in table.primary_key.columns if c is not day]
+            metrics = [
+                c.name for c in table.columns if c.name in ROUND_COLUMNS | INT_COLUMNS
+            ]
+            labels = [
+                c.name
+                for c in table.columns
+                if c.name not in {day.name, *keys, *metrics}
+            ]
+            rows = (
+                select(
+                    bucket.label(day.name),
+                    *(rows.c[name] for name in keys),
+                    *(func.max(rows.c[name]).label(name) for name in labels),
+                    *(func.sum(rows.c[name]).label(name) for name in metrics),
+                )
+                .group_by(bucket, *(rows.c[name] for name in keys))
+                .subquery()
+            )
+        return retarget(query, table, rows)
+
     async def get_one_or_none(self, **filter_by):
         query = select(self.model).filter_by(**filter_by)
         result = await self.session.execute(query)
@@ -18,8 +18,10 @@ from src.models.commerce.order_item import OrderItemOrm
 from src.models.commerce.payment import PaymentORM
 from src.models.commerce.product import ProductORM
 from src.models.commerce.supplier import SupplierORM
+from src.models.report.report_bundle import ReportBundleORM
 from src.models.report.report_task import ReportTaskORM
 from src.models.report.report_template import ReportTemplateORM
+from src.models.report.report_view_state import ReportViewStateORM
 from src.repositories.mapper.base import DataMapper
 from src.schemas.auth.refresh_token import RefreshToken
 from src.schemas.auth.user import User
@@ -30,8 +32,10 @@ from src.schemas.commerce.order_item import OrderItem
 from src.schemas.commerce.payment import Payment
 from src.schemas.commerce.product import Product
 from src.schemas.commerce.supplier import Supplier
+from src.schemas.report.report_bundle import ReportBundle
 from src.schemas.report.report_task import ReportTask
 from src.schemas.report.report_template import ReportTemplate
+from src.schemas.report.report_view_state import ReportViewState
 
 
 class RefreshTokenDataMapper(DataMapper):
@@ -89,6 +93,16 @@ class ReportTaskDataMapper(DataMapper):
     schema = ReportTask
 
 
+class ReportBundleDataMapper(DataMapper):
+    db_model = ReportBundleORM
+    schema = ReportBundle
+
+
+class ReportViewStateDataMapper(DataMapper):
+    db_model = ReportViewStateORM
+    schema = ReportViewState
+
+
 class SalesDailyDataMapper(DataMapper):
     db_model = SalesDailyORM
     schema = SalesDaily
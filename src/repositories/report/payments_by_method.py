@@ -2,6 +2,7 @@ from pendulum import date
 from sqlalchemy import select, func, desc
 
 from src.models.report.payments_by_method import PaymentsByMethodDailyORM
+from src.models.report.rollups import PAYMENTS_ROLLUPS
 from src.repositories.base import BaseRepository
 from src.schemas.report.payments_by_method import (
     PaymentsByMethodDaily,
@@ -11,13 +12,15 @@ from src.schemas.report.payments_by_method import (
 
 class PaymentsRepository(BaseRepository):
     model = PaymentsByMethodDailyORM
+    rollups = PAYMENTS_ROLLUPS
 
-    async def get_payments_daily(
+    def payments_daily_query(
         self,
         date_from: date,
         date_to: date,
         payment_method: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -38,15 +41,15 @@ class PaymentsRepository(BaseRepository):
         query = query.order_by(self.model.payment_date, self.model.payment_method)
         if top:
             query = query.limit(top)
-        rows = (await self.session.execute(query)).all()
-        return [PaymentsByMethodDaily(**row._mapping) for row in rows]
+        return self.rollup_query(query, date_from, date_to, granularity or "day")
 
-    async def get_payments_summary(
+    def payments_summary_query(
         self,
         date_from: date,
         date_to: date,
         payment_method: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -68,6 +71,32 @@ class PaymentsRepository(BaseRepository):
 
         if top:
             query = query.limit(top)
+        return self.rollup_query(query, date_from, date_to, granularity)
 
+    async def get_payments_daily(
+        self,
+        date_from: date,
+        date_to: date,
+        payment_method: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.payments_daily_query(
+            date_from, date_to, payment_method, top, granularity
+        )
+        rows = (await self.session.execute(query)).all()
+        return [PaymentsByMethodDaily(**row._mapping) for row in rows]
+
+    async def get_payments_summary(
+        self,
+        date_from: date,
+        date_to: date,
+        payment_method: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.payments_summary_query(
+            date_from, date_to, payment_method, top, granularity
+        )
         rows = (await self.session.execute(query)).all()
         return [PaymentsByMethodSummary(**row._mapping) for row in rows]
@@ -0,0 +1,207 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from src.models.report.rollups import ROLLUP_GRAINS
+from src.repositories.base import BaseRepository
+
+# Дневные агрегаты (бывшие материализованные представления mv_*_daily) —
+# обычные таблицы той же формы. Триггеры на orders, order_items, payments и
+# справочниках пишут затронутые даты в report_dirty_dates; пересчитываются
+# только эти даты.
+DAILY_AGGREGATES = {
+    "mv_sales_daily": (
+        "date",
+        """
+        WITH day_orders AS (
+            SELECT id FROM orders
+            WHERE order_date::date = ANY(CAST(:days AS date[]))
+        ),
+        payments_agg AS (
+            SELECT order_id, SUM(amount) AS total_payments
+            FROM payments
+            WHERE order_id IN (SELECT id FROM day_orders)
+            GROUP BY order_id
+        ),
+        items_agg AS (
+            SELECT order_id, SUM(quantity) AS total_items
+            FROM order_items
+            WHERE order_id IN (SELECT id FROM day_orders)
+            GROUP BY order_id
+        )
+        SELECT
+            o.order_date::date AS date,
+            COUNT(*) AS total_orders,
+            SUM(o.total_amount) AS total_amount,
+            AVG(o.total_amount) AS avg_check,
+            SUM(COALESCE(i.total_items, 0)) AS total_items,
+            SUM(COALESCE(p.total_payments, 0)) AS total_payments
+        FROM orders o
+        LEFT JOIN items_agg i ON i.order_id = o.id
+        LEFT JOIN payments_agg p ON p.order_id = o.id
+        WHERE o.order_date::date = ANY(CAST(:days AS date[]))
+        GROUP BY o.order_date::date
+        """,
+    ),
+    "mv_sales_by_product_category_daily": (
+        "order_date",
+        """
+        SELECT
+            o.order_date::date AS order_date,
+            p.id AS product_id,
+            p.name AS product_name,
+            c.id AS category_id,
+            c.name AS category_name,
+            SUM(oi.quantity) AS total_quantity,
+            SUM(oi.total_cost) AS total_amount,
+            COUNT(DISTINCT o.id) AS total_orders,
+            COALESCE(SUM(pay.amount), 0) AS total_payments
+        FROM order_items oi
+        JOIN products p ON oi.product_id = p.id
+        JOIN categories c ON p.category_id = c.id
+        JOIN orders o ON oi.order_id = o.id
+        LEFT JOIN payments pay ON pay.order_id = o.id
+        WHERE o.order_date::date = ANY(CAST(:days AS date[]))
+        GROUP BY o.order_date::date, p.id, p.name, c.id, c.name
+        """,
+    ),
+    "mv_sales_by_customer_daily": (
+        "order_date",
+        """
+        SELECT
+            o.order_date::date AS order_date,
+            cu.id AS customer_id,
+            cu.name AS customer_name,
+            cu.email AS customer_email,
+            SUM(oi.quantity) AS total_quantity,
+            SUM(oi.total_cost) AS total_amount,
+            COUNT(DISTINCT o.id) AS total_orders,
+            COALESCE(SUM(pay.amount), 0) AS total_payments
+        FROM orders o
+        JOIN customers cu ON o.customer_id = cu.id
+        JOIN order_items oi ON oi.order_id = o.id
+        LEFT JOIN payments pay ON pay.order_id = o.id
+        WHERE o.order_date::date = ANY(CAST(:days AS date[]))
+        GROUP BY o.order_date::date, cu.id, cu.name, cu.email
+        """,
+    ),
+    "mv_payments_by_method_daily": (
+        "payment_date",
+        """
+        SELECT
+            p.payment_date::date AS payment_date,
+            p.method AS payment_method,
+            COUNT(DISTINCT o.id) AS total_orders,
+            SUM(oi.quantity) AS total_quantity,
+            SUM(oi.total_cost) AS total_amount,
+            SUM(p.amount) AS total_payments
+        FROM payments p
+        JOIN orders o ON o.id = p.order_id
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE p.payment_date::date = ANY(CAST(:days AS date[]))
+        GROUP BY p.payment_date::date, p.method
+        """,
+    ),
+}
+
+# Недельные и месячные свёртки — тоже таблицы: пересчитываются только периоды,
+# в которые попали изменившиеся даты. Источник -> (колонка даты, ключи, подписи)
+ROLLUP_SOURCES = {
+    "mv_sales_by_product_category": (
+        "order_date",
+        ["product_id", "category_id"],
+        ["product_name", "category_name"],
+    ),
+    "mv_sales_by_customer": (
+        "order_date",
+        ["customer_id"],
+        ["customer_name", "customer_email"],
+    ),
+    "mv_payments_by_method": ("payment_date", ["payment_method"], []),
+}
+ROLLUP_METRICS = ["total_quantity", "total_amount", "total_orders", "total_payments"]
+ROLLUP_AGGREGATES = [
+    f"{source}_{grain}ly" for source in ROLLUP_SOURCES for grain in ROLLUP_GRAINS
+]
+
+# таблицы, объём записей в которых решает, когда запускать обновление
+WRITE_SOURCES = ("orders", "order_items", "payments")
+
+
+class ReportAggregateRepository(BaseRepository):
+    async def take_dirty_dates(self) -> list[date]:
+        """Забирает накопленные даты; изменения после снимка останутся до следующего запуска"""
+        result = await self.session.execute(
+            text("DELETE FROM report_dirty_dates RETURNING day")
+        )
+        return sorted(result.scalars().all())
+
+    async def rebuild_dates(self, days: list[date]) -> dict[str, tuple[int, int]]:
+        """Удаляет и заново агрегирует строки дат days; (удалено, вставлено) по таблицам"""
+        rows = {}
+        for table, (date_column, query) in DAILY_AGGREGATES.items():
+            deleted = await self.session.execute(
+                text(
+                    f"DELETE FROM {table} "
+                    f'WHERE "{date_column}" = ANY(CAST(:days AS date[]))'
+                ),
+                {"days": days},
+            )
+            inserted = await self.session.execute(
+                text(f"INSERT INTO {table} {query}"), {"days": days}
+            )
+            rows[table] = (deleted.rowcount, inserted.rowcount)
+        return rows
+
+    async def rebuild_rollups(self, days: list[date]) -> dict[str, tuple[int, int]]:
+        """Пересчитывает недели и месяцы, содержащие days, из дневных таблиц.
+
+        Вызывается после rebuild_dates в той же транзакции; (удалено, вставлено).
+        """
+        periods = (
+            "SELECT DISTINCT date_trunc(:grain, d)::date AS start "
+            "FROM unnest(CAST(:days AS date[])) d"
+        )
+        rows = {}
+        for source, (day, keys, labels) in ROLLUP_SOURCES.items():
+            columns = [day, *keys, *labels, *ROLLUP_METRICS]
+            select = ["p.start", *(f"s.{key}" for key in keys)]
+            select += [f"max(s.{label})" for label in labels]
+            select += [f"sum(s.{metric})" for metric in ROLLUP_METRICS]
+            for grain in ROLLUP_GRAINS:
+                table = f"{source}_{grain}ly"
+                params = {"grain": grain, "days": days}
+                deleted = await self.session.execute(
+                    text(f'DELETE FROM {table} WHERE "{day}" IN ({periods})'), params
+                )
+                inserted = await self.session.execute(
+                    text(
+                        f"INSERT INTO {table} ({', '.join(columns)}) "
+                        f"SELECT {', '.join(select)} "
+                        f"FROM ({periods}) p "
+                        f"JOIN {source}_daily s ON s.{day} >= p.start "
+                        f"AND s.{day} < p.start + CAST('1 ' || :grain AS interval) "
+                        f"GROUP BY p.start, {', '.join(f's.{key}' for key in keys)}"
+                    ),
+                    params,
+                )
+                rows[table] = (deleted.rowcount, inserted.rowcount)
+        return rows
+
+    async def has_dirty_dates(self) -> bool:
+        result = await self.session.execute(
+            text("SELECT EXISTS (SELECT 1 FROM report_dirty_dates)")
+        )
+        return result.scalar_one()
+
+    async def write_counter(self) -> int:
+        """Накопительное число вставок/изменений/удалений в таблицах-источниках"""
+        result = await self.session.execute(
+            text(
+                "SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0) "
+                "FROM pg_stat_user_tables "
+                "WHERE relname = ANY(CAST(:tables AS text[]))"
+            ),
+            {"tables": list(WRITE_SOURCES)},
+        )
+        return int(result.scalar_one())
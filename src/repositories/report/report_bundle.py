@@ -0,0 +1,8 @@
+from src.models.report.report_bundle import ReportBundleORM
+from src.repositories.base import BaseRepository
+from src.repositories.mapper.mappers import ReportBundleDataMapper
+
+
+class ReportBundleRepository(BaseRepository):
+    model = ReportBundleORM
+    mapper = ReportBundleDataMapper
@@ -1,8 +1,107 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import Integer, cast, desc, func, nulls_last, select, text, update
+
 from src.models.report.report_task import ReportTaskORM
+from src.models.report.report_template import ReportTemplateORM
 from src.repositories.base import BaseRepository
 from src.repositories.mapper.mappers import ReportTaskDataMapper
 
+SNAPSHOT_ID = re.compile(r"[0-9A-F]+-[0-9A-F]+(-[0-9A-F]+)?")
+
 
 class ReportTaskRepository(BaseRepository):
     model = ReportTaskORM
     mapper = ReportTaskDataMapper
+
+    async def mark_started(self, task_id, worker: str) -> bool:
+        """Фиксирует начало выполнения и время ожидания в очереди (только первый раз)"""
+        now = func.now()
+        stmt = (
+            update(ReportTaskORM)
+            .where(ReportTaskORM.id == task_id)
+            .where(ReportTaskORM.started_at.is_(None))
+            .values(
+                started_at=now,
+                queue_wait_ms=cast(
+                    func.extract("epoch", now - ReportTaskORM.created_at) * 1000,
+                    Integer,
+                ),
+                worker=worker,
+            )
+            .returning(ReportTaskORM.id)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def apply_session_limits(
+        self, statement_timeout_ms: int, work_mem: str
+    ) -> int:
+        """SET LOCAL statement_timeout и work_mem на текущую транзакцию, возвращает PID backend"""
+        result = await self.session.execute(
+            text(
+                "SELECT pg_backend_pid(), "
+                "set_config('statement_timeout', :statement_timeout, true), "
+                "set_config('work_mem', :work_mem, true)"
+            ),
+            {"statement_timeout": str(statement_timeout_ms), "work_mem": work_mem},
+        )
+        return result.scalar_one()
+
+    async def export_snapshot(self) -> str:
+        """Открывает REPEATABLE READ транзакцию и экспортирует её снимок для других соединений"""
+        await self.session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"}
+        )
+        result = await self.session.execute(text("SELECT pg_export_snapshot()"))
+        return result.scalar_one()
+
+    async def import_snapshot(self, snapshot_id: str):
+        """Переводит новую транзакцию сессии на экспортированный снимок"""
+        if not SNAPSHOT_ID.fullmatch(snapshot_id):
+            raise ValueError(f"Invalid snapshot id: {snapshot_id}")
+        await self.session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"}
+        )
+        # SET TRANSACTION не принимает параметры, id проверен выше
+        await self.session.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'"))
+
+    async def cancel_backends(self, pids: list[int]):
+        """pg_cancel_backend для запросов отменённой задачи"""
+        if pids:
+            await self.session.execute(
+                text(
+                    "SELECT pg_cancel_backend(pid) "
+                    "FROM unnest(CAST(:pids AS integer[])) AS pid"
+                ),
+                {"pids": pids},
+            )
+
+    async def duration_stats(self, since: datetime):
+        """p50/p95 длительности выполнения и ожидания в очереди по шаблонам"""
+        duration_ms = (
+            func.extract("epoch", ReportTaskORM.finished_at - ReportTaskORM.started_at)
+            * 1000
+        )
+        query = (
+            select(
+                ReportTemplateORM.name.label("report_name"),
+                func.count().label("tasks"),
+                func.percentile_cont(0.5).within_group(duration_ms).label("p50_ms"),
+                func.percentile_cont(0.95).within_group(duration_ms).label("p95_ms"),
+                func.percentile_cont(0.95)
+                .within_group(ReportTaskORM.queue_wait_ms)
+                .label("p95_queue_wait_ms"),
+                func.avg(ReportTaskORM.rows).label("avg_rows"),
+                func.avg(ReportTaskORM.bytes).label("avg_bytes"),
+            )
+            .join(ReportTemplateORM, ReportTemplateORM.id == ReportTaskORM.template_id)
+            .where(ReportTaskORM.started_at.is_not(None))
+            .where(ReportTaskORM.finished_at.is_not(None))
+            .where(ReportTaskORM.created_at >= since)
+            .group_by(ReportTemplateORM.name)
+            .order_by(nulls_last(desc("p95_ms")))
+        )
+        result = await self.session.execute(query)
+        return result.mappings().all()
@@ -0,0 +1,54 @@
+from sqlalchemy import text
+
+from src.models.report.report_view_state import ReportViewStateORM
+from src.repositories.base import BaseRepository
+from src.repositories.mapper.mappers import ReportViewStateDataMapper
+
+ORDERS = ("orders", "order_date")
+PAYMENTS = ("payments", "payment_date")
+
+# агрегат -> (таблица-источник, колонка даты), по которым считается source_max_at
+VIEW_SOURCES = {
+    "mv_sales_daily": ORDERS,
+    "mv_sales_by_product_category_daily": ORDERS,
+    "mv_sales_by_product_category_weekly": ORDERS,
+    "mv_sales_by_product_category_monthly": ORDERS,
+    "mv_sales_by_customer_daily": ORDERS,
+    "mv_sales_by_customer_weekly": ORDERS,
+    "mv_sales_by_customer_monthly": ORDERS,
+    "mv_payments_by_method_daily": PAYMENTS,
+    "mv_payments_by_method_weekly": PAYMENTS,
+    "mv_payments_by_method_monthly": PAYMENTS,
+}
+
+
+class ReportViewStateRepository(BaseRepository):
+    model = ReportViewStateORM
+    mapper = ReportViewStateDataMapper
+
+    async def record_refresh(
+        self, view: str, rows: int | None = None, row_delta: int = 0
+    ):
+        """Новое поколение агрегата в транзакции его обновления.
+
+        rows — полное число строк после обновления; без него число строк
+        сдвигается на row_delta (пересчёт отдельных дат).
+        """
+        source, column = VIEW_SOURCES[view]
+        result = await self.session.execute(
+            text(
+                "INSERT INTO report_view_state "
+                "(view_name, generation, refreshed_at, source_max_at, row_count) "
+                f"SELECT :view, 1, now(), max({column})::timestamptz, "
+                "COALESCE(:rows, :row_delta) "
+                f"FROM {source} "
+                "ON CONFLICT (view_name) DO UPDATE SET "
+                "generation = report_view_state.generation + 1, "
+                "refreshed_at = EXCLUDED.refreshed_at, "
+                "source_max_at = EXCLUDED.source_max_at, "
+                "row_count = COALESCE(:rows, report_view_state.row_count + :row_delta) "
+                "RETURNING *"
+            ),
+            {"view": view, "rows": rows, "row_delta": row_delta},
+        )
+        return self.mapper.map_to_domain_entity(result.mappings().one())
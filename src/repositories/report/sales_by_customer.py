@@ -2,6 +2,7 @@ from datetime import date
 from sqlalchemy import select, func, desc
 
 from src.models.report.sales_by_customer import SalesByCustomerDailyORM
+from src.models.report.rollups import CUSTOMER_ROLLUPS
 from src.repositories.base import BaseRepository
 from src.schemas.report.sales_by_customer import (
     SalesByCustomerDaily,
@@ -11,14 +12,16 @@ from src.schemas.report.sales_by_customer import (
 
 class SalesByCustomerRepository(BaseRepository):
     model = SalesByCustomerDailyORM
+    rollups = CUSTOMER_ROLLUPS
 
-    async def get_sales_by_customer_daily(
+    def sales_by_customer_daily_query(
         self,
         date_from: date,
         date_to: date,
         customer_id: int | None = None,
         customer_name: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -49,16 +52,16 @@ class SalesByCustomerRepository(BaseRepository):
         )
         if top:
             query = query.limit(top)
-        rows = (await self.session.execute(query)).all()
-        return [SalesByCustomerDaily(**row._mapping) for row in rows]
+        return self.rollup_query(query, date_from, date_to, granularity or "day")
 
-    async def get_sales_by_customer_summary(
+    def sales_by_customer_summary_query(
         self,
         date_from: date,
         date_to: date,
         customer_id: int | None = None,
         customer_name: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -95,6 +98,34 @@ class SalesByCustomerRepository(BaseRepository):
 
         if top:
             query = query.limit(top)
+        return self.rollup_query(query, date_from, date_to, granularity)
 
+    async def get_sales_by_customer_daily(
+        self,
+        date_from: date,
+        date_to: date,
+        customer_id: int | None = None,
+        customer_name: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.sales_by_customer_daily_query(
+            date_from, date_to, customer_id, customer_name, top, granularity
+        )
+        rows = (await self.session.execute(query)).all()
+        return [SalesByCustomerDaily(**row._mapping) for row in rows]
+
+    async def get_sales_by_customer_summary(
+        self,
+        date_from: date,
+        date_to: date,
+        customer_id: int | None = None,
+        customer_name: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.sales_by_customer_summary_query(
+            date_from, date_to, customer_id, customer_name, top, granularity
+        )
         rows = (await self.session.execute(query)).all()
         return [SalesByCustomerSummary(**row._mapping) for row in rows]
@@ -10,6 +10,7 @@ from src.schemas.report.sales_by_product_category_daily import (
 from src.models.report.sales_by_product_category_daily import (
     SalesByProductCategoryDailyORM,
 )
+from src.models.report.rollups import PRODUCT_CATEGORY_ROLLUPS
 from src.repositories.base import BaseRepository
 from src.repositories.mapper.mappers import SalesByProductCategoryDailyDataMapper
 
@@ -19,15 +20,17 @@ from sqlalchemy import desc
 
 class SalesByProductCategoryDailyRepository(BaseRepository):
     model = SalesByProductCategoryDailyORM
+    rollups = PRODUCT_CATEGORY_ROLLUPS
     mapper = SalesByProductCategoryDailyDataMapper
 
-    async def get_sales_by_product_daily(
+    def sales_by_product_daily_query(
         self,
         date_from: date,
         date_to: date,
         product_id: int | None = None,
         product_name: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -58,16 +61,16 @@ class SalesByProductCategoryDailyRepository(BaseRepository):
         if top:
             query = query.limit(top)
 
-        rows = (await self.session.execute(query)).all()
-        return [SalesByProductDaily(**row._mapping) for row in rows]
+        return self.rollup_query(query, date_from, date_to, granularity or "day")
 
-    async def get_sales_by_product_summary(
+    def sales_by_product_summary_query(
         self,
         date_from: date,
         date_to: date,
         product_id: int | None = None,
         product_name: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -107,16 +110,16 @@ class SalesByProductCategoryDailyRepository(BaseRepository):
         if top:
             query = query.limit(top)
 
-        rows = (await self.session.execute(query)).all()
-        return [SalesByProductSummary(**row._mapping) for row in rows]
+        return self.rollup_query(query, date_from, date_to, granularity)
 
-    async def get_sales_by_category_daily(
+    def sales_by_category_daily_query(
         self,
         date_from: date,
         date_to: date,
         category_id: int | None = None,
         category_name: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -162,16 +165,16 @@ class SalesByProductCategoryDailyRepository(BaseRepository):
         if top:
             query = query.limit(top)
 
-        rows = (await self.session.execute(query)).all()
-        return [SalesByCategoryDaily(**row._mapping) for row in rows]
+        return self.rollup_query(query, date_from, date_to, granularity or "day")
 
-    async def get_sales_by_category_summary(
+    def sales_by_category_summary_query(
         self,
         date_from: date,
         date_to: date,
         category_id: int | None = None,
         category_name: str | None = None,
         top: int | None = None,
+        granularity: str | None = None,
     ):
         query = (
             select(
@@ -213,5 +216,64 @@ class SalesByProductCategoryDailyRepository(BaseRepository):
         if top:
             query = query.limit(top)
 
+        return self.rollup_query(query, date_from, date_to, granularity)
+
+    async def get_sales_by_product_daily(
+        self,
+        date_from: date,
+        date_to: date,
+        product_id: int | None = None,
+        product_name: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.sales_by_product_daily_query(
+            date_from, date_to, product_id, product_name, top, granularity
+        )
+        rows = (await self.session.execute(query)).all()
+        return [SalesByProductDaily(**row._mapping) for row in rows]
+
+    async def get_sales_by_product_summary(
+        self,
+        date_from: date,
+        date_to: date,
+        product_id: int | None = None,
+        product_name: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.sales_by_product_summary_query(
+            date_from, date_to, product_id, product_name, top, granularity
+        )
+        rows = (await self.session.execute(query)).all()
+        return [SalesByProductSummary(**row._mapping) for row in rows]
+
+    async def get_sales_by_category_daily(
+        self,
+        date_from: date,
+        date_to: date,
+        category_id: int | None = None,
+        category_name: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.sales_by_category_daily_query(
+            date_from, date_to, category_id, category_name, top, granularity
+        )
+        rows = (await self.session.execute(query)).all()
+        return [SalesByCategoryDaily(**row._mapping) for row in rows]
+
+    async def get_sales_by_category_summary(
+        self,
+        date_from: date,
+        date_to: date,
+        category_id: int | None = None,
+        category_name: str | None = None,
+        top: int | None = None,
+        granularity: str | None = None,
+    ):
+        query = self.sales_by_category_summary_query(
+            date_from, date_to, category_id, category_name, top, granularity
+        )
         rows = (await self.session.execute(query)).all()
         return [SalesByCategorySummary(**row._mapping) for row in rows]
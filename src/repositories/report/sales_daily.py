@@ -11,8 +11,8 @@ class SalesDailyRepository(BaseRepository):
     model = SalesDailyORM
     mapper = SalesDailyDataMapper
 
-    async def get_sales_daily(self, date_from: date, date_to: date):
-        query = (
+    def sales_daily_query(self, date_from: date, date_to: date):
+        return (
             select(
                 SalesDailyORM.date,
                 SalesDailyORM.total_orders,
@@ -26,13 +26,9 @@ class SalesDailyRepository(BaseRepository):
             .order_by(SalesDailyORM.date)
         )
 
-        result = await self.session.execute(query)
-        rows = result.all()
-
-        return [self.mapper.map_to_domain_entity(row._mapping) for row in rows]
-
-    async def get_sales_summary(self, date_from: date, date_to: date):
-        query = (
+    def sales_summary_query(self, date_from: date, date_to: date):
+        # having: без данных за период агрегат не возвращает строку из NULL
+        return (
             select(
                 func.sum(SalesDailyORM.total_orders).label("total_orders"),
                 func.sum(SalesDailyORM.total_amount).label("total_amount"),
@@ -42,9 +38,21 @@ class SalesDailyRepository(BaseRepository):
             )
             .where(SalesDailyORM.date >= date_from)
             .where(SalesDailyORM.date <= date_to)
+            .having(func.count() > 0)
         )
 
-        result = await self.session.execute(query)
-        row = result.one()
+    async def get_sales_daily(self, date_from: date, date_to: date):
+        result = await self.session.execute(self.sales_daily_query(date_from, date_to))
+        rows = result.all()
+
+        return [self.mapper.map_to_domain_entity(row._mapping) for row in rows]
+
+    async def get_sales_summary(self, date_from: date, date_to: date):
+        result = await self.session.execute(
+            self.sales_summary_query(date_from, date_to)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
         data = dict(row._mapping)
         return SalesSummary(**data)
@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from datetime import date
 from decimal import Decimal
 
+from src.schemas.report.report_task import Granularity
+
 
 class PaymentsByMethodDaily(BaseModel):
     payment_date: date
@@ -25,3 +27,4 @@ class PaymentsReportParams(BaseModel):
     date_to: date
     payment_method: str | None = None
     top: int | None = None
+    granularity: Granularity | None = None
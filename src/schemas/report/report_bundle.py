@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+import uuid
+
+from pydantic import BaseModel, Field
+
+from src.schemas.report.report_task import ReportRequest, ReportTaskStatus, Status
+
+BUNDLE_MAX_ITEMS = 20
+
+
+class ReportBundleRequest(BaseModel):
+    items: list[ReportRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=BUNDLE_MAX_ITEMS,
+        description="Отчёты пакета: название, параметры и формат",
+    )
+
+
+class ReportBundleAdd(BaseModel):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    user_id: uuid.UUID
+    status: Status = Status.pending
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ReportBundleStarted(BaseModel):
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ReportBundleFinished(BaseModel):
+    status: Status
+    error_message: str | None = None
+    finished_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ReportBundle(ReportBundleAdd):
+    error_message: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class ReportBundleStatus(BaseModel):
+    bundle_id: uuid.UUID
+    status: Status = Status.pending
+    error_message: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    tasks: list[ReportTaskStatus] = []
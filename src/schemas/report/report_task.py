@@ -1,22 +1,37 @@
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, Literal
 import uuid
 
 from pydantic import BaseModel, Field
 
 
+# шаг дат в детальных отчётах: day — дневные строки, иначе строки за период
+Granularity = Literal["day", "week", "month", "quarter"]
+
+
 class Status(str, Enum):
     pending = "pending"
     ready = "ready"
     error = "error"
+    cancelled = "cancelled"
+    timeout = "timeout"
+
+
+class ReportFormat(str, Enum):
+    csv = "csv"
+    parquet = "parquet"
+    arrow = "arrow"
 
 
 class ErrorMessage(BaseModel):
+    status: Status = Status.error
     error_message: str
+    finished_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class ReportTaskAdd(BaseModel):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
     user_id: uuid.UUID
     template_id: int
     status: Status = Status.pending
@@ -25,7 +40,13 @@ class ReportTaskAdd(BaseModel):
         default=None, max_length=255
     )  # путь или ссылка на файл
     error_message: str | None = None
+    format: ReportFormat = ReportFormat.csv
+    queue: str | None = None
+    priority: int | None = None
+    bundle_id: uuid.UUID | None = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    data_generation: int | None = None
+    data_as_of: datetime | None = None
 
 
 class ReportRequest(BaseModel):
@@ -33,6 +54,9 @@ class ReportRequest(BaseModel):
     parameters: Dict[str, Any] = Field(
         ..., description="Параметры отчета в формате JSON"
     )
+    format: ReportFormat = Field(
+        default=ReportFormat.csv, description="Формат файла: csv, parquet, arrow"
+    )
 
 
 class ReportTaskReady(BaseModel):
@@ -40,12 +64,83 @@ class ReportTaskReady(BaseModel):
     result_file: str | None = Field(default=None, max_length=255)
 
 
-class ReportTaskStatus(BaseModel):
+class ReportTaskRoute(BaseModel):
+    queue: str | None = None
+    priority: int | None = None
+
+
+class ReportTaskFinished(ReportTaskReady):
+    finished_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    query_ms: int | None = None
+    write_ms: int | None = None
+    rows: int | None = None
+    bytes: int | None = None
+    data_generation: int | None = None
+    data_as_of: datetime | None = None
+
+
+class ReportTaskProgress(BaseModel):
+    rows: int = 0
+    bytes: int = 0
+    elapsed_ms: int = 0
+
+
+class ReportTaskTelemetry(BaseModel):
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    queue_wait_ms: int | None = None
+    query_ms: int | None = None
+    write_ms: int | None = None
+    rows: int | None = None
+    bytes: int | None = None
+    worker: str | None = None
+    data_generation: int | None = None
+    data_as_of: datetime | None = None
+
+
+class ReportTaskStatus(ReportTaskTelemetry):
     task_id: uuid.UUID
     status: Status = Status.pending
     result_file: str | None = Field(default=None, max_length=255)
     error_message: str | None = None
+    progress: ReportTaskProgress | None = None
+
+
+class ReportEstimate(BaseModel):
+    rows: int
+    scanned_rows: int
+    bytes: int
+    duration_ms: int
+    days: int
+    sharded: bool = False
+    queue: str | None = None
+
+
+class ReportTemplateStats(BaseModel):
+    report_name: str
+    tasks: int
+    p50_ms: float | None = None
+    p95_ms: float | None = None
+    p95_queue_wait_ms: float | None = None
+    avg_rows: float | None = None
+    avg_bytes: float | None = None
+
+
+class ViewRefreshStats(BaseModel):
+    view: str
+    duration_ms: int | None = None
+    rows: int | None = None
+    refreshed_at: int | None = None
+
+
+class RefreshSchedulerStats(BaseModel):
+    checked_at: float | None = None
+    refreshed_at: float | None = None
+    pending_writes: int = 0
+    staleness_seconds: float = 0
+    decisions: dict[str, int]
+    views: list[ViewRefreshStats]
 
 
-class ReportTask(ReportTaskAdd):
+class ReportTask(ReportTaskAdd, ReportTaskTelemetry):
     id: uuid.UUID
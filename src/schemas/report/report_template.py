@@ -1,11 +1,22 @@
 from pydantic import BaseModel, Field
 
+from src.schemas.report.report_view_state import ReportViewState
+
 
 class ReportTemplateAdd(BaseModel):
     name: str = Field(min_length=1, max_length=100)
     description: str | None = None
     allowed_roles: str | None = Field(default=None, max_length=200)
+    statement_timeout_ms: int | None = Field(default=None, gt=0)
+    work_mem: str | None = Field(
+        default=None, max_length=20, pattern=r"^\d+(kB|MB|GB)$"
+    )
 
 
 class ReportTemplate(ReportTemplateAdd):
     id: int
+
+
+class ReportTemplateInfo(ReportTemplate):
+    # свежесть данных, по которым строится отчёт
+    data: ReportViewState | None = None
@@ -0,0 +1,11 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class ReportViewState(BaseModel):
+    view_name: str
+    generation: int
+    refreshed_at: datetime
+    source_max_at: datetime | None = None
+    row_count: int
@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from datetime import date
 from decimal import Decimal
 
+from src.schemas.report.report_task import Granularity
+
 
 class SalesByCustomerParams(BaseModel):
     date_from: date
@@ -12,6 +14,7 @@ class SalesByCustomerParams(BaseModel):
 
     # summary-only option
     top: int | None = None
+    granularity: Granularity | None = None
 
 
 class SalesByCustomerDaily(BaseModel):
@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from datetime import date
 from decimal import Decimal
 
+from src.schemas.report.report_task import Granularity
+
 
 class SalesByProductDailyParams(BaseModel):
     date_from: date
@@ -9,6 +11,7 @@ class SalesByProductDailyParams(BaseModel):
     product_id: int | None = None
     product_name: str | None = None
     top: int | None = None  # топ товаров по total_amount
+    granularity: Granularity | None = None
 
 
 class SalesByCategoryDailyParams(BaseModel):
@@ -17,6 +20,7 @@ class SalesByCategoryDailyParams(BaseModel):
     category_id: int | None = None
     category_name: str | None = None
     top: int | None = None  # топ категорий по total_amount
+    granularity: Granularity | None = None
 
 
 class SalesByProductDaily(BaseModel):
@@ -17,6 +17,7 @@ class AuditAction(str, Enum):
     ROLE_CHANGE_CONFIRM = "ROLE_CHANGE_CONFIRM"
     REPORT_GENERATE = "REPORT_GENERATE"
     REPORT_DOWNLOAD = "REPORT_DOWNLOAD"
+    REPORT_CANCEL = "REPORT_CANCEL"
     ACCESS_DENIED = "ACCESS_DENIED"
 
 
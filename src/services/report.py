@@ -1,21 +1,222 @@
+import uuid
+
 from pydantic import ValidationError
-from exceptions import ReportParametersValidationException
-from schemas.report.report_task import ReportTaskAdd, Status
+from sqlalchemy.exc import NoResultFound
+from exceptions import (
+    ReportNotCancellableException,
+    ReportParametersValidationException,
+    ReportTooLargeException,
+)
+from src.schemas.report.report_bundle import ReportBundleAdd
+from src.schemas.report.report_template import ReportTemplateInfo
+from schemas.report.report_task import (
+    ErrorMessage,
+    ReportFormat,
+    ReportRequest,
+    ReportTaskAdd,
+    Status,
+)
 from src.services.base import BaseService
-from src.tasks.tasks import make_report
+from src.tasks.celery_app import REPORTS_BULK_QUEUE, celery_app
+from src.tasks.tasks import make_report, make_report_bundle
 from src.tasks.report import ReportService
+from src.config import settings
+from src.utils.report_cache import lookup_report
+from src.utils.report_cancel import get_backends, request_cancel
+from src.utils.report_flight import acquire_flight, join_flight
+from src.utils.report_quota import admit_report, fair_share_priority, release_report
 
 
 class ReportServiceS(BaseService):
     async def generate_report_task(
-        self, user_id: int, report_name: str, parameters: dict
+        self,
+        user_id: int,
+        report_name: str,
+        parameters: dict,
+        output_format: ReportFormat = ReportFormat.csv,
+        role: str | None = None,
+    ):
+        # 1-3. Шаблон существует, параметры валидны
+        report_service = ReportService(self.db)
+        report, config, validated_params = await self._validate_request(
+            report_service, report_name, parameters
+        )
+
+        # 4. Готовый результат с теми же параметрами и данными отдаём сразу
+        cache_key = await report_service.report_cache_key(
+            report_name, validated_params, output_format
+        )
+        cached_file = await lookup_report(cache_key, pin=True)
+        state = await config["repository"].view_state() if cached_file else None
+
+        # 5. Квоты пользователя: частота заявок и число задач в работе.
+        # Попадание в кэш тратит только токен частоты
+        new_task_id = uuid.uuid4()
+        active = await admit_report(
+            user_id, role, None if cached_file else str(new_task_id)
+        )
+
+        # место в квоте освобождается, если задача так и не ушла в очередь
+        created_task = None
+        try:
+            # 6. Оценка по плану запроса и допуск: слишком большие отчёты
+            # отклоняются или принудительно уходят в очередь тяжёлых задач
+            estimate = None
+            queue, priority = None, None
+            if not cached_file:
+                estimate = await report_service.estimate_report(
+                    report_name, validated_params
+                )
+                queue, priority = report_service.report_route(
+                    report_name, validated_params, estimate
+                )
+                if self._exceeds_limits(config, estimate):
+                    if settings.REPORT_OVERSIZE_POLICY == "reject":
+                        raise ReportTooLargeException()
+                    queue, priority = (
+                        REPORTS_BULK_QUEUE,
+                        settings.REPORT_BULK_PRIORITY,
+                    )
+                # у кого больше задач в работе, тот пропускает вперёд остальных
+                priority = fair_share_priority(priority, active)
+                estimate.queue = queue
+
+            # 7. Создаём задачу
+            new_task = ReportTaskAdd(
+                id=new_task_id,
+                user_id=user_id,
+                template_id=report.id,
+                status=Status.ready if cached_file else Status.pending,
+                parameters=validated_params.model_dump_json(),
+                result_file=cached_file,
+                format=output_format,
+                queue=queue,
+                priority=priority,
+                data_generation=state.generation if state else None,
+                data_as_of=state.refreshed_at if state else None,
+            )
+
+            task = await self.db.report_task.add(new_task)
+            await self.db.commit()
+            created_task = task
+
+            # 8. Одинаковые запросы в полёте строятся один раз: первый — лидер,
+            # остальные ждут его результат (со страховочной задачей на случай падения лидера)
+            if not cached_file:
+                if await acquire_flight(cache_key, str(created_task.id)):
+                    make_report.apply_async(
+                        args=[created_task.id],
+                        task_id=str(created_task.id),
+                        queue=queue,
+                        priority=priority,
+                    )
+                else:
+                    await join_flight(cache_key, str(created_task.id))
+                    make_report.apply_async(
+                        args=[created_task.id],
+                        task_id=str(created_task.id),
+                        countdown=settings.REPORT_FLIGHT_LEASE_SECONDS,
+                        queue=queue,
+                        priority=priority,
+                    )
+        except Exception:
+            if not cached_file:
+                await release_report(user_id, str(new_task_id))
+                if created_task is not None:
+                    await self._fail_created_task(new_task_id)
+            raise
+
+        return created_task, estimate
+
+    async def _fail_created_task(self, task_id):
+        """Задача записана, но не поставлена в очередь: не оставляем её в pending"""
+        await self.db.rollback()
+        await self.db.report_task.edit(
+            ErrorMessage(error_message="Не удалось поставить задачу в очередь"),
+            id=task_id,
+        )
+        await self.db.commit()
+
+    async def generate_report_bundle(
+        self, user_id, items: list[ReportRequest], role: str | None = None
+    ):
+        """Пакет отчётов одной задачей: все отчёты строятся на общем снимке данных.
+
+        Кэш и single-flight не используются — результат другой задачи может быть
+        построен на другом поколении данных.
+        """
+        report_service = ReportService(self.db)
+        validated = []
+        for item in items:
+            report, config, validated_params = await self._validate_request(
+                report_service, item.report_name, item.parameters
+            )
+            validated.append((item, report, config, validated_params))
+
+        bundle_id = uuid.uuid4()
+        active = await admit_report(user_id, role, str(bundle_id))
+        try:
+            for item, _, config, validated_params in validated:
+                estimate = await report_service.estimate_report(
+                    item.report_name, validated_params
+                )
+                if self._exceeds_limits(config, estimate):
+                    raise ReportTooLargeException()
+        except Exception:
+            await release_report(user_id, str(bundle_id))
+            raise
+        priority = fair_share_priority(settings.REPORT_BULK_PRIORITY, active)
+
+        bundle = await self.db.report_bundle.add(
+            ReportBundleAdd(id=bundle_id, user_id=user_id)
+        )
+        tasks = []
+        for item, report, _, validated_params in validated:
+            # очередь не указывается: отчёты пакета не стареют и не запускаются поодиночке
+            tasks.append(
+                await self.db.report_task.add(
+                    ReportTaskAdd(
+                        user_id=user_id,
+                        template_id=report.id,
+                        parameters=validated_params.model_dump_json(),
+                        format=item.format,
+                        priority=priority,
+                        bundle_id=bundle_id,
+                    )
+                )
+            )
+        await self.db.commit()
+
+        make_report_bundle.apply_async(
+            args=[bundle_id],
+            task_id=str(bundle_id),
+            queue=REPORTS_BULK_QUEUE,
+            priority=priority,
+        )
+        return bundle, tasks
+
+    async def templates_info(self) -> list[ReportTemplateInfo]:
+        """Шаблоны отчётов со свежестью данных их представлений"""
+        report_config = ReportService(self.db).report_config
+        templates = []
+        for template in await self.db.report_template.get_all():
+            config = report_config.get(template.name)
+            templates.append(
+                ReportTemplateInfo(
+                    **template.model_dump(),
+                    data=await config["repository"].view_state() if config else None,
+                )
+            )
+        return templates
+
+    async def _validate_request(
+        self, report_service: ReportService, report_name: str, parameters: dict
     ):
         # 1. Проверяем, что шаблон существует
         report = await self.db.report_template.get_one_or_none(name=report_name)
         if report is None:
             raise ValueError(f"Шаблон '{report_name}' не найден")
 
-        report_service = ReportService(self.db)
         config = report_service.report_config.get(report_name)
         if not config:
             raise ReportParametersValidationException()
@@ -29,18 +230,41 @@ class ReportServiceS(BaseService):
         date_to = getattr(validated_params, "date_to", None)
         if date_from and date_to and date_from > date_to:
             raise ReportParametersValidationException()
+        return report, config, validated_params
 
-        # 4. Создаём задачу
-        new_task = ReportTaskAdd(
-            user_id=user_id,
-            template_id=report.id,
-            status=Status.pending,
-            parameters=validated_params.model_dump_json(),
-        )
+    async def cancel_report_task(self, task):
+        """Отмена задачи: статус cancelled, отзыв сообщений Celery и отмена запроса в БД.
 
-        created_task = await self.db.report_task.add(new_task)
+        Выполняющийся воркер видит флаг отмены между пачками или получает ошибку
+        от pg_cancel_backend, после чего удаляет недописанный файл.
+        """
+        if task.status != Status.pending:
+            raise ReportNotCancellableException()
+        await request_cancel(str(task.id))
+        try:
+            # воркер мог успеть завершить задачу после проверки статуса
+            cancelled = await self.db.report_task.edit(
+                ErrorMessage(
+                    status=Status.cancelled, error_message="Отменено пользователем"
+                ),
+                id=task.id,
+                status=Status.pending,
+            )
+        except NoResultFound:
+            raise ReportNotCancellableException()
         await self.db.commit()
+        # id задачи Celery совпадает с id отчёта, поэтому отзываются и повторные сообщения
+        celery_app.control.revoke(str(task.id))
+        await self.db.report_task.cancel_backends(await get_backends(str(task.id)))
+        await release_report(task.user_id, str(task.id))
+        return cancelled
 
-        make_report.delay(created_task.id)
-
-        return created_task
+    @staticmethod
+    def _exceeds_limits(config: dict, estimate) -> bool:
+        """Лимиты защищают БД от случайных выгрузок всей истории"""
+        if not config["is_summary"] and estimate.days > settings.REPORT_MAX_RANGE_DAYS:
+            return True
+        return (
+            estimate.rows > settings.REPORT_MAX_ESTIMATED_ROWS
+            or estimate.bytes > settings.REPORT_MAX_ESTIMATED_BYTES
+        )
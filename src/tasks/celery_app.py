@@ -1,6 +1,27 @@
 from celery import Celery
+from kombu import Exchange, Queue
+
 from src.config import settings
 
+# Очереди: быстрые отчёты не ждут тяжёлые выгрузки, письма и обслуживание MV — отдельно
+REPORTS_FAST_QUEUE = "reports_fast"
+REPORTS_BULK_QUEUE = "reports_bulk"
+EMAIL_QUEUE = "email"
+MAINTENANCE_QUEUE = "maintenance"
+
+# В Redis-брокере 0 — наивысший приоритет
+PRIORITY_HIGHEST = 0
+PRIORITY_LOWEST = 9
+
+# Топология воркеров: какие очереди слушает каждый тип воркера и с какой конкурентностью.
+# Запуск: celery --app=src.tasks.celery_app:celery_app worker -Q <queues> -c <concurrency>
+WORKER_TOPOLOGY = {
+    "fast": {"queues": [REPORTS_FAST_QUEUE], "concurrency": 4},
+    "bulk": {"queues": [REPORTS_BULK_QUEUE], "concurrency": 2},
+    "email": {"queues": [EMAIL_QUEUE], "concurrency": 2},
+    "maintenance": {"queues": [MAINTENANCE_QUEUE], "concurrency": 1},
+}
+
 celery_app = Celery(
     "tasks",
     broker=settings.REDIS_URL,
@@ -10,9 +31,46 @@ celery_app = Celery(
         "src.tasks.email_tasks",
     ],
 )
+celery_app.conf.update(
+    task_queues=[
+        Queue(name, Exchange(name), routing_key=name)
+        for name in (
+            REPORTS_FAST_QUEUE,
+            REPORTS_BULK_QUEUE,
+            EMAIL_QUEUE,
+            MAINTENANCE_QUEUE,
+        )
+    ],
+    task_default_queue=REPORTS_FAST_QUEUE,
+    task_routes={
+        "make_report": {"queue": REPORTS_FAST_QUEUE},
+        "send_verification_email": {"queue": EMAIL_QUEUE},
+        "send_role_change_email_task": {"queue": EMAIL_QUEUE},
+        "send_report_ready_email": {"queue": EMAIL_QUEUE},
+        "refresh_materialized_views": {"queue": MAINTENANCE_QUEUE},
+        "check_refresh": {"queue": MAINTENANCE_QUEUE},
+        "age_report_tasks": {"queue": MAINTENANCE_QUEUE},
+        "make_report_bundle": {"queue": REPORTS_BULK_QUEUE},
+    },
+    broker_transport_options={
+        "priority_steps": list(range(PRIORITY_LOWEST + 1)),
+        "queue_order_strategy": "priority",
+    },
+    task_default_priority=PRIORITY_LOWEST // 2,
+    # длинная задача не должна держать у себя очередь предвыбранных сообщений
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+)
 celery_app.conf.beat_schedule = {
-    "refresh_mv": {
-        "task": "refresh_materialized_views",
-        "schedule": 3600.0,  # every hour
-    }
+    # обновление запускается по объёму записей, см. src/utils/refresh_scheduler.py
+    "check_refresh": {
+        "task": "check_refresh",
+        "schedule": float(settings.REPORT_REFRESH_CHECK_SECONDS),
+        # проверки, не дождавшиеся очереди за долгим обновлением, не копятся
+        "options": {"expires": float(settings.REPORT_REFRESH_CHECK_SECONDS)},
+    },
+    "age_report_tasks": {
+        "task": "age_report_tasks",
+        "schedule": float(settings.REPORT_AGING_CHECK_SECONDS),
+    },
 }
@@ -1,18 +1,111 @@
 # services/report.py
+import asyncio
 import json
-import csv
+import logging
 import os
+import socket
+import time
+from contextlib import AsyncExitStack
+from datetime import date, datetime, timezone
 
+from asyncpg.exceptions import QueryCanceledError
 from pydantic_core import ValidationError
-from src.schemas.report.payments_by_method import PaymentsReportParams
-from src.schemas.report.sales_by_customer import SalesByCustomerParams
+from sqlalchemy import func, insert, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from src.schemas.report.payments_by_method import (
+    PaymentsByMethodDaily,
+    PaymentsByMethodSummary,
+    PaymentsReportParams,
+)
+from src.schemas.report.sales_by_customer import (
+    SalesByCustomerDaily,
+    SalesByCustomerParams,
+    SalesByCustomerSummary,
+)
 from src.schemas.report.sales_by_product_category_daily import (
+    SalesByCategoryDaily,
     SalesByCategoryDailyParams,
+    SalesByCategorySummary,
+    SalesByProductDaily,
     SalesByProductDailyParams,
+    SalesByProductSummary,
+)
+from src.schemas.report.report_task import (
+    ErrorMessage,
+    ReportEstimate,
+    ReportFormat,
+    ReportTaskFinished,
+    ReportTaskRoute,
+    Status,
+)
+from src.schemas.report.report_bundle import ReportBundleFinished, ReportBundleStarted
+from src.schemas.report.sales_daily import SalesDaily, SalesDailyParams, SalesSummary
+from src.config import settings
+from src.exceptions import ReportCancelledException
+from src.models.report.report_task import ReportTaskORM
+from src.tasks.celery_app import (
+    PRIORITY_HIGHEST,
+    REPORTS_BULK_QUEUE,
+    REPORTS_FAST_QUEUE,
+    celery_app,
 )
-from src.schemas.report.report_task import ErrorMessage, ReportTaskReady, Status
-from src.schemas.report.sales_daily import SalesDailyParams
 from src.utils.db_manager import DBManager
+from src.utils.report_cache import (
+    lookup_report,
+    pin_report,
+    report_cache_key,
+    store_report,
+)
+from src.utils.report_estimate import (
+    get_view_throughput,
+    plan_estimate,
+    range_days,
+    record_view_throughput,
+)
+from src.utils.report_flight import (
+    claim_task,
+    acquire_flight,
+    hold_flight,
+    join_flight,
+    pop_followers,
+)
+from src.utils.report_shards import (
+    SHARD_WEIGHT_COLUMN,
+    merge_part_files,
+    reaggregate,
+    split_date_range,
+)
+from src.utils.report_batch import (
+    SCAN_TABLE,
+    date_column,
+    join_batch,
+    merge_ranges,
+    retarget,
+    scan_table,
+    take_batch,
+)
+from src.utils.report_cancel import (
+    clear_backends,
+    is_cancel_requested,
+    register_backend,
+)
+from src.utils.report_chunks import (
+    SUMMARY_CHUNK_EXTENSION,
+    chunk_key,
+    get_chunk_rows,
+    get_month_fingerprints,
+    load_summary_chunk,
+    month_key,
+    month_ranges,
+    register_chunk,
+    save_summary_chunk,
+)
+from src.utils.report_cube import CUBES, cube_summary, load_cube
+from src.utils.report_compression import compression_suffix, open_compressed
+from src.utils.report_serializer import build_column_plan
+from src.utils.report_quota import heavy_slot, release_report
+from src.utils.report_telemetry import ExportStats, clear_progress
+from src.utils.report_writer import REPORT_WRITERS, ReportWriter, copy_select
 from src.database import async_session_maker_null_pооl
 from src.tasks.email_tasks import send_report_ready_email_task
 
@@ -24,98 +117,579 @@ class ReportService:
         self.report_config = {
             "daily_sales": {
                 "param_model": SalesDailyParams,
-                "db_method": self.db.sales_daily.get_sales_daily,
+                "repository": self.db.sales_daily,
+                "query_method": self.db.sales_daily.sales_daily_query,
+                "row_schema": SalesDaily,
                 "is_summary": False,
             },
             "daily_sales_summary": {
                 "param_model": SalesDailyParams,
-                "db_method": self.db.sales_daily.get_sales_summary,
+                "repository": self.db.sales_daily,
+                "query_method": self.db.sales_daily.sales_summary_query,
+                "row_schema": SalesSummary,
                 "is_summary": True,
+                "cube": "sales",
             },
             "sales_by_categories": {
                 "param_model": SalesByCategoryDailyParams,
-                "db_method": self.db.product_category_daily.get_sales_by_category_daily,
+                "repository": self.db.product_category_daily,
+                "query_method": self.db.product_category_daily.sales_by_category_daily_query,
+                "row_schema": SalesByCategoryDaily,
                 "is_summary": False,
             },
             "sales_by_categories_summary": {
                 "param_model": SalesByCategoryDailyParams,
-                "db_method": self.db.product_category_daily.get_sales_by_category_summary,
+                "repository": self.db.product_category_daily,
+                "query_method": self.db.product_category_daily.sales_by_category_summary_query,
+                "row_schema": SalesByCategorySummary,
                 "is_summary": True,
+                "cube": "categories",
+                "order_column": "total_amount",
             },
             "sales_by_products": {
                 "param_model": SalesByProductDailyParams,
-                "db_method": self.db.product_category_daily.get_sales_by_product_daily,
+                "repository": self.db.product_category_daily,
+                "query_method": self.db.product_category_daily.sales_by_product_daily_query,
+                "row_schema": SalesByProductDaily,
                 "is_summary": False,
             },
             "sales_by_products_summary": {
                 "param_model": SalesByProductDailyParams,
-                "db_method": self.db.product_category_daily.get_sales_by_product_summary,
+                "repository": self.db.product_category_daily,
+                "query_method": self.db.product_category_daily.sales_by_product_summary_query,
+                "row_schema": SalesByProductSummary,
                 "is_summary": True,
+                "cube": "products",
+                "order_column": "total_amount",
             },
             "customers": {
                 "param_model": SalesByCustomerParams,
-                "db_method": self.db.sales_by_customer_daily.get_sales_by_customer_daily,
+                "repository": self.db.sales_by_customer_daily,
+                "query_method": self.db.sales_by_customer_daily.sales_by_customer_daily_query,
+                "row_schema": SalesByCustomerDaily,
                 "is_summary": False,
             },
             "customers_summary": {
                 "param_model": SalesByCustomerParams,
-                "db_method": self.db.sales_by_customer_daily.get_sales_by_customer_summary,
+                "repository": self.db.sales_by_customer_daily,
+                "query_method": self.db.sales_by_customer_daily.sales_by_customer_summary_query,
+                "row_schema": SalesByCustomerSummary,
                 "is_summary": True,
+                "cube": "customers",
+                "order_column": "total_amount",
             },
             "payments": {
                 "param_model": PaymentsReportParams,
-                "db_method": self.db.payments.get_payments_daily,
+                "repository": self.db.payments,
+                "query_method": self.db.payments.payments_daily_query,
+                "row_schema": PaymentsByMethodDaily,
                 "is_summary": False,
             },
             "payments_summary": {
                 "param_model": PaymentsReportParams,
-                "db_method": self.db.payments.get_payments_summary,
+                "repository": self.db.payments,
+                "query_method": self.db.payments.payments_summary_query,
+                "row_schema": PaymentsByMethodSummary,
                 "is_summary": True,
+                "cube": "payments",
+                "order_column": "total_payments",
             },
         }
 
-    async def _save_report_to_csv(self, task_id: str, data, is_summary: bool = False):
-        """Универсальный метод сохранения отчета в CSV, работает с одним объектом или списком объектов"""
-        if not data:
-            await self.db.report_task.edit(
-                data=ErrorMessage(error_message="Нет данных для отчета"), id=task_id
+    async def _save_report(
+        self, writer: ReportWriter, batches, stats: ExportStats | None = None
+    ):
+        """Потоковое сохранение отчета через writer, возвращает число строк.
+
+        Выборка, форматирование и запись работают конвейером: пока очередная
+        пачка пишется в файл (в отдельном потоке), следующая уже читается из курсора.
+        Время ожидания курсора и время записи копятся в stats раздельно.
+        """
+        stats = stats or ExportStats()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.REPORT_PIPELINE_DEPTH)
+
+        async def fetch():
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        batch = await anext(batches)
+                    except StopAsyncIteration:
+                        break
+                    stats.query_seconds += time.perf_counter() - started
+                    await queue.put(batch)
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(fetch())
+        try:
+            while (batch := await queue.get()) is not None:
+                started = time.perf_counter()
+                await asyncio.to_thread(writer.write_batch, batch)
+                stats.write_seconds += time.perf_counter() - started
+                await stats.add(rows=len(batch))
+            await producer
+        finally:
+            producer.cancel()
+            writer.close()
+        return writer.rows
+
+    async def _copy_report_to_csv(
+        self,
+        file_path: str,
+        repository,
+        query,
+        compression: str | None = None,
+        stats: ExportStats | None = None,
+    ):
+        """Быстрая выгрузка детального отчёта через COPY прямо в файл.
+
+        Поток COPY (при необходимости сжимаясь) пишется кусками по мере поступления.
+        """
+        stats = stats or ExportStats()
+        started = time.perf_counter()
+        write_seconds = 0.0
+        with open_compressed(file_path, compression) as sink:
+
+            async def write(chunk: bytes):
+                nonlocal write_seconds
+                write_started = time.perf_counter()
+                sink.write(chunk)
+                write_seconds += time.perf_counter() - write_started
+                await stats.add(bytes=len(chunk))
+
+            rows = await repository.copy_to(copy_select(query), write)
+        stats.write_seconds += write_seconds
+        stats.query_seconds += time.perf_counter() - started - write_seconds
+        await stats.add(rows=rows)
+        return rows
+
+    async def _export_query(
+        self,
+        file_path: str,
+        repository,
+        query,
+        is_summary: bool,
+        output_format: str = ReportFormat.csv,
+        compression: str | None = None,
+        row_schema=None,
+        stats: ExportStats | None = None,
+    ):
+        # детальные CSV-отчёты — через COPY, остальные — потоком из курсора
+        if (
+            output_format == ReportFormat.csv
+            and settings.REPORT_EXPORT_ENGINE == "copy"
+            and not is_summary
+        ):
+            return await self._copy_report_to_csv(
+                file_path, repository, query, compression, stats
             )
-            await self.db.commit()
+        writer = REPORT_WRITERS[output_format](
+            file_path,
+            build_column_plan(row_schema, list(query.selected_columns.keys())),
+            compression,
+        )
+        return await self._save_report(writer, repository.stream(query), stats)
+
+    async def report_cache_key(
+        self, report_name: str, validated_params, output_format: str
+    ) -> str:
+        """Ключ кэша результата с учётом текущего поколения данных представления"""
+        state = await self.report_config[report_name]["repository"].view_state()
+        return report_cache_key(
+            report_name,
+            validated_params.model_dump(mode="json"),
+            ReportFormat(output_format).value,
+            state.generation if state else 0,
+        )
+
+    def report_route(
+        self,
+        report_name: str,
+        validated_params,
+        estimate: ReportEstimate | None = None,
+    ) -> tuple[str, int]:
+        """Очередь и приоритет задачи по оценке стоимости.
+
+        Сводные отчёты и короткие диапазоны — в быструю очередь, длинные
+        детальные выгрузки и всё, что по плану сканирует много строк, —
+        в очередь тяжёлых задач.
+        """
+        config = self.report_config[report_name]
+        if (
+            estimate is not None
+            and estimate.scanned_rows >= settings.REPORT_BULK_MIN_ESTIMATED_ROWS
+        ):
+            return REPORTS_BULK_QUEUE, settings.REPORT_BULK_PRIORITY
+        days = range_days(
+            getattr(validated_params, "date_from", None),
+            getattr(validated_params, "date_to", None),
+        )
+        if config["is_summary"] or days <= settings.REPORT_FAST_MAX_DAYS:
+            return REPORTS_FAST_QUEUE, settings.REPORT_FAST_PRIORITY
+        return REPORTS_BULK_QUEUE, settings.REPORT_BULK_PRIORITY
+
+    async def estimate_report(
+        self, report_name: str, validated_params
+    ) -> ReportEstimate:
+        """Предварительная оценка отчёта по EXPLAIN: строки, объём файла и длительность.
+
+        Длительность — строки самого большого узла плана, делённые на наблюдаемую
+        скорость выгрузки представления (см. record_view_throughput).
+        """
+        config = self.report_config[report_name]
+        params = validated_params.model_dump()
+        query = config["query_method"](**params)
+        output_rows, scanned_rows, width = plan_estimate(
+            await config["repository"].explain(query)
+        )
+        throughput = await get_view_throughput(config["repository"].model.__tablename__)
+        days = range_days(params.get("date_from"), params.get("date_to"))
+        return ReportEstimate(
+            rows=output_rows,
+            scanned_rows=scanned_rows,
+            # ширина строки плюс разделители и перевод строки
+            bytes=output_rows * (width + len(query.selected_columns)),
+            duration_ms=int(scanned_rows / throughput * 1000),
+            days=days,
+            sharded=days > settings.REPORT_SHARD_DAYS
+            and scanned_rows >= settings.REPORT_SHARD_ROW_THRESHOLD,
+        )
+
+    @staticmethod
+    def _by_period(config: dict, params: dict) -> bool:
+        """Детальный отчёт со строками за периоды: границы шардов резали бы периоды"""
+        return not config["is_summary"] and params.get("granularity") not in (
+            None,
+            "day",
+        )
+
+    async def _use_shards(self, config: dict, query, params: dict) -> bool:
+        """Шардирование включается для длинных диапазонов с большой оценкой строк"""
+        days = range_days(params["date_from"], params["date_to"])
+        if days <= settings.REPORT_SHARD_DAYS:
+            return False
+        rows = await config["repository"].estimate_rows(query)
+        return rows >= settings.REPORT_SHARD_ROW_THRESHOLD
+
+    async def _build_sharded(
+        self,
+        file_path: str,
+        config: dict,
+        params: dict,
+        writer_class,
+        compression: str | None = None,
+        stats: ExportStats | None = None,
+        limits: tuple[int, str] | None = None,
+        shards: list[tuple] | None = None,
+        chunks: list[tuple[str, str] | None] | None = None,
+    ):
+        """Параллельное построение по интервалам дат на отдельных соединениях.
+
+        Детальные отчёты пишутся в несжатые part-файлы и склеиваются в порядке дат,
+        сводные — собираются в памяти и пересворачиваются через reaggregate.
+        Сжимается только итоговый файл.
+
+        chunks — (ключ, месяц) для интервалов-месяцев из кэша кусков: готовый кусок
+        берётся из кэша, посчитанный заново — сохраняется в него.
+        """
+        shards = shards or split_date_range(
+            params["date_from"], params["date_to"], settings.REPORT_SHARD_DAYS
+        )
+        chunks = chunks or [None] * len(shards)
+        semaphore = asyncio.Semaphore(settings.REPORT_SHARD_PARALLELISM)
+        repository_class = type(config["repository"])
+        view = config["repository"].model.__tablename__
+        is_summary = config["is_summary"]
+        stats = stats or ExportStats()
+
+        async def run_shard(index: int, date_from, date_to, chunk):
+            if chunk and (cached := await lookup_report(chunk[0])):
+                if is_summary:
+                    return await asyncio.to_thread(load_summary_chunk, cached)
+                rows = await get_chunk_rows(chunk[0])
+                if rows is not None:
+                    return cached, rows
+
+            shard_params = {**params, "date_from": date_from, "date_to": date_to}
+            if is_summary and "top" in shard_params:
+                shard_params["top"] = None
+            query = config["query_method"](**shard_params)
+            async with semaphore:
+                async with DBManager(session_factory=self.db.session_factory) as db:
+                    await self._prepare_session(db, stats.task_id, limits)
+                    repository = repository_class(db.session)
+                    if is_summary:
+                        query = query.add_columns(
+                            func.count().label(SHARD_WEIGHT_COLUMN)
+                        )
+                        rows = []
+                        started = time.perf_counter()
+                        async for batch in repository.stream(query):
+                            rows.extend(batch)
+                        stats.query_seconds += time.perf_counter() - started
+                        columns = list(query.selected_columns.keys())
+                        if chunk:
+                            chunk_path = f"{file_path}.chunk{index}"
+                            await asyncio.to_thread(
+                                save_summary_chunk, chunk_path, columns, rows
+                            )
+                            await store_report(
+                                chunk[0], None, chunk_path, SUMMARY_CHUNK_EXTENSION
+                            )
+                            await register_chunk(view, chunk[1], chunk[0], len(rows))
+                        return columns, rows
+                    part_path = f"{file_path}.part{index}"
+                    rows = await self._export_query(
+                        part_path,
+                        repository,
+                        query,
+                        False,
+                        row_schema=config["row_schema"],
+                        stats=stats,
+                    )
+                    if chunk:
+                        part_path = await store_report(
+                            chunk[0],
+                            None,
+                            part_path,
+                            self._report_extension(ReportFormat.csv, None),
+                        )
+                        await register_chunk(view, chunk[1], chunk[0], rows)
+                    return part_path, rows
+
+        part_paths = [f"{file_path}.part{i}" for i in range(len(shards))]
+        part_paths += [f"{file_path}.chunk{i}" for i in range(len(shards))]
+        try:
+            results = await asyncio.gather(
+                *(
+                    run_shard(i, *shard, chunk)
+                    for i, (shard, chunk) in enumerate(zip(shards, chunks))
+                )
+            )
+            started = time.perf_counter()
+            if is_summary:
+                columns, rows = reaggregate(
+                    results[0][0],
+                    [row for _, shard_rows in results for row in shard_rows],
+                    config.get("order_column"),
+                    params.get("top"),
+                )
+                writer = writer_class(
+                    file_path,
+                    build_column_plan(config["row_schema"], columns),
+                    compression,
+                )
+                writer.write_batch(rows)
+                writer.close()
+                stats.write_seconds += time.perf_counter() - started
+                return writer.rows
+
+            await asyncio.to_thread(
+                merge_part_files,
+                [part_path for part_path, _ in results],
+                file_path,
+                params.get("top"),
+                compression,
+            )
+            stats.write_seconds += time.perf_counter() - started
+            rows = sum(shard_rows for _, shard_rows in results)
+            return min(rows, params["top"]) if params.get("top") else rows
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+
+    @staticmethod
+    def _cube_name(config: dict, params: dict) -> str | None:
+        """Куб, которым можно ответить на сводку.
+
+        Фильтры по подстроке имени куб не покрывает — для них остаётся SQL.
+        """
+        if not settings.REPORT_CUBE_ENABLED or not config.get("cube"):
             return None
+        if any(value for name, value in params.items() if name.endswith("_name")):
+            return None
+        return config["cube"]
+
+    async def _cube_summary(self, config: dict, params: dict):
+        """Сводка из куба или None, если её нужно считать в SQL"""
+        name = self._cube_name(config, params)
+        if name is None:
+            return None
+        spec = CUBES[name]
+        return await asyncio.to_thread(
+            cube_summary,
+            spec.name,
+            params["date_from"],
+            params["date_to"],
+            params.get(spec.key_column) if spec.key_column else None,
+            params.get("top"),
+        )
+
+    async def _chunk_plan(self, config: dict, params: dict, output_format: str):
+        """Интервалы-месяцы и ключи кусков, если отчёт можно собрать из кэша кусков.
 
+        Кэшируются только закрытые целые месяцы с известным отпечатком данных;
+        детальный отчёт — только CSV без top (куски склеиваются как CSV-части).
+        """
+        if not settings.REPORT_CHUNK_CACHE or "date_from" not in params:
+            return None
+        if self._by_period(config, params):
+            return None
+        if not config["is_summary"] and (
+            output_format != ReportFormat.csv or params.get("top")
+        ):
+            return None
+        view = config["repository"].model.__tablename__
+        report = f"{view}.{config['query_method'].__name__}"
+        filters = {
+            key: value
+            for key, value in params.items()
+            if key not in ("date_from", "date_to", "top")
+        }
+        current_month = month_key(date.today())
+        fingerprints = await get_month_fingerprints(view)
+
+        shards, chunks = [], []
+        for start, end, whole in month_ranges(params["date_from"], params["date_to"]):
+            month = month_key(start)
+            fingerprint = fingerprints.get(month)
+            shards.append((start, end))
+            if whole and month < current_month and fingerprint:
+                chunks.append((chunk_key(report, filters, month, fingerprint), month))
+            else:
+                chunks.append(None)
+        if not any(chunks):
+            return None
+        return shards, chunks
+
+    @staticmethod
+    def _report_compression(output_format: str) -> str | None:
+        # колоночные форматы сжаты внутри, отдельно сжимаем только CSV
+        if (
+            output_format == ReportFormat.csv
+            and settings.REPORT_CSV_COMPRESSION != "none"
+        ):
+            return settings.REPORT_CSV_COMPRESSION
+        return None
+
+    @staticmethod
+    def _report_extension(output_format: str, compression: str | None) -> str:
+        """Суффикс артефакта: расширение формата и суффикс сжатия"""
+        extension = REPORT_WRITERS[output_format].extension
+        return f".{extension}{compression_suffix(compression)}"
+
+    @classmethod
+    def _report_file(cls, task_id: str, output_format: str) -> tuple[str, str | None]:
+        """Путь артефакта задачи и его сжатие"""
+        compression = cls._report_compression(output_format)
         os.makedirs("report", exist_ok=True)
-        file_path = f"report/{task_id}.csv"
+        file_path = (
+            f"report/{task_id}{cls._report_extension(output_format, compression)}"
+        )
+        return file_path, compression
 
-        # Преобразуем в список, если это один объект
-        if is_summary and not isinstance(data, list):
-            data_list = [data]
-        elif isinstance(data, list):
-            data_list = data
-        else:
-            data_list = [data]
-
-        # Преобразуем объекты Pydantic в словари
-        dicts = []
-        for item in data_list:
-            d = item.model_dump() if hasattr(item, "model_dump") else dict(item)
-            # округляем числовые значения
-            for key, value in d.items():
-                if isinstance(value, (int, float)) and value is not None:
-                    if key in ["total_amount", "avg_check", "total_payments"]:
-                        d[key] = round(float(value), 2)
-                    elif key in ["total_quantity", "total_orders", "total_items"]:
-                        d[key] = int(value)
-            dicts.append(d)
-
-        headers = dicts[0].keys()
-        with open(file_path, mode="w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers, delimiter=";")
-            writer.writeheader()
-            writer.writerows(dicts)
+    async def _build_report(
+        self,
+        task_id: str,
+        config: dict,
+        validated_params,
+        output_format: str,
+        stats: ExportStats,
+        limits: tuple[int, str] | None = None,
+    ):
+        writer_class = REPORT_WRITERS[output_format]
+        file_path, compression = self._report_file(task_id, output_format)
 
+        started = time.perf_counter()
+        params = validated_params.model_dump()
+        query = config["query_method"](**params)
+        await self._prepare_session(self.db, stats.task_id, limits)
+        try:
+            # детальные шарды склеиваются как CSV-части, поэтому колоночные форматы
+            # шардируются только для сводных отчётов
+            shardable = (
+                config["is_summary"] or output_format == ReportFormat.csv
+            ) and not self._by_period(config, params)
+            cube = await self._cube_summary(config, params)
+            chunk_plan = None
+            if cube is None:
+                chunk_plan = await self._chunk_plan(config, params, output_format)
+            if cube is not None:
+                columns, cube_rows = cube
+                writer = writer_class(
+                    file_path,
+                    build_column_plan(config["row_schema"], columns),
+                    compression,
+                )
+                await asyncio.to_thread(writer.write_batch, cube_rows)
+                writer.close()
+                rows = writer.rows
+            elif chunk_plan:
+                rows = await self._build_sharded(
+                    file_path,
+                    config,
+                    params,
+                    writer_class,
+                    compression,
+                    stats,
+                    limits,
+                    *chunk_plan,
+                )
+            elif shardable and await self._use_shards(config, query, params):
+                rows = await self._build_sharded(
+                    file_path,
+                    config,
+                    params,
+                    writer_class,
+                    compression,
+                    stats,
+                    limits,
+                )
+            else:
+                rows = await self._export_query(
+                    file_path,
+                    config["repository"],
+                    query,
+                    config["is_summary"],
+                    output_format,
+                    compression,
+                    config["row_schema"],
+                    stats,
+                )
+        except BaseException:
+            # недописанный файл отменённой или упавшей выгрузки не нужен
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        finally:
+            await clear_backends(str(task_id))
+        elapsed = time.perf_counter() - started
+        stats.rows = rows
+
+        if not rows:
+            os.remove(file_path)
+            return None
+
+        size = os.path.getsize(file_path)
+        logging.info(
+            f"Report {task_id} written: format={output_format} "
+            f"compression={compression or 'none'} rows={rows} bytes={size} "
+            f"seconds={elapsed:.3f} query_ms={stats.query_ms} "
+            f"write_ms={stats.write_ms} rows_per_sec={rows / max(elapsed, 1e-6):.0f} "
+            f"mb_per_sec={size / 1024**2 / max(elapsed, 1e-6):.2f}"
+        )
         return file_path
 
-    async def make_report(self, task_id: str, report_name: str, params: dict):
+    async def make_report(
+        self,
+        task_id: str,
+        report_name: str,
+        params: dict,
+        output_format: str = ReportFormat.csv,
+        limits: tuple[int, str] | None = None,
+    ):
         """Универсальный метод создания отчета"""
         config = self.report_config.get(report_name)
         if not config:
@@ -124,41 +698,454 @@ class ReportService:
         try:
             validated_params = config["param_model"](**params)
         except ValidationError as e:
-            print(f"Ошибка валидации параметров: {e}")
+            await self._fail_task(task_id, e)
             return
 
-        # Получаем данные
-        sales_data = await config["db_method"](**validated_params.model_dump())
+        # Такой же отчёт мог быть построен, пока задача ждала в очереди
+        cache_key = await self.report_cache_key(
+            report_name, validated_params, output_format
+        )
+        file_path = await lookup_report(cache_key, pin=True)
+        followers = []
+        stats = ExportStats(str(task_id))
+        if file_path is None:
+            if not await acquire_flight(cache_key, str(task_id)):
+                # Такой же отчёт уже строит другая задача — ждём её результат
+                await join_flight(cache_key, str(task_id))
+                queue, priority = self.report_route(report_name, validated_params)
+                celery_app.send_task(
+                    "make_report",
+                    args=[str(task_id)],
+                    task_id=str(task_id),
+                    countdown=settings.REPORT_FLIGHT_LEASE_SECONDS,
+                    queue=queue,
+                    priority=priority,
+                )
+                return None
+
+            try:
+                async with hold_flight(cache_key, str(task_id)):
+                    file_path = await self._build_report(
+                        task_id, config, validated_params, output_format, stats, limits
+                    )
+                    if file_path and not config["is_summary"]:
+                        await record_view_throughput(
+                            config["repository"].model.__tablename__,
+                            stats.rows,
+                            time.perf_counter() - stats.started,
+                        )
+                    if file_path:
+                        file_path = await store_report(
+                            cache_key,
+                            config["repository"].model.__tablename__,
+                            file_path,
+                            self._report_extension(
+                                output_format, self._report_compression(output_format)
+                            ),
+                        )
+                    followers = await pop_followers(cache_key)
+            except (ReportCancelledException, DBAPIError, QueryCanceledError) as exc:
+                if not self._is_cancellation(exc):
+                    raise
+                await self._abort_task(task_id)
+                return None
 
-        # Сохраняем отчет
-        file_path = await self._save_report_to_csv(
-            task_id, sales_data, config["is_summary"]
+        for follower_id in followers:
+            if follower_id != str(task_id):
+                await self._finish_task(
+                    follower_id, report_name, file_path, rows=stats.rows or None
+                )
+        await self._finish_task(
+            task_id,
+            report_name,
+            file_path,
+            rows=stats.rows or None,
+            query_ms=stats.query_ms,
+            write_ms=stats.write_ms,
         )
 
-        if file_path:
+    async def _finish_task(
+        self,
+        task_id: str,
+        report_name: str,
+        file_path: str | None,
+        rows: int | None = None,
+        query_ms: int | None = None,
+        write_ms: int | None = None,
+        notify: bool = True,
+    ):
+        """Отмечает задачу готовой (или пустой), сохраняет телеметрию и отправляет письмо владельцу"""
+        task = await self.db.report_task.get_one_or_none(id=task_id)
+        if task is None:
+            return
+        await release_report(task.user_id, str(task_id))
+        if task.status != Status.pending:
+            return
+
+        if not file_path:
             await self.db.report_task.edit(
-                ReportTaskReady(status=Status.ready, result_file=file_path), id=task_id
+                data=ErrorMessage(error_message="Нет данных для отчета"), id=task_id
             )
             await self.db.commit()
-        if not file_path:
-            return None
+            await clear_progress(task_id)
+            return
+
+        # объект закреплён за задачей, пока её результат можно скачать
+        await pin_report(file_path)
+        if not os.path.exists(file_path):
+            await self._fail_task(
+                task_id,
+                FileNotFoundError(f"Файл отчёта вытеснен из хранилища: {file_path}"),
+            )
+            return
+        state = await self.report_config[report_name]["repository"].view_state()
+        await self.db.report_task.edit(
+            ReportTaskFinished(
+                status=Status.ready,
+                result_file=file_path,
+                rows=rows,
+                bytes=os.path.getsize(file_path),
+                query_ms=query_ms,
+                write_ms=write_ms,
+                data_generation=state.generation if state else None,
+                data_as_of=state.refreshed_at if state else None,
+            ),
+            id=task_id,
+        )
+        await self.db.commit()
+        await clear_progress(task_id)
+        if not notify:
+            return
 
-        task = await self.db.report_task.get_one_or_none(id=task_id)
         report_link = f"http://127.0.0.1:8000/report/download/{task_id}"
-        if task:
-            user = await self.db.user.get_one_or_none(id=task.user_id)
-            if user and user.email:
-                send_report_ready_email_task.delay(
-                    to_email=user.email,
-                    report_name=report_name,
-                    report_link=report_link,
-                )
+        user = await self.db.user.get_one_or_none(id=task.user_id)
+        if user and user.email:
+            send_report_ready_email_task.delay(
+                to_email=user.email,
+                report_name=report_name,
+                report_link=report_link,
+            )
 
     async def make_report_h(self, task_id: str):
         """Основной метод обработки задачи отчета"""
+        async with claim_task(str(task_id)) as claimed:
+            if not claimed:
+                # дубль сообщения, задача уже выполняется другим воркером
+                return
+            task = await self.db.report_task.get_one_or_none(id=task_id)
+            if not task:
+                raise ValueError(f"Task with id {task_id} not found")
+            if task.status != Status.pending:
+                # задача уже получила результат от лидера single-flight
+                return
+            try:
+                await self._dispatch_task(task)
+            except Exception as exc:
+                # упавшая задача не должна висеть в pending и держать квоту
+                await self._fail_task(task_id, exc)
+
+    async def _dispatch_task(self, task):
+        if task.queue != REPORTS_BULK_QUEUE:
+            view = await self._batch_view(task)
+            if view:
+                await self._run_batched(task, view)
+            else:
+                await self._run_task(task)
+            return
+        # тяжёлых запросов к БД одновременно не больше REPORT_QUOTA_MAX_HEAVY
+        async with heavy_slot(str(task.id)) as slot:
+            if not slot:
+                celery_app.send_task(
+                    "make_report",
+                    args=[str(task.id)],
+                    task_id=str(task.id),
+                    countdown=settings.REPORT_QUOTA_HEAVY_RETRY_SECONDS,
+                    queue=task.queue,
+                    priority=task.priority,
+                )
+                return
+            await self._run_task(task)
+
+    @staticmethod
+    def _session_limits(template) -> tuple[int, str]:
+        return (
+            template.statement_timeout_ms or settings.REPORT_STATEMENT_TIMEOUT_MS,
+            template.work_mem or settings.REPORT_WORK_MEM,
+        )
+
+    async def _prepare_session(
+        self, db: DBManager, task_id: str | None, limits: tuple[int, str] | None
+    ):
+        """Лимиты шаблона на транзакцию выгрузки и регистрация backend для отмены"""
+        pid = await db.report_task.apply_session_limits(
+            *(
+                limits
+                or (settings.REPORT_STATEMENT_TIMEOUT_MS, settings.REPORT_WORK_MEM)
+            )
+        )
+        if task_id:
+            await register_backend(task_id, pid)
+            # отмена могла прийти до регистрации backend
+            if await is_cancel_requested(task_id):
+                raise ReportCancelledException()
+
+    @staticmethod
+    def _is_cancellation(exc: BaseException) -> bool:
+        """Отмена пользователем, pg_cancel_backend или statement_timeout (SQLSTATE 57014)"""
+        if isinstance(exc, (ReportCancelledException, QueryCanceledError)):
+            return True
+        cause = getattr(getattr(exc, "orig", None), "__cause__", None)
+        return isinstance(cause, QueryCanceledError)
+
+    async def _abort_task(self, task_id: str):
+        """Прерванная выгрузка: cancelled, если отмену запросил пользователь, иначе timeout"""
+        await self.db.rollback()
+        await clear_progress(task_id)
+        await clear_backends(str(task_id))
         task = await self.db.report_task.get_one_or_none(id=task_id)
-        if not task:
-            raise ValueError(f"Task with id {task_id} not found")
+        if task is None:
+            return
+        await release_report(task.user_id, str(task_id))
+        if task.status != Status.pending:
+            return
+        if await is_cancel_requested(str(task_id)):
+            data = ErrorMessage(
+                status=Status.cancelled, error_message="Отменено пользователем"
+            )
+        else:
+            data = ErrorMessage(
+                status=Status.timeout,
+                error_message="Превышено время выполнения запроса",
+            )
+        await self.db.report_task.edit(data=data, id=task_id)
+        await self.db.commit()
+
+    async def _fail_task(self, task_id, exc: BaseException):
+        """Ошибка отчёта: задача получает статус error и освобождает квоту.
+
+        В пакете и общем сканировании остальные отчёты не страдают.
+        """
+        if self._is_cancellation(exc):
+            await self._abort_task(task_id)
+            return
+        logging.error(f"Report {task_id} failed", exc_info=exc)
+        await self.db.rollback()
+        await clear_progress(str(task_id))
+        await clear_backends(str(task_id))
+        task = await self.db.report_task.get_one_or_none(id=task_id)
+        if task is None:
+            return
+        await release_report(task.user_id, str(task_id))
+        if task.status != Status.pending:
+            return
+        await self.db.report_task.edit(
+            data=ErrorMessage(error_message=str(exc)[:1000]), id=task_id
+        )
+        await self.db.commit()
+
+    async def _batch_view(self, task) -> str | None:
+        """Представление, на котором задачу можно построить общим сканированием"""
+        if settings.REPORT_BATCH_WINDOW_MS <= 0 or task.bundle_id:
+            return None
+        template = await self.db.report_template.get_one_or_none(id=task.template_id)
+        config = self.report_config.get(template.name) if template else None
+        if not config:
+            return None
+        try:
+            params = config["param_model"](**json.loads(task.parameters))
+        except ValidationError:
+            return None
+        days = range_days(
+            getattr(params, "date_from", None), getattr(params, "date_to", None)
+        )
+        if not 0 < days <= settings.REPORT_BATCH_MAX_DAYS:
+            return None
+        # отчёт из куба или кэша кусков дешевле общего сканирования
+        params = params.model_dump()
+        cube = self._cube_name(config, params)
+        if cube and await asyncio.to_thread(load_cube, cube) is not None:
+            return None
+        if await self._chunk_plan(config, params, task.format):
+            return None
+        return config["repository"].model.__tablename__
+
+    async def _run_batched(self, task, view: str):
+        """Задачи на одном представлении, пришедшие в пределах окна, строятся
+        одним сканированием; построение ведёт первая вошедшая задача"""
+        if not await join_batch(view, str(task.id)):
+            # результат построит лидер пакета; страховка на случай его падения
+            self._resend_after_lease(task)
+            return
+        await asyncio.sleep(settings.REPORT_BATCH_WINDOW_MS / 1000)
+        await self._run_batch(view, await take_batch(view))
+
+    async def _run_batch(self, view: str, task_ids: list[str]):
+        items = []
+        for task_id in task_ids:
+            task = await self.db.report_task.get_one_or_none(id=task_id)
+            if task is None or task.status != Status.pending:
+                continue
+            template = await self.db.report_template.get_one_or_none(
+                id=task.template_id
+            )
+            config = self.report_config[template.name]
+            validated_params = config["param_model"](**json.loads(task.parameters))
+            cache_key = await self.report_cache_key(
+                template.name, validated_params, task.format
+            )
+            await self.db.report_task.mark_started(task.id, socket.gethostname())
+            await self.db.commit()
+            cached_file = await lookup_report(cache_key, pin=True)
+            if cached_file:
+                await self._finish_task(task.id, template.name, cached_file)
+                continue
+            if not await acquire_flight(cache_key, str(task.id)):
+                # такой же отчёт строит другая задача (или задача этого пакета)
+                await join_flight(cache_key, str(task.id))
+                self._resend_after_lease(task)
+                continue
+            items.append((task, template, config, validated_params, cache_key))
+        if not items:
+            return
+
+        # каждая задача пакета — лидер single-flight своего ключа до конца построения
+        async with AsyncExitStack() as flights:
+            for task, *_, cache_key in items:
+                await flights.enter_async_context(hold_flight(cache_key, str(task.id)))
+            results = await self._shared_scan(
+                [
+                    (
+                        task.id,
+                        config,
+                        validated_params,
+                        task.format,
+                        self._session_limits(template),
+                    )
+                    for task, template, config, validated_params, _ in items
+                ]
+            )
+            for (task, template, _, _, cache_key), result in zip(items, results):
+                if isinstance(result, BaseException):
+                    await self._fail_task(task.id, result)
+                    continue
+                file_path, stats = result
+                if file_path:
+                    file_path = await store_report(
+                        cache_key,
+                        view,
+                        file_path,
+                        self._report_extension(
+                            task.format, self._report_compression(task.format)
+                        ),
+                    )
+                for follower_id in await pop_followers(cache_key):
+                    if follower_id != str(task.id):
+                        await self._finish_task(
+                            follower_id,
+                            template.name,
+                            file_path,
+                            rows=stats.rows or None,
+                        )
+                await self._finish_task(
+                    task.id,
+                    template.name,
+                    file_path,
+                    rows=stats.rows or None,
+                    query_ms=stats.query_ms,
+                    write_ms=stats.write_ms,
+                )
+
+    def _resend_after_lease(self, task):
+        """Страховочная постановка задачи: если лидер упадёт, она займёт его место"""
+        celery_app.send_task(
+            "make_report",
+            args=[str(task.id)],
+            task_id=str(task.id),
+            countdown=settings.REPORT_FLIGHT_LEASE_SECONDS,
+            queue=task.queue,
+            priority=task.priority,
+        )
+
+    async def _shared_scan(self, items: list[tuple]) -> list:
+        """Одно сканирование представления на несколько отчётов.
+
+        Строки объединённого диапазона дат один раз копируются во временную таблицу,
+        а каждый отчёт выполняет свой же запрос (фильтры, сортировка, top) уже по ней.
+        Отчёты выполняются в своих savepoint: отмена или ошибка одного не трогает
+        остальные. Возвращает (файл, stats) или исключение для каждого элемента.
+        """
+        source = items[0][1]["repository"].model.__table__
+        repository_class = type(items[0][1]["repository"])
+        scan = scan_table(source)
+        ranges = merge_ranges(
+            [(params.date_from, params.date_to) for _, _, params, _, _ in items]
+        )
+        column = date_column(source)
+
+        started = time.perf_counter()
+        results = []
+        async with DBManager(session_factory=self.db.session_factory) as db:
+            await db.session.execute(
+                text(
+                    f"CREATE TEMPORARY TABLE {SCAN_TABLE} (LIKE {source.name}) "
+                    "ON COMMIT DROP"
+                )
+            )
+            scanned = await db.session.execute(
+                insert(scan).from_select(
+                    [c.name for c in source.columns],
+                    select(source).where(
+                        or_(*(column.between(start, end) for start, end in ranges))
+                    ),
+                )
+            )
+            scan_seconds = time.perf_counter() - started
+
+            for task_id, config, params, output_format, limits in items:
+                file_path, compression = self._report_file(task_id, output_format)
+                stats = ExportStats(str(task_id))
+                try:
+                    async with db.session.begin_nested():
+                        await self._prepare_session(db, stats.task_id, limits)
+                        rows = await self._export_query(
+                            file_path,
+                            repository_class(db.session),
+                            retarget(
+                                config["query_method"](**params.model_dump()),
+                                source,
+                                scan,
+                            ),
+                            config["is_summary"],
+                            output_format,
+                            compression,
+                            config["row_schema"],
+                            stats,
+                        )
+                except Exception as exc:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                    results.append(exc)
+                    continue
+                finally:
+                    await clear_backends(str(task_id))
+                stats.rows = rows
+                if not rows:
+                    os.remove(file_path)
+                    file_path = None
+                results.append((file_path, stats))
+
+        elapsed = time.perf_counter() - started
+        logging.info(
+            f"Shared scan {source.name}: reports={len(items)} scans=1 "
+            f"ranges={len(ranges)} scanned_rows={scanned.rowcount} "
+            f"scan_seconds={scan_seconds:.3f} seconds={elapsed:.3f} "
+            f"reports_per_sec={len(items) / max(elapsed, 1e-6):.1f}"
+        )
+        return results
+
+    async def _run_task(self, task):
+        await self.db.report_task.mark_started(task.id, socket.gethostname())
+        await self.db.commit()
 
         report_template = await self.db.report_template.get_one_or_none(
             id=task.template_id
@@ -167,7 +1154,177 @@ class ReportService:
             raise ValueError(f"Report template with id {task.template_id} not found")
 
         params = json.loads(task.parameters)
-        await self.make_report(task_id, report_template.name, params)
+        await self.make_report(
+            task.id,
+            report_template.name,
+            params,
+            task.format,
+            self._session_limits(report_template),
+        )
+
+    async def make_bundle_h(self, bundle_id: str):
+        """Пакет отчётов: все отчёты строятся на одном снимке данных, письмо — одно"""
+        async with claim_task(str(bundle_id)) as claimed:
+            if not claimed:
+                return
+            bundle = await self.db.report_bundle.get_one_or_none(id=bundle_id)
+            if not bundle:
+                raise ValueError(f"Bundle with id {bundle_id} not found")
+            if bundle.status != Status.pending:
+                return
+            async with heavy_slot(str(bundle_id)) as slot:
+                if not slot:
+                    celery_app.send_task(
+                        "make_report_bundle",
+                        args=[str(bundle_id)],
+                        task_id=str(bundle_id),
+                        countdown=settings.REPORT_QUOTA_HEAVY_RETRY_SECONDS,
+                        queue=REPORTS_BULK_QUEUE,
+                    )
+                    return
+                try:
+                    await self._build_bundle(bundle)
+                finally:
+                    await release_report(bundle.user_id, str(bundle_id))
+
+    async def _build_bundle(self, bundle):
+        await self.db.report_bundle.edit(ReportBundleStarted(), id=bundle.id)
+        tasks = await self.db.report_task.get_all(
+            bundle_id=bundle.id, status=Status.pending
+        )
+        templates = {}
+        for task in tasks:
+            await self.db.report_task.mark_started(task.id, socket.gethostname())
+            if task.template_id not in templates:
+                templates[task.template_id] = (
+                    await self.db.report_template.get_one_or_none(id=task.template_id)
+                )
+        await self.db.commit()
+
+        semaphore = asyncio.Semaphore(settings.REPORT_BUNDLE_PARALLELISM)
+        # Транзакция-держатель снимка открыта, пока все отчёты не импортируют его:
+        # параллельные соединения видят одни и те же данные даже при REFRESH MV
+        async with DBManager(session_factory=self.db.session_factory) as holder:
+            snapshot_id = await holder.report_task.export_snapshot()
+
+            async def run_item(task):
+                template = templates[task.template_id]
+                async with semaphore:
+                    async with DBManager(session_factory=self.db.session_factory) as db:
+                        await db.report_task.import_snapshot(snapshot_id)
+                        return await self._build_bundle_item(
+                            db, task, template.name, self._session_limits(template)
+                        )
+
+            results = await asyncio.gather(
+                *(run_item(task) for task in tasks), return_exceptions=True
+            )
+
+        for task, result in zip(tasks, results):
+            report_name = templates[task.template_id].name
+            if isinstance(result, BaseException):
+                await self._fail_task(task.id, result)
+                continue
+            file_path, stats = result
+            await self._finish_task(
+                task.id,
+                report_name,
+                file_path,
+                rows=stats.rows or None,
+                query_ms=stats.query_ms,
+                write_ms=stats.write_ms,
+                notify=False,
+            )
+
+        ready = await self.db.report_task.get_all(
+            bundle_id=bundle.id, status=Status.ready
+        )
+        await self.db.report_bundle.edit(
+            ReportBundleFinished(
+                status=Status.ready if ready else Status.error,
+                error_message=None if ready else "Нет данных для отчетов пакета",
+            ),
+            id=bundle.id,
+        )
+        await self.db.commit()
+
+        user = await self.db.user.get_one_or_none(id=bundle.user_id)
+        if ready and user and user.email:
+            send_report_ready_email_task.delay(
+                to_email=user.email,
+                report_name=f"Пакет отчётов ({len(ready)} из {len(tasks)})",
+                report_link=f"http://127.0.0.1:8000/report/bundles/{bundle.id}/download",
+            )
+
+    async def _build_bundle_item(
+        self, db: DBManager, task, report_name: str, limits: tuple[int, str]
+    ):
+        """Один отчёт пакета на соединении со снимком; без шардирования и кэша,
+        чтобы все данные пакета были из одного снимка"""
+        config = self.report_config[report_name]
+        validated_params = config["param_model"](**json.loads(task.parameters))
+        query = config["query_method"](**validated_params.model_dump())
+        file_path, compression = self._report_file(task.id, task.format)
+        stats = ExportStats(str(task.id))
+        await self._prepare_session(db, stats.task_id, limits)
+        try:
+            rows = await self._export_query(
+                file_path,
+                type(config["repository"])(db.session),
+                query,
+                config["is_summary"],
+                task.format,
+                compression,
+                config["row_schema"],
+                stats,
+            )
+        except BaseException:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        finally:
+            await clear_backends(str(task.id))
+        stats.rows = rows
+        if not rows:
+            os.remove(file_path)
+            return None, stats
+        return file_path, stats
+
+    async def age_bulk_tasks(self) -> int:
+        """Старение приоритета: долго ждущие тяжёлые задачи переставляются в очередь выше.
+
+        Каждые REPORT_AGING_INTERVAL_SECONDS ожидания повышают приоритет на ступень;
+        старое сообщение остаётся в очереди, но дубль отсекается claim_task.
+        """
+        tasks = await self.db.report_task.get_all(
+            ReportTaskORM.started_at.is_(None),
+            status=Status.pending,
+            queue=REPORTS_BULK_QUEUE,
+        )
+        now = datetime.now(timezone.utc)
+        aged = 0
+        for task in tasks:
+            waited = (now - task.created_at).total_seconds()
+            priority = max(
+                PRIORITY_HIGHEST,
+                settings.REPORT_BULK_PRIORITY
+                - int(waited // settings.REPORT_AGING_INTERVAL_SECONDS),
+            )
+            if task.priority is not None and priority >= task.priority:
+                continue
+            await self.db.report_task.edit(
+                ReportTaskRoute(priority=priority), id=task.id
+            )
+            await self.db.commit()
+            celery_app.send_task(
+                "make_report",
+                args=[str(task.id)],
+                task_id=str(task.id),
+                queue=task.queue,
+                priority=priority,
+            )
+            aged += 1
+        return aged
 
 
 async def get_db_np():
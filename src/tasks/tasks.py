@@ -1,34 +1,168 @@
-import asyncio
+import logging
+import time
+from datetime import date
+
 from src.tasks.celery_app import celery_app
-from src.tasks.report import ReportService, get_db_np
-from sqlalchemy import text
+from src.tasks.report import ReportService
+from src.tasks.worker import get_worker_db, worker_runtime
+from src.utils.report_cache import invalidate_view
+from src.repositories.report.report_aggregate import DAILY_AGGREGATES
+from src.utils.report_chunks import month_key, update_month_fingerprints
+from src.utils.report_cube import CUBES, build_cube
+from src.utils.report_flight import claim_refresh
+from src.utils.refresh_scheduler import (
+    REFRESH_REASONS,
+    decide_refresh,
+    get_scheduler_state,
+    mark_refreshed,
+    observe_writes,
+    record_check,
+)
+from src.utils.view_refresh import record_view_refresh
+from src.utils.view_state import publish_view_states
+from src.config import settings
 
 
 @celery_app.task(name="make_report")
 def make_report(task_id):
-    asyncio.run(run_report(task_id))
+    worker_runtime.run(run_report(task_id))
+
+
+@celery_app.task(name="make_report_bundle")
+def make_report_bundle(bundle_id):
+    worker_runtime.run(run_report_bundle(bundle_id))
+
+
+@celery_app.task(name="age_report_tasks")
+def age_report_tasks():
+    worker_runtime.run(_age_report_tasks())
 
 
 @celery_app.task(name="refresh_materialized_views")
 def refresh_materialized_views():
-    asyncio.run(_refresh_materialized_views())
+    worker_runtime.run(_refresh_materialized_views())
 
 
-async def _refresh_materialized_views():
-    views = [
-        "mv_sales_daily",
-        "mv_sales_by_product_category_daily",
-        "mv_sales_by_customer_daily",
-        "mv_payments_by_method_daily",
-    ]
+@celery_app.task(name="check_refresh")
+def check_refresh():
+    worker_runtime.run(_check_refresh())
 
-    async for db in get_db_np():
+
+async def _maintain_aggregates() -> tuple[list[date], list]:
+    """Пересчёт дневных агрегатов за изменившиеся даты и свёрток за содержащие их
+    недели и месяцы, одной транзакцией.
+
+    Новые поколения в report_view_state фиксируются в той же транзакции.
+    """
+    async for db in get_worker_db():
+        started = time.perf_counter()
+        states = []
         async with db.session.begin():
-            for view in views:
-                await db.session.execute(text(f"REFRESH MATERIALIZED VIEW {view};"))
+            days = await db.report_aggregate.take_dirty_dates()
+            rows = {}
+            if days:
+                rows = await db.report_aggregate.rebuild_dates(days)
+                rows |= await db.report_aggregate.rebuild_rollups(days)
+            for table, (deleted, inserted) in rows.items():
+                states.append(
+                    await db.report_view_state.record_refresh(
+                        table, row_delta=inserted - deleted
+                    )
+                )
+        seconds = time.perf_counter() - started
+        for table, (_, inserted) in rows.items():
+            await record_view_refresh(table, seconds, inserted)
+        logging.info(
+            f"Daily aggregates maintained: days={len(days)} rows={rows} "
+            f"seconds={seconds:.3f}"
+        )
+        return days, states
+
+
+async def _refresh_materialized_views() -> bool:
+    async with claim_refresh() as claimed:
+        if not claimed:
+            logging.info("Refresh skipped: previous run is still in progress")
+            return False
+        await _refresh_views()
+    await mark_refreshed()
+    return True
+
+
+async def _check_refresh():
+    """Решает по объёму записей с прошлой проверки, пора ли обновлять агрегаты"""
+    async for db in get_worker_db():
+        writes_total = await db.report_aggregate.write_counter()
+        has_dirty = await db.report_aggregate.has_dirty_dates()
+        await db.commit()
+    now = time.time()
+    state = observe_writes(await get_scheduler_state(), writes_total, now)
+    decision = decide_refresh(state, has_dirty, now)
+    state = await record_check(state, has_dirty, decision, now)
+    logging.info(
+        f"Refresh check: decision={decision} "
+        f"pending_writes={int(state.get('pending_writes', 0))} "
+        f"staleness={state['staleness_seconds']:.0f}s"
+    )
+    if decision in REFRESH_REASONS:
+        await _refresh_materialized_views()
+
+
+async def _refresh_views():
+    days, states = await _maintain_aggregates()
+    if not days:
+        return
+
+    since = date(days[0].year, days[0].month, 1)
+    async for db in get_worker_db():
+        # помесячные куски отчётов сбрасываются только для изменившихся месяцев
+        changed_months = {}
+        for repository in (
+            db.sales_daily,
+            db.product_category_daily,
+            db.sales_by_customer_daily,
+            db.payments,
+        ):
+            view = repository.model.__tablename__
+            changed_months[view] = await update_month_fingerprints(
+                view,
+                await repository.month_fingerprints(since),
+                month_key(since),
+            )
+
+        # префиксный индекс куба пересчитывается с первого изменённого месяца
+        if settings.REPORT_CUBE_ENABLED:
+            for name, repository in (
+                ("sales", db.sales_daily),
+                ("products", db.product_category_daily),
+                ("categories", db.product_category_daily),
+                ("customers", db.sales_by_customer_daily),
+                ("payments", db.payments),
+            ):
+                await build_cube(
+                    repository,
+                    CUBES[name],
+                    changed_months[repository.model.__tablename__],
+                )
+
+    # новое поколение публикуется после кубов и кусков: ключи кэша отчётов
+    # на него не должны указывать на результаты по старым данным
+    await publish_view_states(states)
+    for view in DAILY_AGGREGATES:
+        await invalidate_view(view)
 
 
 async def run_report(task_id):
-    async for db in get_db_np():
+    async for db in get_worker_db():
         service = ReportService(db=db)
         await service.make_report_h(task_id)
+
+
+async def run_report_bundle(bundle_id):
+    async for db in get_worker_db():
+        await ReportService(db=db).make_bundle_h(bundle_id)
+
+
+async def _age_report_tasks():
+    async for db in get_worker_db():
+        await ReportService(db=db).age_bulk_tasks()
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from celery.signals import (
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.config import settings
+from src.init import redis_manager
+from src.utils.db_manager import DBManager
+
+
+class WorkerRuntime:
+    """Долгоживущий event loop и пул соединений с БД на процесс Celery-воркера"""
+
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.engine = None
+        self.session_maker = None
+
+    def start(self):
+        if self.loop is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.engine = create_async_engine(
+            settings.DB_URL,
+            pool_size=settings.WORKER_DB_POOL_SIZE,
+            max_overflow=settings.WORKER_DB_MAX_OVERFLOW,
+            pool_recycle=settings.WORKER_DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        self.session_maker = async_sessionmaker(
+            bind=self.engine, expire_on_commit=False
+        )
+        self.loop.run_until_complete(self._warm_up())
+        self.loop.run_until_complete(redis_manager.connect())
+        logging.info(
+            f"Worker runtime started: pool_size={settings.WORKER_DB_POOL_SIZE}"
+        )
+
+    async def _warm_up(self):
+        """Открываем соединения пула заранее, чтобы первая задача не платила за handshake"""
+        connections = []
+        try:
+            for _ in range(settings.WORKER_DB_POOL_SIZE):
+                connection = await self.engine.connect()
+                await connection.execute(text("SELECT 1"))
+                connections.append(connection)
+        except Exception as e:
+            logging.error(f"Не удалось прогреть пул соединений: {e}")
+        finally:
+            for connection in connections:
+                await connection.close()
+
+    def stop(self):
+        if self.loop is None:
+            return
+        self.loop.run_until_complete(self.engine.dispose())
+        self.loop.run_until_complete(redis_manager.close())
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+        self.loop = None
+        self.engine = None
+        self.session_maker = None
+        logging.info("Worker runtime stopped")
+
+    def run(self, coro):
+        """Выполняет корутину задачи на loop процесса (создаёт его при необходимости)"""
+        self.start()
+        return self.loop.run_until_complete(coro)
+
+
+worker_runtime = WorkerRuntime()
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    worker_runtime.stop()
+
+
+async def get_worker_db():
+    async with DBManager(session_factory=worker_runtime.session_maker) as db:
+        yield db
@@ -11,8 +11,11 @@ from src.repositories.commerce.order_item import OrderItemRepository
 from src.repositories.commerce.payment import PaymentRepository
 from src.repositories.commerce.product import ProductRepository
 from src.repositories.commerce.supplier import SupplierRepository
+from src.repositories.report.report_aggregate import ReportAggregateRepository
+from src.repositories.report.report_bundle import ReportBundleRepository
 from src.repositories.report.report_task import ReportTaskRepository
 from src.repositories.report.report_template import ReportTemplateRepository
+from src.repositories.report.report_view_state import ReportViewStateRepository
 from src.repositories.report.sales_by_product_category_daily import (
     SalesByProductCategoryDailyRepository,
 )
@@ -36,6 +39,9 @@ class DBManager:
         self.product = ProductRepository(self.session)
         self.report_task = ReportTaskRepository(self.session)
         self.report_template = ReportTemplateRepository(self.session)
+        self.report_bundle = ReportBundleRepository(self.session)
+        self.report_aggregate = ReportAggregateRepository(self.session)
+        self.report_view_state = ReportViewStateRepository(self.session)
         self.sales_daily = SalesDailyRepository(self.session)
         self.audit = AuditRepository(self.session)
         self.payments = PaymentsRepository(self.session)
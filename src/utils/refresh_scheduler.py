@@ -0,0 +1,92 @@
+import time
+
+from src.config import settings
+from src.init import redis_manager
+
+# Адаптивный REFRESH: beat часто вызывает проверку, а обновление запускается по
+# объёму записей в orders/order_items/payments. Состояние и решения планировщика
+# лежат в хэше mv_refresh:scheduler, счётчики решений — в mv_refresh:decisions.
+STATE_KEY = "mv_refresh:scheduler"
+DECISIONS_KEY = "mv_refresh:decisions"
+
+# причины, по которым обновление запускается
+REFRESH_REASONS = ("max_staleness", "volume", "settled")
+
+
+async def get_scheduler_state() -> dict[str, float]:
+    raw = await redis_manager.redis.hgetall(STATE_KEY)
+    return {field.decode(): float(value) for field, value in raw.items()}
+
+
+async def get_refresh_decisions() -> dict[str, int]:
+    raw = await redis_manager.redis.hgetall(DECISIONS_KEY)
+    return {field.decode(): int(value) for field, value in raw.items()}
+
+
+def observe_writes(state: dict, writes_total: int, now: float) -> dict:
+    """Добавляет к состоянию записи, случившиеся с прошлой проверки.
+
+    writes_total — накопительный счётчик pg_stat_user_tables; если он уменьшился
+    (сброс статистики, рестарт), текущее значение считается приростом.
+    """
+    state = dict(state)
+    previous = state.get("writes_total")
+    if previous is None:
+        delta = 0
+    elif writes_total < previous:
+        delta = writes_total
+    else:
+        delta = writes_total - previous
+    state["writes_total"] = writes_total
+    if delta:
+        state["pending_writes"] = state.get("pending_writes", 0) + delta
+        state["last_write_at"] = now
+    return state
+
+
+def decide_refresh(state: dict, has_dirty: bool, now: float) -> str:
+    """Решение проверки: причина из REFRESH_REASONS — обновлять, иначе — почему нет.
+
+    idle — изменений нет; min_interval — с прошлого обновления прошло мало
+    времени; debounce — записи ещё идут и их пока мало. Граница устаревания
+    старше MIN_INTERVAL, поэтому изменения не ждут дольше MAX_STALENESS.
+    """
+    if not has_dirty and not state.get("pending_writes"):
+        return "idle"
+    if (
+        now - state.get("refreshed_at", 0)
+        < settings.REPORT_REFRESH_MIN_INTERVAL_SECONDS
+    ):
+        return "min_interval"
+    if (
+        now - state.get("pending_since", now)
+        >= settings.REPORT_REFRESH_MAX_STALENESS_SECONDS
+    ):
+        return "max_staleness"
+    if state.get("pending_writes", 0) >= settings.REPORT_REFRESH_WRITE_THRESHOLD:
+        return "volume"
+    if now - state.get("last_write_at", 0) >= settings.REPORT_REFRESH_DEBOUNCE_SECONDS:
+        return "settled"
+    return "debounce"
+
+
+async def record_check(state: dict, has_dirty: bool, decision: str, now: float):
+    """Сохраняет состояние после проверки вместе с текущим устареванием"""
+    state = dict(state)
+    if has_dirty or state.get("pending_writes"):
+        state.setdefault("pending_since", now)
+    state["staleness_seconds"] = now - state.get("pending_since", now)
+    state["checked_at"] = now
+    await redis_manager.redis.hset(STATE_KEY, mapping=state)
+    await redis_manager.redis.hincrby(DECISIONS_KEY, decision, 1)
+    return state
+
+
+async def mark_refreshed(now: float | None = None):
+    """Обновление завершено: накопленные записи учтены, устаревание обнуляется"""
+    now = time.time() if now is None else now
+    await redis_manager.redis.hdel(STATE_KEY, "pending_since")
+    await redis_manager.redis.hset(
+        STATE_KEY,
+        mapping={"refreshed_at": now, "pending_writes": 0, "staleness_seconds": 0},
+    )
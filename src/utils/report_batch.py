@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+from sqlalchemy import Column, Date, MetaData, Table
+from sqlalchemy.sql.visitors import replacement_traverse
+
+from src.config import settings
+from src.init import redis_manager
+
+SCAN_TABLE = "report_batch_scan"
+
+# Вступление в пакет и захват лидерства атомарно: первый вошедший — лидер
+JOIN_SCRIPT = """
+redis.call('rpush', KEYS[1], ARGV[1])
+redis.call('expire', KEYS[1], ARGV[2])
+if redis.call('set', KEYS[2], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+# Лидер забирает участников и снимает лидерство: следующие задачи открывают новый пакет
+TAKE_SCRIPT = """
+local members = redis.call('lrange', KEYS[1], 0, -1)
+redis.call('del', KEYS[1], KEYS[2])
+return members
+"""
+
+
+def _members_key(view: str) -> str:
+    return f"report_batch:{view}"
+
+
+def _leader_key(view: str) -> str:
+    return f"report_batch:{view}:leader"
+
+
+async def join_batch(view: str, task_id: str) -> bool:
+    """Добавляет задачу в открытый пакет представления; True — задача стала лидером"""
+    ttl = settings.REPORT_FLIGHT_LEASE_SECONDS
+    joined = await redis_manager.redis.eval(
+        JOIN_SCRIPT, 2, _members_key(view), _leader_key(view), task_id, ttl
+    )
+    return bool(joined)
+
+
+async def take_batch(view: str) -> list[str]:
+    members = await redis_manager.redis.eval(
+        TAKE_SCRIPT, 2, _members_key(view), _leader_key(view)
+    )
+    # задача могла войти в пакет повторно (дубль сообщения)
+    return list(dict.fromkeys(member.decode() for member in members))
+
+
+def date_column(table: Table) -> Column:
+    """Колонка даты представления, по которой режутся диапазоны отчётов"""
+    return next(column for column in table.columns if isinstance(column.type, Date))
+
+
+def merge_ranges(ranges: list[tuple[date, date]]) -> list[tuple[date, date]]:
+    """Объединяет пересекающиеся и смежные диапазоны дат"""
+    merged = []
+    for date_from, date_to in sorted(ranges):
+        if merged and date_from <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], date_to))
+        else:
+            merged.append((date_from, date_to))
+    return merged
+
+
+def scan_table(source: Table) -> Table:
+    """Описание временной таблицы общего сканирования (создаётся через LIKE представления)"""
+    return Table(
+        SCAN_TABLE,
+        MetaData(),
+        *(Column(column.name, column.type) for column in source.columns),
+    )
+
+
+def retarget(query, source: Table, target: Table):
+    """Тот же запрос отчёта, но читающий target вместо представления source"""
+
+    def replace(element):
+        if element is source:
+            return target
+        if isinstance(element, Column) and getattr(element, "table", None) is source:
+            return target.c[element.name]
+        return None
+
+    return replacement_traverse(query, {}, replace)
@@ -0,0 +1,60 @@
+import zipfile
+
+from src.utils.report_compression import (
+    COMPRESSION_SUFFIXES,
+    file_compression,
+    iter_decompressed,
+)
+
+
+class _ChunkSink:
+    """Файлоподобный приёмник без seek: zipfile пишет в него, генератор забирает куски"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def bundle_member_name(index: int, report_name: str, file_path: str) -> str:
+    """Имя файла в архиве: порядковый номер, отчёт и расширение без суффикса сжатия"""
+    name = file_path.rsplit("/", 1)[-1]
+    compression = file_compression(file_path)
+    if compression:
+        name = name[: -len(COMPRESSION_SUFFIXES[compression])]
+    extension = name.split(".", 1)[-1]
+    return f"{index:02d}_{report_name}.{extension}"
+
+
+def iter_zip(members: list[tuple[str, str]]):
+    """Потоковый ZIP из готовых файлов пакета без записи архива на диск.
+
+    Сжатые CSV распаковываются в deflate-элементы, Parquet/Arrow уже сжаты
+    внутри и кладутся как есть.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for arcname, file_path in members:
+            info = zipfile.ZipInfo.from_file(file_path, arcname)
+            if file_compression(file_path) or file_path.endswith(".csv"):
+                info.compress_type = zipfile.ZIP_DEFLATED
+            else:
+                info.compress_type = zipfile.ZIP_STORED
+            with archive.open(info, "w", force_zip64=True) as entry:
+                for chunk in iter_decompressed(file_path):
+                    entry.write(chunk)
+                    if data := sink.pop():
+                        yield data
+            if data := sink.pop():
+                yield data
+    yield sink.pop()
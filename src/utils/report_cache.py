@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+
+from src.config import settings
+from src.init import redis_manager
+
+OBJECTS_DIR = "report/objects"
+# объект -> момент, до которого на него ссылаются готовые задачи
+PINS_KEY = "report_cache:pins"
+
+# LRU-вытеснение одним скриптом, атомарно с закреплением объектов: пропускает
+# закреплённые и только что сохранённый объект, возвращает пути к удалению
+EVICT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+redis.call('zremrangebyscore', KEYS[4], '-inf', now)
+local bytes = tonumber(redis.call('get', KEYS[1]) or '0')
+local evicted = {}
+local skipped = 0
+while bytes > limit do
+    local batch = redis.call('zrange', KEYS[2], skipped, skipped + 99)
+    if #batch == 0 then
+        break
+    end
+    for _, path in ipairs(batch) do
+        if bytes <= limit then
+            break
+        end
+        if path == ARGV[3] or redis.call('zscore', KEYS[4], path) then
+            skipped = skipped + 1
+        else
+            local size = tonumber(redis.call('hget', KEYS[3], path) or '0')
+            redis.call('zrem', KEYS[2], path)
+            redis.call('hdel', KEYS[3], path)
+            redis.call('decrby', KEYS[1], size)
+            bytes = bytes - size
+            table.insert(evicted, path)
+        end
+    end
+end
+return evicted
+"""
+
+
+def report_cache_key(
+    report_name: str, params: dict, output_format: str, generation: int
+) -> str:
+    """Канонический ключ результата: шаблон, нормализованные параметры, формат и поколение данных"""
+    payload = json.dumps(
+        {
+            "report": report_name,
+            "params": params,
+            "format": output_format,
+            "generation": generation,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def invalidate_view(view: str):
+    """Сбрасывает ключи кэша на представление после смены его поколения"""
+    index_key = f"report_cache:view:{view}"
+    keys = await redis_manager.redis.smembers(index_key)
+    if keys:
+        await redis_manager.redis.delete(
+            *[f"report_cache:{key.decode()}" for key in keys]
+        )
+    await redis_manager.delete(index_key)
+
+
+async def pin_report(object_path: str):
+    """Закрепляет объект за готовой задачей на REPORT_RESULT_RETENTION_SECONDS"""
+    await redis_manager.redis.zadd(
+        PINS_KEY,
+        {object_path: time.time() + settings.REPORT_RESULT_RETENTION_SECONDS},
+        gt=True,
+    )
+
+
+async def lookup_report(key: str, pin: bool = False) -> str | None:
+    """Путь к готовому артефакту по ключу или None.
+
+    С pin объект закрепляется до проверки наличия: найденный результат отдаётся
+    задаче и не может быть вытеснен между поиском и её завершением.
+    """
+    object_path = await redis_manager.get(f"report_cache:{key}")
+    if object_path is None:
+        return None
+    if pin:
+        await pin_report(object_path)
+    if not os.path.exists(object_path):
+        # объект вытеснен с диска — ключ больше не валиден
+        await redis_manager.delete(f"report_cache:{key}")
+        return None
+    await redis_manager.redis.zadd("report_cache:lru", {object_path: time.time()})
+    return object_path
+
+
+def _file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def store_report(
+    key: str, view: str | None, file_path: str, extension: str
+) -> str:
+    """Переносит файл отчёта в хранилище по хэшу содержимого и регистрирует ключ.
+
+    Одинаковые по содержимому отчёты хранятся в одном экземпляре.
+    extension — суффикс объекта по фактическому формату и сжатию артефакта.
+    Ключи без view (помесячные куски) не сбрасываются при смене поколения.
+    """
+    digest = _file_digest(file_path)
+    object_path = f"{OBJECTS_DIR}/{digest[:2]}/{digest}{extension}"
+
+    if os.path.exists(object_path):
+        os.remove(file_path)
+    else:
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.replace(file_path, object_path)
+        size = os.path.getsize(object_path)
+        await redis_manager.redis.hset("report_cache:sizes", object_path, size)
+        await redis_manager.redis.incrby("report_cache:bytes", size)
+
+    await redis_manager.set(f"report_cache:{key}", object_path)
+    if view:
+        await redis_manager.redis.sadd(f"report_cache:view:{view}", key)
+    await redis_manager.redis.zadd("report_cache:lru", {object_path: time.time()})
+    await evict_reports(keep=object_path)
+    return object_path
+
+
+async def evict_reports(keep: str | None = None):
+    """LRU-вытеснение объектов, пока хранилище больше REPORT_CACHE_MAX_BYTES.
+
+    Закреплённые за готовыми задачами объекты и keep не вытесняются.
+    """
+    evicted = await redis_manager.redis.eval(
+        EVICT_SCRIPT,
+        4,
+        "report_cache:bytes",
+        "report_cache:lru",
+        "report_cache:sizes",
+        PINS_KEY,
+        settings.REPORT_CACHE_MAX_BYTES,
+        time.time(),
+        keep or "",
+    )
+    for object_path in evicted:
+        object_path = object_path.decode()
+        if os.path.exists(object_path):
+            os.remove(object_path)
@@ -0,0 +1,39 @@
+from src.config import settings
+from src.init import redis_manager
+
+
+def _cancel_key(task_id: str) -> str:
+    return f"report_cancel:{task_id}"
+
+
+def _backends_key(task_id: str) -> str:
+    return f"report_backends:{task_id}"
+
+
+async def request_cancel(task_id: str):
+    """Флаг отмены: воркер проверяет его между пачками выгрузки"""
+    await redis_manager.set(
+        _cancel_key(task_id), "1", expire=settings.REPORT_CANCEL_TTL_SECONDS
+    )
+
+
+async def is_cancel_requested(task_id: str) -> bool:
+    return await redis_manager.get(_cancel_key(task_id)) is not None
+
+
+async def register_backend(task_id: str, pid: int):
+    """Запоминает PID backend-процесса Postgres, выполняющего запрос задачи"""
+    await redis_manager.redis.sadd(_backends_key(task_id), pid)
+    await redis_manager.redis.expire(
+        _backends_key(task_id), settings.REPORT_CANCEL_TTL_SECONDS
+    )
+
+
+async def get_backends(task_id: str) -> list[int]:
+    return [
+        int(pid) for pid in await redis_manager.redis.smembers(_backends_key(task_id))
+    ]
+
+
+async def clear_backends(task_id: str):
+    await redis_manager.delete(_backends_key(task_id))
@@ -0,0 +1,116 @@
+import calendar
+import hashlib
+import json
+import pickle
+from datetime import date, timedelta
+
+from src.init import redis_manager
+
+# Отчёт за произвольный диапазон собирается из помесячных кусков: закрытые месяцы
+# берутся из кэша, рваные края диапазона и текущий месяц считаются заново.
+# Ключ куска включает отпечаток данных месяца, поэтому REFRESH, изменивший месяц,
+# делает его куски недействительными, а остальные месяцы продолжают переиспользоваться.
+
+
+def _fingerprints_key(view: str) -> str:
+    return f"report_chunk_months:{view}"
+
+
+def _month_chunks_key(view: str, month: str) -> str:
+    return f"report_chunk:{view}:{month}"
+
+
+def month_ranges(date_from: date, date_to: date) -> list[tuple[date, date, bool]]:
+    """Делит диапазон по календарным месяцам: (начало, конец, месяц целиком)"""
+    pieces = []
+    start = date_from
+    while start <= date_to:
+        month_end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+        end = min(month_end, date_to)
+        pieces.append((start, end, start.day == 1 and end == month_end))
+        start = end + timedelta(days=1)
+    return pieces
+
+
+def month_key(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def chunk_key(report_name: str, filters: dict, month: str, fingerprint: str) -> str:
+    """Ключ куска: отчёт, фильтры без дат и top, месяц и отпечаток его данных"""
+    payload = json.dumps(
+        {
+            "chunk": report_name,
+            "filters": filters,
+            "month": month,
+            "fingerprint": fingerprint,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def get_month_fingerprints(view: str) -> dict[str, str]:
+    raw = await redis_manager.redis.hgetall(_fingerprints_key(view))
+    return {month.decode(): value.decode() for month, value in raw.items()}
+
+
+async def update_month_fingerprints(
+    view: str, fingerprints: dict[str, str], since: str | None = None
+) -> list:
+    """Сохраняет отпечатки месяцев после REFRESH и сбрасывает куски изменившихся месяцев.
+
+    С since fingerprints содержит только месяцы с since, более ранние не меняются.
+    """
+    previous = await get_month_fingerprints(view)
+    if since:
+        fingerprints = {
+            **{month: value for month, value in previous.items() if month < since},
+            **fingerprints,
+        }
+    changed = [
+        month
+        for month in previous.keys() | fingerprints.keys()
+        if previous.get(month) != fingerprints.get(month)
+    ]
+    for month in changed:
+        keys = await redis_manager.redis.smembers(_month_chunks_key(view, month))
+        if keys:
+            await redis_manager.redis.delete(
+                *[f"report_cache:{key.decode()}" for key in keys]
+            )
+            await redis_manager.redis.hdel(
+                "report_chunk:rows", *[key.decode() for key in keys]
+            )
+        await redis_manager.delete(_month_chunks_key(view, month))
+    await redis_manager.delete(_fingerprints_key(view))
+    if fingerprints:
+        await redis_manager.redis.hset(_fingerprints_key(view), mapping=fingerprints)
+    return changed
+
+
+async def register_chunk(view: str, month: str, key: str, rows: int):
+    await redis_manager.redis.sadd(_month_chunks_key(view, month), key)
+    await redis_manager.redis.hset("report_chunk:rows", key, rows)
+
+
+async def get_chunk_rows(key: str) -> int | None:
+    raw = await redis_manager.redis.hget("report_chunk:rows", key)
+    return int(raw) if raw is not None else None
+
+
+# куски сводок хранятся в pickle, куски детальных отчётов — несжатым CSV
+SUMMARY_CHUNK_EXTENSION = ".pickle"
+
+
+def save_summary_chunk(file_path: str, columns: list[str], rows: list):
+    # файлы кусков пишет и читает только воркер
+    with open(file_path, "wb") as f:
+        pickle.dump((columns, [tuple(row) for row in rows]), f)
+
+
+def load_summary_chunk(file_path: str) -> tuple[list[str], list]:
+    with open(file_path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,77 @@
+import gzip
+import io
+
+from src.config import settings
+
+# Кодировка артефакта → суффикс файла и значение Content-Encoding
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def compression_suffix(compression: str | None) -> str:
+    return COMPRESSION_SUFFIXES.get(compression, "")
+
+
+def file_compression(file_path: str) -> str | None:
+    """Кодировка сохранённого артефакта по суффиксу файла"""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if file_path.endswith(suffix):
+            return compression
+    return None
+
+
+def open_compressed(file_path: str, compression: str | None):
+    """Бинарный файл на запись, сжимающий данные на лету"""
+    if compression == "gzip":
+        return gzip.open(file_path, "wb", compresslevel=settings.REPORT_GZIP_LEVEL)
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=settings.REPORT_ZSTD_LEVEL).stream_writer(
+            open(file_path, "wb"), closefd=True
+        )
+    return open(file_path, "wb")
+
+
+def open_compressed_text(file_path: str, compression: str | None):
+    """Текстовая обёртка над open_compressed для csv-модуля"""
+    return io.TextIOWrapper(
+        open_compressed(file_path, compression), encoding="utf-8", newline=""
+    )
+
+
+def iter_decompressed(file_path: str, chunk_size: int = READ_CHUNK_SIZE):
+    """Читает артефакт кусками, распаковывая его для клиентов без поддержки сжатия"""
+    compression = file_compression(file_path)
+    if compression == "gzip":
+        source = gzip.open(file_path, "rb")
+    elif compression == "zstd":
+        import zstandard
+
+        source = zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, "rb"), closefd=True
+        )
+    else:
+        source = open(file_path, "rb")
+    with source:
+        while chunk := source.read(chunk_size):
+            yield chunk
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    """Принимает ли клиент кодировку (учитывает q=0 и *)"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    quality = accepted.get(encoding, accepted.get("*", 0.0))
+    return quality > 0
@@ -0,0 +1,318 @@
+import asyncio
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import BigInteger, func, select
+
+from src.config import settings
+from src.utils.report_serializer import ROUND_COLUMNS
+from src.utils.report_shards import AVG_COLUMNS
+
+# Куб сводок: префиксные суммы день × ключ × метрика, построенные после REFRESH.
+# Итог за любой диапазон дат — два среза и вычитание. Лежит в .npy и открывается
+# через mmap, поэтому prefork-воркеры делят одни страницы в page cache.
+# Денежные метрики хранятся целыми с масштабом CUBE_SCALE,
+# последняя метрика — число дневных строк (для средних и пустых групп).
+# Группа куба — ключ вместе с подписями, как в GROUP BY SQL-сводки: после
+# переименования сущности старое и новое имя остаются отдельными строками.
+CUBE_SCALE = 10**4
+# версия формата current.json; кубы другого формата перестраиваются целиком
+CUBE_FORMAT = 2
+
+
+@dataclass(frozen=True)
+class CubeSpec:
+    name: str
+    date_column: str
+    key_column: str | None
+    label_columns: tuple[str, ...]
+    metrics: tuple[str, ...]
+    order_column: str | None = None
+
+    @property
+    def columns(self) -> list[str]:
+        """Колонки результата в порядке SQL-запроса сводки"""
+        key = [self.key_column] if self.key_column else []
+        return key + list(self.label_columns) + list(self.metrics)
+
+
+CUBES = {
+    "sales": CubeSpec(
+        "sales",
+        "date",
+        None,
+        (),
+        ("total_orders", "total_amount", "avg_check", "total_items", "total_payments"),
+    ),
+    "products": CubeSpec(
+        "products",
+        "order_date",
+        "product_id",
+        ("product_name",),
+        ("total_quantity", "total_amount", "total_orders", "total_payments"),
+        "total_amount",
+    ),
+    "categories": CubeSpec(
+        "categories",
+        "order_date",
+        "category_id",
+        ("category_name",),
+        ("total_quantity", "total_amount", "total_orders", "total_payments"),
+        "total_amount",
+    ),
+    "customers": CubeSpec(
+        "customers",
+        "order_date",
+        "customer_id",
+        ("customer_name", "customer_email"),
+        ("total_quantity", "total_amount", "total_orders", "total_payments"),
+        "total_amount",
+    ),
+    "payments": CubeSpec(
+        "payments",
+        "payment_date",
+        "payment_method",
+        (),
+        ("total_orders", "total_quantity", "total_amount", "total_payments"),
+        "total_payments",
+    ),
+}
+
+# загруженные кубы процесса: имя -> (версия, метаданные, массив)
+_loaded: dict[str, tuple[str, dict, np.ndarray]] = {}
+
+
+def _cube_dir(name: str) -> str:
+    return os.path.join(settings.REPORT_CUBE_DIR, name)
+
+
+def _current_path(name: str) -> str:
+    return os.path.join(_cube_dir(name), "current.json")
+
+
+def _scale(metric: str) -> int:
+    return CUBE_SCALE if metric in ROUND_COLUMNS else 1
+
+
+def cube_query(spec: CubeSpec, model, since: date | None = None):
+    """Выборка для построения куба: метрики дня по ключу, масштабированные в целые"""
+    day = getattr(model, spec.date_column)
+    group = [day]
+    if spec.key_column:
+        group.append(getattr(model, spec.key_column))
+    group += [getattr(model, label) for label in spec.label_columns]
+    query = (
+        select(
+            *group,
+            *(
+                func.round(func.sum(getattr(model, metric)) * _scale(metric)).cast(
+                    BigInteger
+                )
+                for metric in spec.metrics
+            ),
+            func.count(),
+        )
+        .group_by(*group)
+        .order_by(day)
+    )
+    if since is not None:
+        query = query.where(day >= since)
+    return query
+
+
+def drop_cube(name: str):
+    """Снимает куб: запросы уходят в SQL, пока он не будет построен заново"""
+    if os.path.exists(_current_path(name)):
+        os.remove(_current_path(name))
+
+
+def write_cube(spec: CubeSpec, rows: list, since: date | None = None) -> bool:
+    """Строит и публикует префиксный индекс по строкам cube_query.
+
+    prefix[i] — накопленные суммы метрик за первые i дней, поэтому итог любого
+    диапазона — разность двух срезов. С since строки содержат только дни с since:
+    префикс текущей версии до since переиспользуется, пересчитывается только хвост.
+    False — куб превысил REPORT_CUBE_MAX_BYTES и снят.
+
+    Новая версия пишется в отдельный каталог, затем атомарно подменяется
+    current.json. Старые файлы удаляются сразу: открытые mmap остаются валидны.
+    """
+    has_key = spec.key_column is not None
+    metrics_from = 1 + has_key + len(spec.label_columns)
+
+    def group(row):
+        return tuple(row[1:metrics_from]) if has_key else None
+
+    previous = load_cube(spec.name) if since is not None else None
+    if previous and since > date.fromisoformat(previous[0]["start"]):
+        meta, prefix = previous
+        start = date.fromisoformat(meta["start"])
+        keep = min((since - start).days, meta["days"])
+        keys = {key: index for index, key in enumerate(_groups(meta))}
+    else:
+        if not rows:
+            drop_cube(spec.name)
+            return True
+        prefix = None
+        start, keep, keys = rows[0][0], 0, {}
+
+    for row in rows:
+        keys.setdefault(group(row), len(keys))
+    days = (rows[-1][0] - start).days + 1 if rows else keep
+
+    shape = (days + 1, len(keys), len(spec.metrics) + 1)
+    if np.prod(shape) * np.dtype(np.int64).itemsize > settings.REPORT_CUBE_MAX_BYTES:
+        drop_cube(spec.name)
+        return False
+
+    daily = np.zeros((days - keep, *shape[1:]), dtype=np.int64)
+    if rows:
+        day_index = np.fromiter(
+            ((row[0] - start).days - keep for row in rows), np.int64
+        )
+        key_index = np.fromiter((keys[group(row)] for row in rows), np.int64)
+        daily[day_index, key_index] = np.array(
+            [row[metrics_from:] for row in rows], dtype=np.int64
+        )
+    data = np.zeros(shape, dtype=np.int64)
+    if prefix is not None:
+        data[: keep + 1, : prefix.shape[1]] = prefix[: keep + 1]
+    np.cumsum(daily, axis=0, out=data[keep + 1 :])
+    data[keep + 1 :] += data[keep]
+
+    version = uuid.uuid4().hex
+    os.makedirs(os.path.join(_cube_dir(spec.name), version))
+    np.save(os.path.join(_cube_dir(spec.name), version, "prefix.npy"), data)
+    meta = {
+        "format": CUBE_FORMAT,
+        "version": version,
+        "start": start.isoformat(),
+        "days": days,
+        "keys": list(keys),
+    }
+    tmp_path = f"{_current_path(spec.name)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, default=str)
+    os.replace(tmp_path, _current_path(spec.name))
+
+    for entry in os.listdir(_cube_dir(spec.name)):
+        path = os.path.join(_cube_dir(spec.name), entry)
+        if os.path.isdir(path) and entry != version:
+            shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+async def build_cube(
+    repository, spec: CubeSpec, changed_months: list[str] | None = None
+) -> bool:
+    """Перестраивает куб; с changed_months — только начиная с первого изменённого месяца.
+
+    Месяцы — в формате YYYY-MM (см. update_month_fingerprints).
+    """
+    since = None
+    if changed_months is not None and load_cube(spec.name) is not None:
+        if not changed_months:
+            return True
+        since = date.fromisoformat(f"{min(changed_months)}-01")
+    rows = []
+    async for batch in repository.stream(cube_query(spec, repository.model, since)):
+        rows.extend(batch)
+    return await asyncio.to_thread(write_cube, spec, rows, since)
+
+
+def load_cube(name: str) -> tuple[dict, np.ndarray] | None:
+    """Текущая версия куба, открытая только на чтение через mmap (кэшируется в процессе)"""
+    try:
+        with open(_current_path(name), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        _loaded.pop(name, None)
+        return None
+    if meta.get("format") != CUBE_FORMAT:
+        return None
+    loaded = _loaded.get(name)
+    if loaded and loaded[0] == meta["version"]:
+        return loaded[1], loaded[2]
+    try:
+        data = np.load(
+            os.path.join(_cube_dir(name), meta["version"], "prefix.npy"), mmap_mode="r"
+        )
+    except FileNotFoundError:
+        # версию подменили между чтением current.json и открытием файла
+        return None
+    _loaded[name] = (meta["version"], meta, data)
+    return meta, data
+
+
+def _groups(meta: dict) -> list:
+    """Группы куба: (ключ, *подписи) либо None для куба без ключа"""
+    return [tuple(key) if key is not None else None for key in meta["keys"]]
+
+
+def _value(metric: str, total: int, rows: int):
+    if metric in AVG_COLUMNS:
+        return Decimal(int(total)) / CUBE_SCALE / rows
+    if metric in ROUND_COLUMNS:
+        return Decimal(int(total)) / CUBE_SCALE
+    return int(total)
+
+
+def cube_summary(
+    name: str,
+    date_from: date,
+    date_to: date,
+    key=None,
+    top: int | None = None,
+) -> tuple[list[str], list[tuple]] | None:
+    """Сводка за [date_from, date_to] разностью префиксных сумм куба.
+
+    Повторяет SQL-сводку: группы без строк не возвращаются, сортировка по
+    order_column по убыванию, затем top. None — куба нет, нужен SQL.
+    """
+    spec = CUBES[name]
+    cube = load_cube(name)
+    if cube is None:
+        return None
+    meta, data = cube
+    start = date.fromisoformat(meta["start"])
+    first = max((date_from - start).days, 0)
+    last = min((date_to - start).days, meta["days"] - 1)
+    if first > last:
+        return spec.columns, []
+
+    if key is not None:
+        key_indexes = np.array(
+            [index for index, group in enumerate(meta["keys"]) if group[0] == key],
+            dtype=np.int64,
+        )
+        if not len(key_indexes):
+            return spec.columns, []
+        totals = data[last + 1, key_indexes] - data[first, key_indexes]
+    else:
+        key_indexes = np.arange(len(meta["keys"]))
+        totals = data[last + 1] - data[first]
+
+    present = totals[:, -1] > 0
+    key_indexes, totals = key_indexes[present], totals[present]
+    if spec.order_column:
+        order = np.argsort(
+            -totals[:, spec.metrics.index(spec.order_column)], kind="stable"
+        )
+        if top:
+            order = order[:top]
+        key_indexes, totals = key_indexes[order], totals[order]
+
+    rows = []
+    for key_index, total in zip(key_indexes, totals):
+        row = list(meta["keys"][key_index]) if spec.key_column else []
+        row += [
+            _value(metric, total[i], total[-1]) for i, metric in enumerate(spec.metrics)
+        ]
+        rows.append(tuple(row))
+    return spec.columns, rows
@@ -0,0 +1,43 @@
+from src.config import settings
+from src.init import redis_manager
+
+THROUGHPUT_SMOOTHING = 0.2
+
+
+def _throughput_key(view: str) -> str:
+    return f"report_throughput:{view}"
+
+
+def range_days(date_from, date_to) -> int:
+    return (date_to - date_from).days + 1 if date_from and date_to else 0
+
+
+def plan_estimate(plan: dict) -> tuple[int, int, int]:
+    """(строк на выходе, строк в самом большом узле, ширина выходной строки)"""
+    scanned_rows = 0
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        scanned_rows = max(scanned_rows, int(node.get("Plan Rows", 0)))
+        nodes.extend(node.get("Plans", []))
+    return int(plan.get("Plan Rows", 0)), scanned_rows, int(plan.get("Plan Width", 0))
+
+
+async def get_view_throughput(view: str) -> float:
+    """Наблюдаемая скорость выгрузки представления (строк/с) или значение по умолчанию"""
+    raw = await redis_manager.get(_throughput_key(view))
+    return float(raw) if raw else float(settings.REPORT_ESTIMATE_ROWS_PER_SECOND)
+
+
+async def record_view_throughput(view: str, rows: int, seconds: float):
+    """Сглаженно обновляет скорость по факту выполненной детальной выгрузки"""
+    if rows <= 0 or seconds <= 0:
+        return
+    observed = rows / seconds
+    raw = await redis_manager.get(_throughput_key(view))
+    throughput = (
+        observed
+        if raw is None
+        else float(raw) * (1 - THROUGHPUT_SMOOTHING) + observed * THROUGHPUT_SMOOTHING
+    )
+    await redis_manager.set(_throughput_key(view), f"{throughput:.0f}")
@@ -0,0 +1,140 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+from src.config import settings
+from src.init import redis_manager
+
+# Продлить/снять аренду может только её владелец
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _lease_key(key: str) -> str:
+    return f"report_flight:{key}"
+
+
+def _followers_key(key: str) -> str:
+    return f"report_flight:{key}:followers"
+
+
+async def acquire_flight(key: str, task_id: str) -> bool:
+    """Пытается стать лидером для ключа; повторный вызов лидером тоже возвращает True"""
+    acquired = await redis_manager.redis.set(
+        _lease_key(key),
+        task_id,
+        nx=True,
+        ex=settings.REPORT_FLIGHT_LEASE_SECONDS,
+    )
+    if acquired:
+        return True
+    return await redis_manager.get(_lease_key(key)) == task_id
+
+
+async def join_flight(key: str, task_id: str):
+    """Регистрирует задачу как ведомую: результат ей отдаст лидер"""
+    await redis_manager.redis.sadd(_followers_key(key), task_id)
+    await redis_manager.redis.expire(
+        _followers_key(key), settings.REPORT_FLIGHT_FOLLOWERS_TTL_SECONDS
+    )
+
+
+async def renew_flight(key: str, task_id: str) -> bool:
+    return await _renew_lease(_lease_key(key), task_id)
+
+
+async def release_flight(key: str, task_id: str):
+    await _release_lease(_lease_key(key), task_id)
+
+
+async def pop_followers(key: str) -> list[str]:
+    """Забирает всех ведомых ключа (атомарно относительно других лидеров)"""
+    followers = await redis_manager.redis.spop(_followers_key(key), 10_000)
+    return [follower.decode() for follower in followers or []]
+
+
+def _claim_key(task_id: str) -> str:
+    return f"report_claim:{task_id}"
+
+
+async def _renew_lease(lease_key: str, owner: str) -> bool:
+    return bool(
+        await redis_manager.redis.eval(
+            RENEW_SCRIPT,
+            1,
+            lease_key,
+            owner,
+            settings.REPORT_FLIGHT_LEASE_SECONDS,
+        )
+    )
+
+
+async def _release_lease(lease_key: str, owner: str):
+    await redis_manager.redis.eval(RELEASE_SCRIPT, 1, lease_key, owner)
+
+
+@asynccontextmanager
+async def _hold_lease(lease_key: str, owner: str):
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(settings.REPORT_FLIGHT_LEASE_SECONDS / 3)
+            await _renew_lease(lease_key, owner)
+
+    renewer = asyncio.create_task(heartbeat())
+    try:
+        yield
+    finally:
+        renewer.cancel()
+        await _release_lease(lease_key, owner)
+
+
+@asynccontextmanager
+async def hold_flight(key: str, task_id: str):
+    """Продлевает аренду лидера, пока идёт построение отчёта.
+
+    Если лидер упадёт, аренда истечёт, и одна из ведомых задач займёт его место.
+    """
+    async with _hold_lease(_lease_key(key), task_id):
+        yield
+
+
+@asynccontextmanager
+async def _claim(lease_key: str):
+    owner = uuid.uuid4().hex
+    acquired = await redis_manager.redis.set(
+        lease_key, owner, nx=True, ex=settings.REPORT_FLIGHT_LEASE_SECONDS
+    )
+    if not acquired:
+        yield False
+        return
+    async with _hold_lease(lease_key, owner):
+        yield True
+
+
+@asynccontextmanager
+async def claim_task(task_id: str):
+    """Эксклюзивное выполнение задачи отчёта одним воркером.
+
+    Одна задача может оказаться в очереди несколько раз (повторная постановка
+    при старении приоритета, страховка single-flight); дубль, пришедший во время
+    выполнения, получает False и завершается.
+    """
+    async with _claim(_claim_key(task_id)) as claimed:
+        yield claimed
+
+
+@asynccontextmanager
+async def claim_refresh():
+    """Один REFRESH представлений за раз: пересекающийся запуск beat получает False"""
+    async with _claim("mv_refresh:lock") as claimed:
+        yield claimed
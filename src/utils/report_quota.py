@@ -0,0 +1,162 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from src.config import settings
+from src.exceptions import ReportQuotaExceededException
+from src.init import redis_manager
+from src.tasks.celery_app import (
+    PRIORITY_LOWEST,
+    REPORTS_BULK_QUEUE,
+    REPORTS_FAST_QUEUE,
+    WORKER_TOPOLOGY,
+)
+
+PENDING_KEY = "report_quota:pending"
+HEAVY_KEY = "report_quota:heavy"
+
+# Допуск заявки одним скриптом: лимит активных задач пользователя, затем token bucket.
+# Возвращает {1, активных задач с учётом новой} | {0, секунд до токена} | {-1, глубина очереди}
+ADMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+redis.call('zremrangebyscore', KEYS[2], '-inf', ARGV[5])
+redis.call('zremrangebyscore', KEYS[3], '-inf', ARGV[5])
+local active = redis.call('zcard', KEYS[2])
+if ARGV[6] ~= '' and active >= tonumber(ARGV[4]) then
+    return {-1, redis.call('zcard', KEYS[3])}
+end
+local bucket = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+if tokens < 1 then
+    return {0, math.ceil((1 - tokens) / rate)}
+end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+redis.call('expire', KEYS[1], math.ceil(burst / rate) + 1)
+if ARGV[6] ~= '' then
+    redis.call('zadd', KEYS[2], now, ARGV[6])
+    redis.call('zadd', KEYS[3], now, ARGV[6])
+    active = active + 1
+end
+return {1, active}
+"""
+
+# Глобальный слот тяжёлого запроса: score — момент истечения аренды
+HEAVY_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+if redis.call('zscore', KEYS[1], ARGV[4])
+    or redis.call('zcard', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('zadd', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+def _bucket_key(user_id) -> str:
+    return f"report_quota:bucket:{user_id}"
+
+
+def _active_key(user_id) -> str:
+    return f"report_quota:active:{user_id}"
+
+
+def _role_multiplier(role: str | None) -> float:
+    return settings.REPORT_QUOTA_ROLE_MULTIPLIER.get(role or "", 1.0)
+
+
+def _retry_after_for_depth(depth: int) -> int:
+    """Оценка ожидания по глубине очереди: задачи впереди / параллельные слоты воркеров"""
+    slots = sum(
+        worker["concurrency"]
+        for worker in WORKER_TOPOLOGY.values()
+        if {REPORTS_FAST_QUEUE, REPORTS_BULK_QUEUE} & set(worker["queues"])
+    )
+    return max(
+        1, math.ceil(depth * settings.REPORT_QUOTA_AVG_TASK_SECONDS / max(slots, 1))
+    )
+
+
+async def admit_report(user_id, role: str | None, task_id: str | None) -> int:
+    """Проверяет квоты пользователя и резервирует место под задачу task_id.
+
+    Без task_id (готовый результат из кэша) расходуется только токен частоты.
+    Возвращает число активных задач пользователя, иначе ReportQuotaExceededException.
+    """
+    multiplier = _role_multiplier(role)
+    now = time.time()
+    status, value = await redis_manager.redis.eval(
+        ADMIT_SCRIPT,
+        3,
+        _bucket_key(user_id),
+        _active_key(user_id),
+        PENDING_KEY,
+        now,
+        settings.REPORT_QUOTA_RATE_PER_MINUTE * multiplier / 60,
+        settings.REPORT_QUOTA_BURST * multiplier,
+        int(settings.REPORT_QUOTA_MAX_ACTIVE_PER_USER * multiplier),
+        now - settings.REPORT_QUOTA_ACTIVE_TTL_SECONDS,
+        task_id or "",
+    )
+    if status == 1:
+        return int(value)
+    if status == 0:
+        raise ReportQuotaExceededException(int(value))
+    raise ReportQuotaExceededException(_retry_after_for_depth(int(value)))
+
+
+async def release_report(user_id, task_id: str):
+    """Освобождает место задачи в квоте пользователя"""
+    await redis_manager.redis.zrem(_active_key(user_id), task_id)
+    await redis_manager.redis.zrem(PENDING_KEY, task_id)
+
+
+def fair_share_priority(priority: int, active: int) -> int:
+    """Чем больше у пользователя задач в работе, тем ниже приоритет следующей"""
+    penalty = min(max(active - 1, 0), settings.REPORT_QUOTA_FAIR_SHARE_STEPS)
+    return min(priority + penalty, PRIORITY_LOWEST)
+
+
+async def _renew_heavy(task_id: str):
+    await redis_manager.redis.zadd(
+        HEAVY_KEY,
+        {task_id: time.time() + settings.REPORT_FLIGHT_LEASE_SECONDS},
+        xx=True,
+    )
+
+
+@asynccontextmanager
+async def heavy_slot(task_id: str):
+    """Глобальный лимит одновременно выполняемых тяжёлых запросов.
+
+    Отдаёт False, если все REPORT_QUOTA_MAX_HEAVY слотов заняты.
+    """
+    now = time.time()
+    acquired = await redis_manager.redis.eval(
+        HEAVY_SCRIPT,
+        1,
+        HEAVY_KEY,
+        now,
+        now + settings.REPORT_FLIGHT_LEASE_SECONDS,
+        settings.REPORT_QUOTA_MAX_HEAVY,
+        task_id,
+    )
+    if not acquired:
+        yield False
+        return
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(settings.REPORT_FLIGHT_LEASE_SECONDS / 3)
+            await _renew_heavy(task_id)
+
+    renewer = asyncio.create_task(heartbeat())
+    try:
+        yield True
+    finally:
+        renewer.cancel()
+        await redis_manager.redis.zrem(HEAVY_KEY, task_id)
@@ -0,0 +1,54 @@
+import calendar
+from datetime import date, timedelta
+
+# какие свёртки допустимы для гранулярности отчёта: недели, пересекающие границу
+# месяца, нельзя отнести к одному месяцу/кварталу, а месяцы — к одной неделе
+ALLOWED_GRAINS = {
+    None: ("month", "week"),
+    "day": (),
+    "week": ("week",),
+    "month": ("month", "week"),
+    "quarter": ("month", "week"),
+}
+
+
+def _month_end(day: date) -> date:
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def rollup_pieces(
+    date_from: date, date_to: date, granularity: str | None = None
+) -> list[tuple[str, date, date]]:
+    """Делит диапазон на (grain, начало, конец): целые месяцы, целые недели и дни.
+
+    Берётся самая крупная свёртка, целиком лежащая в диапазоне; соседние куски
+    одной свёртки объединяются.
+    """
+    allowed = ALLOWED_GRAINS[granularity]
+    pieces = []
+    day = date_from
+    while day <= date_to:
+        month_end = _month_end(day)
+        week_end = day + timedelta(days=6)
+        # неделя не должна перекрывать начало месяца, который можно взять целиком
+        crosses_month = week_end.month != day.month and (
+            granularity in ("month", "quarter")
+            or ("month" in allowed and _month_end(week_end) <= date_to)
+        )
+        if "month" in allowed and day.day == 1 and month_end <= date_to:
+            grain, end = "month", month_end
+        elif (
+            "week" in allowed
+            and day.weekday() == 0
+            and week_end <= date_to
+            and not crosses_month
+        ):
+            grain, end = "week", week_end
+        else:
+            grain, end = "day", day
+        if pieces and pieces[-1][0] == grain:
+            pieces[-1] = (grain, pieces[-1][1], end)
+        else:
+            pieces.append((grain, day, end))
+        day = end + timedelta(days=1)
+    return pieces
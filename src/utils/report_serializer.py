@@ -0,0 +1,128 @@
+import typing
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache, partial
+
+from pydantic import BaseModel
+
+ROUND_COLUMNS = {"total_amount", "avg_check", "total_payments"}
+INT_COLUMNS = {"total_quantity", "total_orders", "total_items"}
+MONEY_SCALE = 2
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    kind: str  # money | int | date | text
+    scale: int = 0
+
+
+def _unwrap_optional(annotation):
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    return args[0] if len(args) == 1 else annotation
+
+
+@lru_cache
+def _schema_specs(row_schema: type[BaseModel]) -> dict[str, ColumnSpec]:
+    """Типы колонок по полям pydantic-схемы строки отчёта (считается один раз)"""
+    specs = {}
+    for name, field in row_schema.model_fields.items():
+        annotation = _unwrap_optional(field.annotation)
+        if annotation is Decimal:
+            scale = next(
+                (
+                    m.decimal_places
+                    for m in field.metadata
+                    if hasattr(m, "decimal_places")
+                ),
+                None,
+            )
+            specs[name] = ColumnSpec(
+                name, "money", MONEY_SCALE if scale is None else scale
+            )
+        elif annotation is int:
+            specs[name] = ColumnSpec(name, "int")
+        elif annotation is date:
+            specs[name] = ColumnSpec(name, "date")
+        else:
+            specs[name] = ColumnSpec(name, "text")
+    return specs
+
+
+def _fallback_spec(name: str) -> ColumnSpec:
+    if name in ROUND_COLUMNS:
+        return ColumnSpec(name, "money", MONEY_SCALE)
+    if name in INT_COLUMNS:
+        return ColumnSpec(name, "int")
+    return ColumnSpec(name, "text")
+
+
+def _to_decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def money_column(scale: int):
+    """Форматтер денежной колонки: округление до scale знаков, как round() в Postgres"""
+    exponent = Decimal(1).scaleb(-scale)
+    quantize = partial(Decimal.quantize, exp=exponent, rounding=ROUND_HALF_UP)
+
+    def format_column(values):
+        try:
+            return list(map(quantize, values))
+        except TypeError:
+            # NULL или не-Decimal значения — медленный путь только для этой пачки
+            return [
+                None if v is None else _to_decimal(v).quantize(exponent, ROUND_HALF_UP)
+                for v in values
+            ]
+
+    return format_column
+
+
+def int_column(values):
+    try:
+        return list(map(int, values))
+    except TypeError:
+        return [None if v is None else int(v) for v in values]
+
+
+class ColumnPlan:
+    """План сериализации строк отчёта: порядок колонок и форматтер каждой.
+
+    Строится один раз на выгрузку; пачки кортежей из БД форматируются
+    по колонкам, без словарей и pydantic-моделей на строку.
+    """
+
+    def __init__(self, specs: list[ColumnSpec]):
+        self.specs = specs
+        self.columns = [spec.name for spec in specs]
+        self._formatters = []
+        for index, spec in enumerate(specs):
+            if spec.kind == "money":
+                self._formatters.append((index, money_column(spec.scale)))
+            elif spec.kind == "int":
+                self._formatters.append((index, int_column))
+
+    def format_columns(self, rows) -> list:
+        """Пачка строк → список колонок с применёнными форматтерами"""
+        columns = list(zip(*rows))
+        for index, formatter in self._formatters:
+            columns[index] = formatter(columns[index])
+        return columns
+
+    def format_batch(self, rows):
+        """Пачка строк → строки, готовые для csv.writer.writerows"""
+        if not rows:
+            return []
+        if not self._formatters:
+            return rows
+        return zip(*self.format_columns(rows))
+
+
+def build_column_plan(
+    row_schema: type[BaseModel] | None, columns: list[str]
+) -> ColumnPlan:
+    """План для колонок запроса; колонки вне схемы определяются по имени"""
+    specs = _schema_specs(row_schema) if row_schema else {}
+    return ColumnPlan([specs.get(name) or _fallback_spec(name) for name in columns])
@@ -0,0 +1,111 @@
+import csv
+import shutil
+from datetime import date, timedelta
+
+from src.utils.report_compression import open_compressed_text
+from src.utils.report_serializer import INT_COLUMNS, ROUND_COLUMNS
+
+# Служебная колонка шардовых сводок: сколько дневных строк свернулось в группу
+SHARD_WEIGHT_COLUMN = "shard_rows"
+AVG_COLUMNS = {"avg_check"}
+
+
+def split_date_range(
+    date_from: date, date_to: date, shard_days: int
+) -> list[tuple[date, date]]:
+    """Делит [date_from, date_to] на последовательные интервалы по shard_days дней"""
+    shards = []
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=shard_days - 1), date_to)
+        shards.append((start, end))
+        start = end + timedelta(days=1)
+    return shards
+
+
+def merge_part_files(
+    part_paths: list[str],
+    file_path: str,
+    limit: int | None = None,
+    compression: str | None = None,
+):
+    """Склеивает несжатые CSV-части (каждая со своим заголовком) в порядке шардов.
+
+    Части уже отсортированы по дате, поэтому склейка сохраняет общий порядок,
+    а top детального отчёта — это первые limit строк результата.
+    Итоговый файл сжимается при записи, если задан compression.
+    """
+    written = 0
+    lineterminator = None
+    with open_compressed_text(file_path, compression) as out:
+        for part_path in part_paths:
+            with open(part_path, newline="", encoding="utf-8") as part:
+                header = part.readline()
+                if not header:
+                    continue
+                # COPY пишет \n, csv-модуль — \r\n: стиль задаёт первая часть,
+                # части другого стиля переписываются построчно
+                ending = "\r\n" if header.endswith("\r\n") else "\n"
+                if lineterminator is None:
+                    lineterminator = ending
+                    out.write(header)
+                    writer = csv.writer(
+                        out, delimiter=";", lineterminator=lineterminator
+                    )
+                if limit is None and ending == lineterminator:
+                    shutil.copyfileobj(part, out)
+                    continue
+                for row in csv.reader(part, delimiter=";"):
+                    if limit is not None and written >= limit:
+                        return
+                    writer.writerow(row)
+                    written += 1
+
+
+def reaggregate(
+    columns: list[str],
+    rows,
+    order_column: str | None = None,
+    limit: int | None = None,
+):
+    """Сворачивает частичные сводки шардов в итоговую.
+
+    Метрики суммируются по ключевым колонкам, средние (avg_check) пересчитываются
+    как взвешенные по числу дневных строк шарда. Затем — сортировка и top.
+    """
+    weight_index = columns.index(SHARD_WEIGHT_COLUMN)
+    metric_indexes = [
+        i for i, column in enumerate(columns) if column in ROUND_COLUMNS | INT_COLUMNS
+    ]
+    key_indexes = [
+        i for i in range(len(columns)) if i != weight_index and i not in metric_indexes
+    ]
+
+    groups: dict[tuple, dict[int, object]] = {}
+    for row in rows:
+        key = tuple(row[i] for i in key_indexes)
+        weight = row[weight_index]
+        totals = groups.setdefault(key, dict.fromkeys(metric_indexes + [-1], 0))
+        for i in metric_indexes:
+            value = row[i] or 0
+            totals[i] += value * weight if columns[i] in AVG_COLUMNS else value
+        totals[-1] += weight
+
+    out_columns = [c for c in columns if c != SHARD_WEIGHT_COLUMN]
+    result = []
+    for key, totals in groups.items():
+        values = dict(zip(key_indexes, key))
+        for i in metric_indexes:
+            values[i] = (
+                totals[i] / totals[-1] if columns[i] in AVG_COLUMNS else totals[i]
+            )
+        result.append(
+            tuple(values[i] for i in range(len(columns)) if i != weight_index)
+        )
+
+    if order_column:
+        order_index = out_columns.index(order_column)
+        result.sort(key=lambda row: row[order_index] or 0, reverse=True)
+    if limit:
+        result = result[:limit]
+    return out_columns, result
@@ -0,0 +1,79 @@
+import json
+import time
+from dataclasses import dataclass, field
+
+from src.config import settings
+from src.exceptions import ReportCancelledException
+from src.init import redis_manager
+from src.utils.report_cancel import is_cancel_requested
+
+
+def _progress_key(task_id: str) -> str:
+    return f"report_progress:{task_id}"
+
+
+@dataclass
+class ExportStats:
+    """Счётчики выгрузки одной задачи; общие для всех шардов отчёта.
+
+    Без task_id прогресс никуда не публикуется (бенчмарки, служебные выгрузки).
+    """
+
+    task_id: str | None = None
+    rows: int = 0
+    bytes: int = 0
+    query_seconds: float = 0.0
+    write_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+    published: float = 0.0
+
+    @property
+    def query_ms(self) -> int:
+        return int(self.query_seconds * 1000)
+
+    @property
+    def write_ms(self) -> int:
+        return int(self.write_seconds * 1000)
+
+    async def add(self, rows: int = 0, bytes: int = 0):
+        """Учитывает записанную пачку и публикует прогресс не чаще интервала.
+
+        Там же проверяется флаг отмены: отменённая выгрузка прерывается
+        ReportCancelledException между пачками.
+        """
+        self.rows += rows
+        self.bytes += bytes
+        now = time.perf_counter()
+        if (
+            self.task_id
+            and now - self.published >= settings.REPORT_PROGRESS_INTERVAL_SECONDS
+        ):
+            self.published = now
+            if await is_cancel_requested(self.task_id):
+                raise ReportCancelledException()
+            await publish_progress(self)
+
+
+async def publish_progress(stats: ExportStats):
+    elapsed = time.perf_counter() - stats.started
+    await redis_manager.set(
+        _progress_key(stats.task_id),
+        json.dumps(
+            {
+                "rows": stats.rows,
+                "bytes": stats.bytes,
+                "elapsed_ms": int(elapsed * 1000),
+                "updated_at": time.time(),
+            }
+        ),
+        expire=settings.REPORT_PROGRESS_TTL_SECONDS,
+    )
+
+
+async def get_progress(task_id: str) -> dict | None:
+    raw = await redis_manager.get(_progress_key(task_id))
+    return json.loads(raw) if raw else None
+
+
+async def clear_progress(task_id: str):
+    await redis_manager.delete(_progress_key(task_id))
@@ -0,0 +1,183 @@
+import csv
+
+from sqlalchemy import BigInteger, Numeric, cast, func, select
+
+from src.config import settings
+from src.utils.report_compression import open_compressed_text
+from src.utils.report_serializer import INT_COLUMNS, ROUND_COLUMNS, ColumnPlan
+
+
+def copy_select(query):
+    """Оборачивает запрос отчёта так, чтобы округление и приведение типов делал Postgres"""
+    subquery = query.subquery()
+    columns = []
+    for column in subquery.c:
+        if column.key in ROUND_COLUMNS:
+            column = func.round(cast(column, Numeric), 2).label(column.key)
+        elif column.key in INT_COLUMNS:
+            column = cast(column, BigInteger).label(column.key)
+        columns.append(column)
+    return select(*columns)
+
+
+class ReportWriter:
+    """Базовый писатель отчёта: принимает пачки строк-кортежей в порядке columns"""
+
+    extension: str = ""
+    media_type: str = ""
+
+    def __init__(
+        self, file_path: str, plan: ColumnPlan, compression: str | None = None
+    ):
+        self.file_path = file_path
+        self.plan = plan
+        self.columns = plan.columns
+        self.compression = compression
+        self.rows = 0
+
+    def write_batch(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class CsvReportWriter(ReportWriter):
+    """Потоковая запись отчёта в CSV: заголовок пишется сразу, строки — пачками.
+
+    При compression (gzip/zstd) файл сжимается по ходу записи.
+    """
+
+    extension = "csv"
+    media_type = "text/csv"
+
+    def __init__(
+        self, file_path: str, plan: ColumnPlan, compression: str | None = None
+    ):
+        super().__init__(file_path, plan, compression)
+        self._file = open_compressed_text(file_path, compression)
+        self._writer = csv.writer(self._file, delimiter=";")
+        self._writer.writerow(self.columns)
+
+    def write_batch(self, rows):
+        self._writer.writerows(self.plan.format_batch(rows))
+        # сбрасываем буфер, чтобы данные попадали на диск, пока идёт выборка;
+        # сжатый поток не сбрасываем — это ухудшило бы степень сжатия
+        if self.compression is None:
+            self._file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowReportWriter(ReportWriter):
+    """Общая часть колоночных форматов: схема Arrow и сборка RecordBatch из пачки.
+
+    Сжатие у колоночных форматов внутреннее, параметр compression не используется.
+    """
+
+    def __init__(
+        self, file_path: str, plan: ColumnPlan, compression: str | None = None
+    ):
+        super().__init__(file_path, plan)
+        import pyarrow
+
+        self.pa = pyarrow
+        self.schema = pyarrow.schema(
+            [pyarrow.field(spec.name, self._arrow_type(spec)) for spec in plan.specs]
+        )
+
+    def _arrow_type(self, spec):
+        if spec.kind == "money":
+            return self.pa.decimal128(18, spec.scale)
+        if spec.kind == "int":
+            return self.pa.int64()
+        if spec.kind == "date":
+            return self.pa.date32()
+        return self.pa.string()
+
+    def _record_batch(self, rows):
+        arrays = [
+            self.pa.array(values, type=field.type)
+            for field, values in zip(self.schema, self.plan.format_columns(rows))
+        ]
+        return self.pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+class ParquetReportWriter(ArrowReportWriter):
+    """Parquet с типами decimal/date, группами строк и сжатием"""
+
+    extension = "parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(
+        self, file_path: str, plan: ColumnPlan, compression: str | None = None
+    ):
+        super().__init__(file_path, plan)
+        import pyarrow.parquet
+
+        self._writer = pyarrow.parquet.ParquetWriter(
+            file_path, self.schema, compression=settings.REPORT_PARQUET_COMPRESSION
+        )
+        self._buffer = []
+        self._buffered = 0
+
+    def write_batch(self, rows):
+        if not rows:
+            return
+        self._buffer.append(self._record_batch(rows))
+        self._buffered += len(rows)
+        self.rows += len(rows)
+        if self._buffered >= settings.REPORT_PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(
+                self.pa.Table.from_batches(self._buffer),
+                row_group_size=settings.REPORT_PARQUET_ROW_GROUP_SIZE,
+            )
+        self._buffer = []
+        self._buffered = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+class ArrowIpcReportWriter(ArrowReportWriter):
+    """Arrow IPC (файловый формат), каждая пачка — отдельный RecordBatch"""
+
+    extension = "arrow"
+    media_type = "application/vnd.apache.arrow.file"
+
+    def __init__(
+        self, file_path: str, plan: ColumnPlan, compression: str | None = None
+    ):
+        super().__init__(file_path, plan)
+        self._sink = self.pa.OSFile(file_path, "wb")
+        self._writer = self.pa.ipc.new_file(
+            self._sink,
+            self.schema,
+            options=self.pa.ipc.IpcWriteOptions(
+                compression=settings.REPORT_ARROW_COMPRESSION
+            ),
+        )
+
+    def write_batch(self, rows):
+        if not rows:
+            return
+        self._writer.write_batch(self._record_batch(rows))
+        self.rows += len(rows)
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+REPORT_WRITERS: dict[str, type[ReportWriter]] = {
+    "csv": CsvReportWriter,
+    "parquet": ParquetReportWriter,
+    "arrow": ArrowIpcReportWriter,
+}
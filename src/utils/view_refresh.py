@@ -0,0 +1,24 @@
+import time
+
+from src.init import redis_manager
+
+
+def _refresh_key(view: str) -> str:
+    return f"mv_refresh:{view}"
+
+
+async def record_view_refresh(view: str, seconds: float, rows: int):
+    """Длительность и число строк последнего REFRESH представления"""
+    await redis_manager.redis.hset(
+        _refresh_key(view),
+        mapping={
+            "duration_ms": int(seconds * 1000),
+            "rows": rows,
+            "refreshed_at": int(time.time()),
+        },
+    )
+
+
+async def get_view_refresh(view: str) -> dict[str, int]:
+    raw = await redis_manager.redis.hgetall(_refresh_key(view))
+    return {field.decode(): int(value) for field, value in raw.items()}
@@ -0,0 +1,44 @@
+import logging
+
+from redis.exceptions import RedisError
+from sqlalchemy import text
+
+from src.init import redis_manager
+from src.schemas.report.report_view_state import ReportViewState
+
+# Копия report_view_state в Redis: читается на каждом ключе кэша отчёта и в API,
+# поэтому без запроса в БД. Публикуется задачей обновления после коммита.
+STATE_KEY = "report_view_state"
+
+
+async def publish_view_states(states: list[ReportViewState]):
+    if states:
+        await redis_manager.redis.hset(
+            STATE_KEY,
+            mapping={state.view_name: state.model_dump_json() for state in states},
+        )
+
+
+async def load_view_states(session) -> list[ReportViewState]:
+    result = await session.execute(text("SELECT * FROM report_view_state"))
+    return [ReportViewState.model_validate(dict(row)) for row in result.mappings()]
+
+
+async def get_view_state(view: str, session=None) -> ReportViewState | None:
+    """Состояние представления из Redis; при промахе или недоступном Redis — из БД"""
+    try:
+        raw = await redis_manager.redis.hget(STATE_KEY, view)
+    except (RedisError, AttributeError) as e:
+        # AttributeError — Redis не подключён
+        logging.warning(f"Report view state is read from DB, Redis failed: {e}")
+        if session is None:
+            return None
+        states = await load_view_states(session)
+    else:
+        if raw is not None:
+            return ReportViewState.model_validate_json(raw)
+        if session is None:
+            return None
+        states = await load_view_states(session)
+        await publish_view_states(states)
+    return next((state for state in states if state.view_name == view), None)
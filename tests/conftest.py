@@ -16,6 +16,7 @@ from utils.db_manager import DBManager
 
 from src.services import auth as auth_service_module
 from src.connectors import redis_connector
+from src.utils.report_cache import EVICT_SCRIPT
 from utils.password_utils import get_password_hash
 
 
@@ -29,6 +30,38 @@ class DummyRedis:
     async def delete(self, *args, **kwargs):
         return True
 
+    async def eval(self, script, *args, **kwargs):
+        if script == EVICT_SCRIPT:
+            return []
+        return [1, 1]
+
+    async def zrem(self, *args, **kwargs):
+        return 1
+
+    async def hget(self, *args, **kwargs):
+        return None
+
+    async def hset(self, *args, **kwargs):
+        return 1
+
+    async def hgetall(self, *args, **kwargs):
+        return {}
+
+    async def incrby(self, *args, **kwargs):
+        return 0
+
+    async def expire(self, *args, **kwargs):
+        return True
+
+    async def sadd(self, *args, **kwargs):
+        return 1
+
+    async def smembers(self, *args, **kwargs):
+        return set()
+
+    async def zadd(self, *args, **kwargs):
+        return 1
+
 
 @pytest.fixture(scope="session", autouse=True)
 def patch_redis():
@@ -0,0 +1,263 @@
+import importlib
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from src.models.commerce.category import CategoryORM
+from src.models.commerce.customer import CustomerORM
+from src.models.commerce.order import OrderORM
+from src.models.commerce.order_item import OrderItemOrm
+from src.models.commerce.payment import PaymentORM
+from src.models.commerce.product import ProductORM
+from src.models.commerce.supplier import SupplierORM
+from src.models.report.rollups import ROLLUP_GRAINS
+from src.repositories.report.report_aggregate import (
+    DAILY_AGGREGATES,
+    ROLLUP_METRICS,
+    ROLLUP_SOURCES,
+)
+
+# триггеры и исходные определения представлений берутся из самой миграции:
+# тестовая база создаётся через create_all и их не содержит
+migration = importlib.import_module("src.migrations.versions.a6c2d8e4f1b7_")
+
+START = date(2052, 3, 1)
+DAYS = 5
+# платежи бывают на следующий день после заказа, новый заказ — после START + DAYS
+END = START + timedelta(days=DAYS + 3)
+# начало самой ранней недели или месяца, в которые попадает START
+PERIODS_FROM = date(2052, 2, 1)
+METHODS = ["card", "cash", "sbp"]
+
+
+async def execute_script(db, sql: str):
+    """Несколько команд одним вызовом — через соединение драйвера"""
+    connection = await db.session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.execute(sql)
+
+
+async def maintain(db) -> list[date]:
+    """То же, что делает обслуживание: забрать даты и пересчитать их"""
+    days = await db.report_aggregate.take_dirty_dates()
+    await db.report_aggregate.rebuild_dates(days)
+    await db.report_aggregate.rebuild_rollups(days)
+    await db.commit()
+    return days
+
+
+async def assert_matches_full_group_by(db):
+    params = {"start": START, "end": END}
+    for table, (column, _) in DAILY_AGGREGATES.items():
+        keys = migration.DAILY_KEYS[table]
+        where = f'WHERE "{column}" BETWEEN :start AND :end'
+        actual = (
+            await db.session.execute(text(f"SELECT * FROM {table} {where}"), params)
+        ).mappings()
+        expected = (
+            await db.session.execute(
+                text(f"SELECT * FROM ({migration.DAILY_VIEWS[table]}) v {where}"),
+                params,
+            )
+        ).mappings()
+
+        def by_key(rows):
+            return {tuple(row[key] for key in keys): dict(row) for row in rows}
+
+        expected = by_key(expected)
+        assert expected, table
+        assert by_key(actual) == expected, table
+
+
+async def assert_rollups_match_daily(db):
+    params = {"start": PERIODS_FROM, "end": END}
+    for source, (day, keys, labels) in ROLLUP_SOURCES.items():
+        for grain in ROLLUP_GRAINS:
+            table = f"{source}_{grain}ly"
+            columns = [f"date_trunc('{grain}', {day})::date AS {day}", *keys]
+            columns += [f"max({label}) AS {label}" for label in labels]
+            columns += [f"sum({metric}) AS {metric}" for metric in ROLLUP_METRICS]
+            actual = (
+                await db.session.execute(
+                    text(f"SELECT * FROM {table} WHERE {day} BETWEEN :start AND :end"),
+                    params,
+                )
+            ).mappings()
+            expected = (
+                await db.session.execute(
+                    text(
+                        f"SELECT {', '.join(columns)} FROM {source}_daily "
+                        f"WHERE {day} BETWEEN :start AND :end "
+                        f"GROUP BY 1, {', '.join(keys)}"
+                    ),
+                    params,
+                )
+            ).mappings()
+
+            def by_key(rows):
+                return {
+                    tuple(row[key] for key in [day, *keys]): {
+                        column: row[column] for column in [*labels, *ROLLUP_METRICS]
+                    }
+                    for row in rows
+                }
+
+            expected = by_key(expected)
+            assert expected, table
+            assert by_key(actual) == expected, table
+
+
+def add_order(db, rng, customer, products, order_date: date) -> OrderORM:
+    order = OrderORM(
+        customer=customer,
+        order_date=order_date,
+        status="completed",
+        total_amount=Decimal(rng.randint(100, 10000)),
+    )
+    for product in rng.sample(products, rng.randint(1, len(products))):
+        order.order_items.append(
+            OrderItemOrm(
+                product=product,
+                quantity=rng.randint(1, 5),
+                price=Decimal(rng.randint(10, 1000)),
+            )
+        )
+    for _ in range(rng.randint(1, 2)):
+        paid_on = order_date + timedelta(days=rng.randint(0, 1))
+        order.payments.append(
+            PaymentORM(
+                payment_date=datetime.combine(paid_on, time(12)),
+                amount=Decimal(rng.randint(100, 5000)),
+                method=rng.choice(METHODS),
+            )
+        )
+    db.session.add(order)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_incremental_maintenance_matches_full_group_by(db):
+    rng = random.Random(22)
+    await execute_script(db, migration.TRIGGERS_SQL)
+    await db.commit()
+
+    supplier = SupplierORM(name="maintenance supplier")
+    categories = [CategoryORM(name=f"maintenance category {i}") for i in range(2)]
+    products = [
+        ProductORM(
+            name=f"maintenance product {i}",
+            price=Decimal(100),
+            category=categories[i % 2],
+            supplier=supplier,
+        )
+        for i in range(3)
+    ]
+    customers = [
+        CustomerORM(
+            name=f"maintenance customer {i}",
+            email=f"maintenance{i}@example.com",
+            phone=f"+7900000000{i}",
+            address="",
+        )
+        for i in range(2)
+    ]
+    db.session.add_all([supplier, *categories, *products, *customers])
+    orders = [
+        add_order(db, rng, customers[i % 2], products, START + timedelta(days=day))
+        for day in range(DAYS)
+        for i in range(3)
+    ]
+    try:
+        await db.commit()
+        days = await maintain(db)
+        assert days[0] == START
+        await assert_matches_full_group_by(db)
+        await assert_rollups_match_daily(db)
+
+        moved, changed, dropped = orders[1], orders[4], orders[7]
+        # заказ переезжает на другую дату, позиция и платёж меняются
+        await db.session.execute(
+            text("UPDATE orders SET order_date = :day WHERE id = :id"),
+            {"day": START + timedelta(days=3), "id": moved.id},
+        )
+        await db.session.execute(
+            text("UPDATE order_items SET quantity = quantity + 7 WHERE id = :id"),
+            {"id": changed.order_items[0].id},
+        )
+        await db.session.execute(
+            text(
+                "UPDATE payments SET method = 'transfer', "
+                "payment_date = payment_date + interval '2 day' WHERE id = :id"
+            ),
+            {"id": changed.payments[0].id},
+        )
+        # заказ удаляется целиком, у другого пропадает платёж
+        for table in ("payments", "order_items"):
+            await db.session.execute(
+                text(f"DELETE FROM {table} WHERE order_id = :id"), {"id": dropped.id}
+            )
+        await db.session.execute(
+            text("DELETE FROM orders WHERE id = :id"), {"id": dropped.id}
+        )
+        await db.session.execute(
+            text("DELETE FROM payments WHERE id = :id"),
+            {"id": orders[10].payments[-1].id},
+        )
+        # переименования меняют подписи во всех датах
+        await db.session.execute(
+            text("UPDATE products SET name = 'renamed product' WHERE id = :id"),
+            {"id": products[0].id},
+        )
+        await db.session.execute(
+            text("UPDATE customers SET email = 'renamed@example.com' WHERE id = :id"),
+            {"id": customers[1].id},
+        )
+        await db.commit()
+        orders.append(
+            add_order(db, rng, customers[0], products, START + timedelta(days=DAYS + 1))
+        )
+        await db.commit()
+
+        days = await maintain(db)
+        assert START + timedelta(days=DAYS + 1) in days
+        assert await db.report_aggregate.take_dirty_dates() == []
+        await assert_matches_full_group_by(db)
+        await assert_rollups_match_daily(db)
+    finally:
+        await db.session.rollback()
+        await execute_script(db, migration.DROP_TRIGGERS_SQL)
+        params = {"start": START, "end": END}
+        seeded = "SELECT id FROM orders WHERE order_date BETWEEN :start AND :end"
+        for table in ("payments", "order_items"):
+            await db.session.execute(
+                text(f"DELETE FROM {table} WHERE order_id IN ({seeded})"), params
+            )
+        await db.session.execute(
+            text("DELETE FROM orders WHERE order_date BETWEEN :start AND :end"), params
+        )
+        for table, (column, _) in DAILY_AGGREGATES.items():
+            await db.session.execute(
+                text(f'DELETE FROM {table} WHERE "{column}" BETWEEN :start AND :end'),
+                params,
+            )
+        for source, (day, *_) in ROLLUP_SOURCES.items():
+            for grain in ROLLUP_GRAINS:
+                await db.session.execute(
+                    text(
+                        f"DELETE FROM {source}_{grain}ly "
+                        f"WHERE {day} BETWEEN :start AND :end"
+                    ),
+                    {"start": PERIODS_FROM, "end": END},
+                )
+        for query in (
+            "DELETE FROM products WHERE supplier_id IN "
+            "(SELECT id FROM suppliers WHERE name = 'maintenance supplier')",
+            "DELETE FROM categories WHERE name LIKE 'maintenance category%'",
+            "DELETE FROM customers WHERE name LIKE 'maintenance customer%'",
+            "DELETE FROM suppliers WHERE name = 'maintenance supplier'",
+        ):
+            await db.session.execute(text(query))
+        await db.commit()
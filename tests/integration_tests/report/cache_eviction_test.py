@@ -0,0 +1,67 @@
+import pytest
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError
+
+from src.config import settings
+from src.init import redis_manager
+from src.utils.report_cache import PINS_KEY, pin_report, store_report
+
+CACHE_KEYS = [
+    "report_cache:bytes",
+    "report_cache:lru",
+    "report_cache:sizes",
+    PINS_KEY,
+]
+
+
+@pytest.fixture()
+async def real_redis(monkeypatch):
+    """EVICT_SCRIPT выполняется настоящим Redis; без него тест пропускается"""
+    client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASS,
+        db=15,
+    )
+    try:
+        await client.ping()
+    except (ConnectionError, OSError):
+        await client.aclose()
+        pytest.skip("Redis недоступен")
+    await client.flushdb()
+    monkeypatch.setattr(redis_manager, "redis", client)
+    yield client
+    await client.flushdb()
+    await client.aclose()
+
+
+async def store(tmp_path, name: str, size: int) -> str:
+    file_path = tmp_path / f"{name}.csv"
+    file_path.write_bytes(name.encode().ljust(size, b"."))
+    return await store_report(name, None, str(file_path), ".csv")
+
+
+async def test_eviction_skips_pinned_and_just_stored(real_redis, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "REPORT_CACHE_MAX_BYTES", 250)
+
+    pinned = await store(tmp_path, "pinned", 100)
+    await pin_report(pinned)
+    old = await store(tmp_path, "old", 100)
+    # новый объект переполняет хранилище: вытесняется самый старый незакреплённый
+    new = await store(tmp_path, "new", 100)
+
+    assert (tmp_path / pinned).exists()
+    assert not (tmp_path / old).exists()
+    assert (tmp_path / new).exists()
+    assert int(await real_redis.get("report_cache:bytes")) == 200
+
+    # объект больше лимита целиком остаётся: его только что сохранили
+    huge = await store(tmp_path, "huge", 1000)
+    assert (tmp_path / huge).exists()
+    assert (tmp_path / pinned).exists()
+    assert not (tmp_path / new).exists()
+    assert await real_redis.zrange("report_cache:lru", 0, -1) == [
+        pinned.encode(),
+        huge.encode(),
+    ]
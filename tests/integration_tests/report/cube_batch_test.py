@@ -0,0 +1,112 @@
+import json
+import os
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete
+
+from src.config import settings
+from src.models.report.report_template import ReportTemplateORM
+from src.models.report.sales_by_product_category_daily import (
+    SalesByProductCategoryDailyORM,
+)
+from src.schemas.report.report_task import ReportTaskAdd, Status
+from src.tasks import report as report_module
+from src.tasks.celery_app import REPORTS_FAST_QUEUE
+from src.tasks.report import ReportService
+from src.utils.report_cube import CUBES, build_cube
+
+START = date(2032, 1, 1)
+DAYS = 60
+PRODUCTS = 3
+
+
+class NoEmail:
+    @staticmethod
+    def delay(**kwargs):
+        pass
+
+
+async def no_scan(*args, **kwargs):
+    raise AssertionError("сводка из куба не должна сканировать агрегаты")
+
+
+@pytest.mark.asyncio
+async def test_fast_summary_is_built_from_cube(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_CUBE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "REPORT_BATCH_WINDOW_MS", 200)
+    monkeypatch.setattr(report_module, "send_report_ready_email_task", NoEmail)
+    monkeypatch.setattr(ReportService, "_shared_scan", no_scan)
+    monkeypatch.setattr(ReportService, "_export_query", no_scan)
+
+    db.session.add_all(
+        SalesByProductCategoryDailyORM(
+            order_date=START + timedelta(days=day),
+            product_id=product_id,
+            product_name=f"product {product_id}",
+            category_id=1,
+            category_name="category 1",
+            total_quantity=1,
+            total_amount=Decimal("10.50"),
+            total_orders=1,
+            total_payments=Decimal("10.50"),
+        )
+        for day in range(DAYS)
+        for product_id in range(1, PRODUCTS + 1)
+    )
+    template = await db.report_template.get_one_or_none(
+        name="sales_by_products_summary"
+    )
+    if template is None:
+        db.session.add(
+            ReportTemplateORM(
+                name="sales_by_products_summary",
+                description="",
+                allowed_roles="manager",
+            )
+        )
+    await db.commit()
+    assert await build_cube(db.product_category_daily, CUBES["products"])
+
+    template = await db.report_template.get_one_or_none(
+        name="sales_by_products_summary"
+    )
+    user = await db.user.get_one_or_none(email="manager@lol.lol")
+    # короче REPORT_BATCH_MAX_DAYS — раньше такой отчёт уходил в общее сканирование
+    task = await db.report_task.add(
+        ReportTaskAdd(
+            user_id=user.id,
+            template_id=template.id,
+            parameters=json.dumps(
+                {
+                    "date_from": START.isoformat(),
+                    "date_to": (START + timedelta(days=DAYS - 1)).isoformat(),
+                }
+            ),
+            queue=REPORTS_FAST_QUEUE,
+        )
+    )
+    await db.commit()
+
+    service = ReportService(db)
+    try:
+        assert await service._batch_view(task) is None
+        await service.make_report_h(task.id)
+
+        db.session.expire_all()
+        finished = await db.report_task.get_one_or_none(id=task.id)
+        assert finished.status == Status.ready
+        assert finished.rows == PRODUCTS
+    finally:
+        finished = await db.report_task.get_one_or_none(id=task.id)
+        if finished.result_file and os.path.exists(finished.result_file):
+            os.remove(finished.result_file)
+        await db.session.execute(
+            delete(SalesByProductCategoryDailyORM).where(
+                SalesByProductCategoryDailyORM.order_date.between(
+                    START, START + timedelta(days=DAYS - 1)
+                )
+            )
+        )
+        await db.commit()
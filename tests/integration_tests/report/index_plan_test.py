@@ -0,0 +1,196 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+START = date(2040, 1, 1)
+END = date(2049, 12, 31)
+WEEK = (date(2045, 3, 1), date(2045, 3, 7))
+YEAR = (date(2045, 1, 1), date(2045, 12, 31))
+
+INDEX_PATHS = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+# Месячная свёртка платежей — 4 способа × 120 месяцев, несколько страниц:
+# планировщик честно читает её целиком, индекс тут дороже. Размер проверяется.
+SMALL_RELATIONS = {"mv_payments_by_method_monthly": 8}
+
+DAYS = "generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day')"
+SEED_DAILY = {
+    "mv_sales_daily": f"""
+        INSERT INTO mv_sales_daily
+        SELECT d::date, 10, 1000, 100, 20, 1000 FROM {DAYS} d
+    """,
+    "mv_sales_by_product_category_daily": f"""
+        INSERT INTO mv_sales_by_product_category_daily
+        SELECT d::date, p, 'product ' || p, p % 20 + 1, 'category ' || (p % 20 + 1),
+               2, 200, 1, 200
+        FROM {DAYS} d, generate_series(1, 100) p
+    """,
+    "mv_sales_by_customer_daily": f"""
+        INSERT INTO mv_sales_by_customer_daily
+        SELECT d::date, c, 'customer ' || c, 'customer' || c || '@example.com',
+               3, 300, 1, 300
+        FROM {DAYS} d, generate_series(1, 100) c
+    """,
+    "mv_payments_by_method_daily": f"""
+        INSERT INTO mv_payments_by_method_daily
+        SELECT d::date, m, 25, 50, 2500, 2500
+        FROM {DAYS} d, unnest(ARRAY['card', 'cash', 'sbp', 'transfer']) m
+    """,
+}
+# свёртка -> (дата, ключи, подписи, метрики)
+ROLLUP_SOURCES = {
+    "mv_sales_by_product_category": (
+        "order_date",
+        ["product_id", "category_id"],
+        ["product_name", "category_name"],
+        ["total_quantity", "total_amount", "total_orders", "total_payments"],
+    ),
+    "mv_sales_by_customer": (
+        "order_date",
+        ["customer_id"],
+        ["customer_name", "customer_email"],
+        ["total_quantity", "total_amount", "total_orders", "total_payments"],
+    ),
+    "mv_payments_by_method": (
+        "payment_date",
+        ["payment_method"],
+        [],
+        ["total_orders", "total_quantity", "total_amount", "total_payments"],
+    ),
+}
+
+
+def rollup_seed(source: str, grain: str) -> str:
+    day, keys, labels, metrics = ROLLUP_SOURCES[source]
+    columns = [f"date_trunc('{grain}', {day})::date", *keys]
+    columns += [f"max({label})" for label in labels]
+    columns += [f"sum({metric})" for metric in metrics]
+    return (
+        f"INSERT INTO {source}_{grain}ly ({day}, {', '.join(keys + labels + metrics)}) "
+        f"SELECT {', '.join(columns)} FROM {source}_daily "
+        f"WHERE {day} >= :start GROUP BY 1, {', '.join(keys)}"
+    )
+
+
+def seeded_tables() -> dict[str, str]:
+    """Таблица -> колонка даты для всех агрегатов, которые читают отчёты"""
+    tables = {"mv_sales_daily": "date"}
+    for source, (day, *_) in ROLLUP_SOURCES.items():
+        for grain in ("daily", "weekly", "monthly"):
+            tables[f"{source}_{grain}"] = day
+    return tables
+
+
+def report_queries(db) -> dict:
+    """Запросы десяти отчётов: неделя по всем сущностям и год по одной"""
+    return {
+        "sales_daily": db.sales_daily.sales_daily_query(*WEEK),
+        "sales_summary": db.sales_daily.sales_summary_query(*WEEK),
+        "product_daily": db.product_category_daily.sales_by_product_daily_query(*WEEK),
+        "product_summary": db.product_category_daily.sales_by_product_summary_query(
+            *WEEK
+        ),
+        "category_daily": db.product_category_daily.sales_by_category_daily_query(
+            *WEEK
+        ),
+        "category_summary": db.product_category_daily.sales_by_category_summary_query(
+            *WEEK
+        ),
+        "customer_daily": db.sales_by_customer_daily.sales_by_customer_daily_query(
+            *WEEK
+        ),
+        "customer_summary": db.sales_by_customer_daily.sales_by_customer_summary_query(
+            *WEEK
+        ),
+        "payments_daily": db.payments.payments_daily_query(*WEEK),
+        "payments_summary": db.payments.payments_summary_query(*WEEK),
+        # сводки за целые месяцы читают месячные свёртки
+        "product_daily_by_id": db.product_category_daily.sales_by_product_daily_query(
+            *YEAR, product_id=7
+        ),
+        "product_summary_by_id": (
+            db.product_category_daily.sales_by_product_summary_query(
+                *YEAR, product_id=7
+            )
+        ),
+        "category_daily_by_id": (
+            db.product_category_daily.sales_by_category_daily_query(
+                *YEAR, category_id=3
+            )
+        ),
+        "category_summary_by_id": (
+            db.product_category_daily.sales_by_category_summary_query(
+                *YEAR, category_id=3
+            )
+        ),
+        "customer_daily_by_id": (
+            db.sales_by_customer_daily.sales_by_customer_daily_query(
+                *YEAR, customer_id=42
+            )
+        ),
+        "customer_summary_by_id": (
+            db.sales_by_customer_daily.sales_by_customer_summary_query(
+                *YEAR, customer_id=42
+            )
+        ),
+        "payments_daily_by_method": db.payments.payments_daily_query(
+            *YEAR, payment_method="card"
+        ),
+        "payments_summary_by_method": db.payments.payments_summary_query(
+            *YEAR, payment_method="card"
+        ),
+    }
+
+
+def relation_scans(plan: dict) -> list[dict]:
+    nodes, scans = [plan], []
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get("Plans", []))
+        if "Relation Name" in node:
+            scans.append(node)
+    return scans
+
+
+@pytest.mark.asyncio
+async def test_report_queries_use_indexes(db):
+    params = {"start": START, "end": END}
+    for query in SEED_DAILY.values():
+        await db.session.execute(text(query), params)
+    for source in ROLLUP_SOURCES:
+        for grain in ("week", "month"):
+            await db.session.execute(text(rollup_seed(source, grain)), params)
+    await db.commit()
+    for table in seeded_tables():
+        await db.session.execute(text(f"ANALYZE {table}"))
+    await db.commit()
+
+    try:
+        for table, max_pages in SMALL_RELATIONS.items():
+            pages = (
+                await db.session.execute(
+                    text("SELECT relpages FROM pg_class WHERE relname = :table"),
+                    {"table": table},
+                )
+            ).scalar_one()
+            assert pages <= max_pages, (table, pages)
+
+        sequential = {}
+        for name, query in report_queries(db).items():
+            scans = relation_scans(await db.sales_daily.explain(query))
+            assert scans, name
+            slow = [
+                f"{scan['Node Type']} on {scan['Relation Name']}"
+                for scan in scans
+                if scan["Node Type"] not in INDEX_PATHS
+                and scan["Relation Name"] not in SMALL_RELATIONS
+            ]
+            if slow:
+                sequential[name] = slow
+        assert not sequential, sequential
+    finally:
+        for table, day in seeded_tables().items():
+            await db.session.execute(
+                text(f'DELETE FROM {table} WHERE "{day}" >= :start'), params
+            )
+        await db.commit()
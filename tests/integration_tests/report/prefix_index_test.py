@@ -0,0 +1,75 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.config import settings
+from src.models.report.sales_by_product_category_daily import (
+    SalesByProductCategoryDailyORM,
+)
+from src.schemas.report.sales_by_product_category_daily import SalesByProductSummary
+from src.utils.report_cube import CUBES, build_cube, cube_summary
+
+START = date(2031, 1, 1)
+PRODUCTS = 6
+
+
+def random_rows(date_from: date, days: int) -> list[SalesByProductCategoryDailyORM]:
+    rows = []
+    for day in range(days):
+        for product_id in range(1, PRODUCTS + 1):
+            if random.random() < 0.3:
+                continue
+            amount = Decimal(random.randint(1, 10**6)) / 100
+            rows.append(
+                SalesByProductCategoryDailyORM(
+                    order_date=date_from + timedelta(days=day),
+                    product_id=product_id,
+                    product_name=f"product {product_id}",
+                    category_id=product_id % 2 + 1,
+                    category_name=f"category {product_id % 2 + 1}",
+                    total_quantity=random.randint(1, 50),
+                    total_amount=amount,
+                    total_orders=random.randint(1, 10),
+                    total_payments=amount,
+                )
+            )
+    return rows
+
+
+async def assert_matches_sql(db, date_to: date, checks: int = 50):
+    for _ in range(checks):
+        date_from = START + timedelta(days=random.randint(-10, (date_to - START).days))
+        range_to = date_from + timedelta(days=random.randint(0, 120))
+        product_id = random.choice([None, random.randint(1, PRODUCTS)])
+
+        expected = await db.product_category_daily.get_sales_by_product_summary(
+            date_from, range_to, product_id
+        )
+        columns, rows = cube_summary("products", date_from, range_to, product_id)
+        actual = [SalesByProductSummary(**dict(zip(columns, row))) for row in rows]
+
+        def by_product(items):
+            return {item.product_id: item.model_dump() for item in items}
+
+        assert by_product(actual) == by_product(expected), (date_from, range_to)
+
+
+@pytest.mark.asyncio
+async def test_prefix_index_matches_sql(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_CUBE_DIR", str(tmp_path))
+    random.seed(19)
+
+    db.session.add_all(random_rows(START, 90))
+    await db.session.commit()
+    assert await build_cube(db.product_category_daily, CUBES["products"])
+    await assert_matches_sql(db, START + timedelta(days=90))
+
+    # дописанные дни: индекс продлевается с первого изменённого месяца
+    db.session.add_all(random_rows(START + timedelta(days=90), 45))
+    await db.session.commit()
+    assert await build_cube(
+        db.product_category_daily, CUBES["products"], ["2031-04", "2031-05"]
+    )
+    await assert_matches_sql(db, START + timedelta(days=135))
@@ -0,0 +1,93 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError
+
+from src.config import settings
+from src.exceptions import ReportQuotaExceededException
+from src.init import redis_manager
+from src.utils import report_quota
+from src.utils.report_quota import (
+    PENDING_KEY,
+    _active_key,
+    _bucket_key,
+    admit_report,
+    release_report,
+)
+
+USER_ID = "quota-script-test"
+TASKS = ["quota-task-1", "quota-task-2", "quota-task-3"]
+
+
+@pytest.fixture()
+async def real_redis(monkeypatch):
+    """ADMIT_SCRIPT выполняется настоящим Redis; без него тест пропускается"""
+    client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASS,
+    )
+    try:
+        await client.ping()
+    except (ConnectionError, OSError):
+        await client.aclose()
+        pytest.skip("Redis недоступен")
+    monkeypatch.setattr(redis_manager, "redis", client)
+    yield client
+    await client.delete(_bucket_key(USER_ID), _active_key(USER_ID))
+    await client.zrem(PENDING_KEY, *TASKS)
+    await client.aclose()
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(report_quota, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(autouse=True)
+def small_quota(monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_QUOTA_RATE_PER_MINUTE", 60)
+    monkeypatch.setattr(settings, "REPORT_QUOTA_BURST", 3)
+    monkeypatch.setattr(settings, "REPORT_QUOTA_MAX_ACTIVE_PER_USER", 2)
+
+
+async def test_admit_script_limits_active_tasks_and_tokens(real_redis, clock):
+    assert await admit_report(USER_ID, None, TASKS[0]) == 1
+    assert await admit_report(USER_ID, None, TASKS[1]) == 2
+
+    # лимит активных задач: ожидание по глубине общей очереди
+    with pytest.raises(ReportQuotaExceededException) as error:
+        await admit_report(USER_ID, None, TASKS[2])
+    assert error.value.retry_after >= 1
+    assert await real_redis.zcard(_active_key(USER_ID)) == 2
+
+    await release_report(USER_ID, TASKS[0])
+    # последний токен уходит на готовый результат из кэша
+    assert await admit_report(USER_ID, None, None) == 1
+
+    # токены кончились: ждать ровно до следующего при скорости 1 в секунду
+    with pytest.raises(ReportQuotaExceededException) as error:
+        await admit_report(USER_ID, None, TASKS[2])
+    assert error.value.retry_after == 1
+
+    clock[0] += 1
+    assert await admit_report(USER_ID, None, TASKS[2]) == 2
+
+
+async def test_admit_script_refills_up_to_burst(real_redis, clock):
+    for _ in range(3):
+        await admit_report(USER_ID, None, None)
+    with pytest.raises(ReportQuotaExceededException):
+        await admit_report(USER_ID, None, None)
+
+    # простой копит не больше burst токенов
+    clock[0] += 3600
+    for _ in range(3):
+        await admit_report(USER_ID, None, None)
+    with pytest.raises(ReportQuotaExceededException) as error:
+        await admit_report(USER_ID, None, None)
+    assert error.value.retry_after == 1
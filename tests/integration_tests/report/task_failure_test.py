@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from src.config import settings
+from src.schemas.report.report_task import ReportTaskAdd, Status
+from src.tasks import report as report_module
+from src.tasks.report import ReportService
+
+MANAGER_EMAIL = "manager@lol.lol"
+
+
+@pytest.fixture()
+def released(monkeypatch):
+    calls = []
+
+    async def release_report(user_id, task_id):
+        calls.append(task_id)
+
+    monkeypatch.setattr(report_module, "release_report", release_report)
+    return calls
+
+
+async def add_task(db, parameters: dict):
+    user = await db.user.get_one_or_none(email=MANAGER_EMAIL)
+    template = await db.report_template.get_one_or_none(name="daily_sales")
+    task = await db.report_task.add(
+        ReportTaskAdd(
+            user_id=user.id,
+            template_id=template.id,
+            parameters=json.dumps(parameters),
+        )
+    )
+    await db.commit()
+    return task
+
+
+@pytest.mark.asyncio
+async def test_invalid_parameters_fail_task_and_release_quota(db, released):
+    task = await add_task(db, {"date_from": "не дата", "date_to": "2030-01-01"})
+
+    await ReportService(db).make_report_h(task.id)
+
+    db.session.expire_all()
+    failed = await db.report_task.get_one_or_none(id=task.id)
+    assert failed.status == Status.error
+    assert "date_from" in failed.error_message
+    assert released == [str(task.id)]
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_fails_task_and_releases_quota(
+    db, released, monkeypatch
+):
+    task = await add_task(db, {"date_from": "2030-01-01", "date_to": "2030-01-07"})
+
+    async def broken_build(*args, **kwargs):
+        raise RuntimeError("диск переполнен")
+
+    monkeypatch.setattr(ReportService, "_build_report", broken_build)
+    monkeypatch.setattr(settings, "REPORT_BATCH_WINDOW_MS", 0)
+
+    await ReportService(db).make_report_h(task.id)
+
+    db.session.expire_all()
+    failed = await db.report_task.get_one_or_none(id=task.id)
+    assert failed.status == Status.error
+    assert failed.error_message == "диск переполнен"
+    assert released == [str(task.id)]
+
+
+@pytest.mark.asyncio
+async def test_finish_with_evicted_file_fails_task(db, released, tmp_path):
+    task = await add_task(db, {"date_from": "2030-01-01", "date_to": "2030-01-07"})
+
+    await ReportService(db)._finish_task(
+        task.id, "daily_sales", str(tmp_path / "evicted.csv"), rows=1, notify=False
+    )
+
+    db.session.expire_all()
+    failed = await db.report_task.get_one_or_none(id=task.id)
+    assert failed.status == Status.error
+    assert "вытеснен" in failed.error_message
+    assert str(task.id) in released
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+
+import pytest
+from redis.exceptions import ConnectionError
+from sqlalchemy import delete
+
+from src.init import redis_manager
+from src.models.report.report_view_state import ReportViewStateORM
+from src.schemas.report.report_task import ReportTaskAdd
+from src.tasks.report import ReportService
+from src.utils.view_state import get_view_state
+
+REFRESHED_AT = datetime(2030, 5, 17, 3, 0, tzinfo=timezone.utc)
+MANAGER = {"email": "manager@lol.lol", "password": "Manager1234"}
+
+
+class FailingRedis:
+    async def hget(self, *args, **kwargs):
+        raise ConnectionError("Redis недоступен")
+
+
+@pytest.fixture()
+async def sales_view_state(db):
+    db.session.add(
+        ReportViewStateORM(
+            view_name="mv_sales_daily",
+            generation=7,
+            refreshed_at=REFRESHED_AT,
+            source_max_at=REFRESHED_AT,
+            row_count=0,
+        )
+    )
+    await db.commit()
+    yield
+    await db.session.execute(
+        delete(ReportViewStateORM).where(
+            ReportViewStateORM.view_name == "mv_sales_daily"
+        )
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_view_state_read_from_db_when_redis_fails(
+    db, sales_view_state, monkeypatch
+):
+    monkeypatch.setattr(redis_manager, "redis", FailingRedis())
+
+    state = await get_view_state("mv_sales_daily", db.session)
+
+    assert state.generation == 7
+    assert state.refreshed_at == REFRESHED_AT
+
+
+@pytest.mark.asyncio
+async def test_status_and_download_expose_data_generation(
+    db, sales_view_state, authenticated_manager, tmp_path
+):
+    await authenticated_manager.post("/auth/login", json=MANAGER)
+    user = await db.user.get_one_or_none(email=MANAGER["email"])
+    template = await db.report_template.get_one_or_none(name="daily_sales")
+    task = await db.report_task.add(
+        ReportTaskAdd(user_id=user.id, template_id=template.id)
+    )
+    await db.commit()
+    file_path = tmp_path / "report.csv"
+    file_path.write_text("date;total_orders\n2030-05-16;1\n", encoding="utf-8")
+
+    await ReportService(db)._finish_task(
+        task.id, "daily_sales", str(file_path), rows=1, notify=False
+    )
+
+    status = await authenticated_manager.get(f"/report/status/{task.id}")
+    assert status.status_code == 200
+    assert status.json()["status"] == "ready"
+    assert status.json()["data_generation"] == 7
+    assert datetime.fromisoformat(status.json()["data_as_of"]) == REFRESHED_AT
+
+    download = await authenticated_manager.get(f"/report/download/{task.id}")
+    assert download.status_code == 200
+    assert download.headers["X-Data-Generation"] == "7"
+    assert datetime.fromisoformat(download.headers["X-Data-As-Of"]) == REFRESHED_AT
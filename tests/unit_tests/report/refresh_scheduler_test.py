@@ -0,0 +1,110 @@
+import pytest
+
+from src.config import settings
+from src.utils.refresh_scheduler import decide_refresh, observe_writes
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_REFRESH_MIN_INTERVAL_SECONDS", 60)
+    monkeypatch.setattr(settings, "REPORT_REFRESH_MAX_STALENESS_SECONDS", 900)
+    monkeypatch.setattr(settings, "REPORT_REFRESH_DEBOUNCE_SECONDS", 60)
+    monkeypatch.setattr(settings, "REPORT_REFRESH_WRITE_THRESHOLD", 5000)
+
+
+@pytest.mark.parametrize(
+    "state, has_dirty, expected",
+    [
+        # изменений нет
+        ({}, False, "idle"),
+        ({"pending_writes": 0, "refreshed_at": NOW - 10_000}, False, "idle"),
+        # недавнее обновление сдерживает даже большой объём
+        (
+            {"refreshed_at": NOW - 59, "pending_writes": 10**6, "pending_since": 0},
+            True,
+            "min_interval",
+        ),
+        # устаревание важнее идущих записей
+        (
+            {
+                "refreshed_at": NOW - 60,
+                "pending_since": NOW - 900,
+                "pending_writes": 1,
+                "last_write_at": NOW,
+            },
+            True,
+            "max_staleness",
+        ),
+        (
+            {
+                "refreshed_at": NOW - 60,
+                "pending_since": NOW - 899,
+                "pending_writes": 5000,
+                "last_write_at": NOW,
+            },
+            False,
+            "volume",
+        ),
+        (
+            {
+                "refreshed_at": NOW - 600,
+                "pending_since": NOW - 300,
+                "pending_writes": 4999,
+                "last_write_at": NOW - 60,
+            },
+            True,
+            "settled",
+        ),
+        (
+            {
+                "refreshed_at": NOW - 600,
+                "pending_since": NOW - 300,
+                "pending_writes": 4999,
+                "last_write_at": NOW - 59,
+            },
+            True,
+            "debounce",
+        ),
+        # даты помечены триггером, а счётчик записей ещё не видел изменений
+        ({"refreshed_at": NOW - 600}, True, "settled"),
+    ],
+)
+def test_decide_refresh(state, has_dirty, expected):
+    assert decide_refresh(state, has_dirty, NOW) == expected
+
+
+def test_observe_writes_accumulates_delta():
+    state = observe_writes({}, 100, NOW)
+    assert state == {"writes_total": 100}
+
+    state = observe_writes(state, 100, NOW + 30)
+    assert "pending_writes" not in state
+
+    state = observe_writes(state, 350, NOW + 60)
+    state = observe_writes(state, 400, NOW + 90)
+    assert state["pending_writes"] == 300
+    assert state["last_write_at"] == NOW + 90
+
+
+def test_observe_writes_after_counter_reset():
+    state = {"writes_total": 10_000, "pending_writes": 10, "last_write_at": NOW}
+
+    state = observe_writes(state, 40, NOW + 30)
+
+    assert state["writes_total"] == 40
+    assert state["pending_writes"] == 50
+    assert state["last_write_at"] == NOW + 30
+
+
+def test_volume_reached_while_writes_continue():
+    state = {"refreshed_at": NOW - 600, "writes_total": 0}
+    for second in range(30, 300, 30):
+        state = observe_writes(state, second * 20, NOW + second)
+        state.setdefault("pending_since", NOW)
+        decision = decide_refresh(state, True, NOW + second)
+        if decision != "debounce":
+            break
+    assert decision == "volume"
+    assert state["pending_writes"] >= 5000
@@ -0,0 +1,58 @@
+import pytest
+
+from src.init import redis_manager
+from src.tasks.report import ReportService
+from src.utils.report_cache import store_report
+from src.utils.report_chunks import SUMMARY_CHUNK_EXTENSION
+
+
+class StoreRedis:
+    async def set(self, *args, **kwargs):
+        return True
+
+    async def get(self, *args, **kwargs):
+        return None
+
+    async def hset(self, *args, **kwargs):
+        return 1
+
+    async def incrby(self, *args, **kwargs):
+        return 0
+
+    async def sadd(self, *args, **kwargs):
+        return 1
+
+    async def zadd(self, *args, **kwargs):
+        return 1
+
+    async def eval(self, *args, **kwargs):
+        return []
+
+
+@pytest.mark.parametrize(
+    "file_name, extension, expected",
+    [
+        # имя части задачи несёт суффиксы итогового файла
+        ("task.v2.csv.gz.part0", ReportService._report_extension("csv", None), ".csv"),
+        ("task.csv.chunk1", SUMMARY_CHUNK_EXTENSION, ".pickle"),
+        (
+            "task.csv.gz",
+            ReportService._report_extension("csv", "gzip"),
+            ".csv.gz",
+        ),
+        ("task", ReportService._report_extension("parquet", None), ".parquet"),
+    ],
+)
+async def test_store_report_extension_from_artifact_format(
+    tmp_path, monkeypatch, file_name, extension, expected
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(redis_manager, "redis", StoreRedis())
+    file_path = tmp_path / file_name
+    file_path.write_bytes(file_name.encode())
+
+    object_path = await store_report("key", None, str(file_path), extension)
+
+    assert object_path.endswith(expected)
+    assert not file_path.exists()
+    assert (tmp_path / object_path).read_bytes() == file_name.encode()
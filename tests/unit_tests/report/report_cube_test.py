@@ -0,0 +1,40 @@
+from datetime import date
+from decimal import Decimal
+
+from src.config import settings
+from src.utils.report_cube import CUBES, cube_summary, write_cube
+
+
+def product_row(day: int, product_id: int, name: str, amount: int):
+    # строка cube_query: день, ключ, подписи, метрики в масштабе куба, число строк
+    return (
+        date(2031, 1, day),
+        product_id,
+        name,
+        1,
+        amount * 10**4,
+        1,
+        amount * 10**4,
+        1,
+    )
+
+
+def test_renamed_entity_stays_separate_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_CUBE_DIR", str(tmp_path))
+    rows = [
+        product_row(1, 1, "старое имя", 10),
+        product_row(1, 2, "другой", 5),
+        product_row(2, 1, "новое имя", 20),
+    ]
+    assert write_cube(CUBES["products"], rows)
+
+    columns, result = cube_summary("products", date(2031, 1, 1), date(2031, 1, 2), 1)
+    summary = [dict(zip(columns, row)) for row in result]
+
+    # как GROUP BY (product_id, product_name) в SQL-сводке
+    assert [(item["product_name"], item["total_amount"]) for item in summary] == [
+        ("новое имя", Decimal(20)),
+        ("старое имя", Decimal(10)),
+    ]
+    _, result = cube_summary("products", date(2031, 1, 2), date(2031, 1, 2))
+    assert [row[:2] for row in result] == [(1, "новое имя")]
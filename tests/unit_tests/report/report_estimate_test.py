@@ -0,0 +1,45 @@
+from src.repositories.base import BaseRepository
+from src.utils.report_estimate import plan_estimate
+
+# Limit -> Sort -> Hash Join (Seq Scan, Hash -> Index Scan)
+PLAN = {
+    "Node Type": "Limit",
+    "Plan Rows": 100,
+    "Plan Width": 48,
+    "Plans": [
+        {
+            "Node Type": "Sort",
+            "Plan Rows": 5000,
+            "Plans": [
+                {
+                    "Node Type": "Hash Join",
+                    "Plan Rows": 5000,
+                    "Plans": [
+                        {"Node Type": "Seq Scan", "Plan Rows": 120000},
+                        {
+                            "Node Type": "Hash",
+                            "Plan Rows": 30,
+                            "Plans": [{"Node Type": "Index Scan", "Plan Rows": 30}],
+                        },
+                    ],
+                }
+            ],
+        }
+    ],
+}
+
+
+def test_plan_estimate_reads_root_and_largest_node():
+    assert plan_estimate(PLAN) == (100, 120000, 48)
+    assert plan_estimate({"Node Type": "Result"}) == (0, 0, 0)
+
+
+async def test_estimate_rows_uses_plan_estimate(monkeypatch):
+    repository = BaseRepository(session=None)
+
+    async def explain(query):
+        return PLAN
+
+    monkeypatch.setattr(repository, "explain", explain)
+
+    assert await repository.estimate_rows("query") == 120000
@@ -0,0 +1,73 @@
+import pytest
+
+from src.config import settings
+from src.exceptions import ReportQuotaExceededException
+from src.init import redis_manager
+from src.utils.report_quota import _retry_after_for_depth, admit_report
+
+
+class ScriptRedis:
+    """Отдаёт заданный ответ ADMIT_SCRIPT и запоминает аргументы вызова"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.args = None
+
+    async def eval(self, script, numkeys, *args):
+        self.args = args
+        return self.reply
+
+
+@pytest.fixture()
+def script_redis(monkeypatch):
+    def install(reply) -> ScriptRedis:
+        redis = ScriptRedis(reply)
+        monkeypatch.setattr(redis_manager, "redis", redis)
+        return redis
+
+    return install
+
+
+async def test_admitted_returns_active_tasks(script_redis):
+    redis = script_redis([1, 3])
+
+    assert await admit_report(7, "admin", "task-1") == 3
+
+    keys, argv = redis.args[:3], redis.args[3:]
+    assert keys == (
+        "report_quota:bucket:7",
+        "report_quota:active:7",
+        "report_quota:pending",
+    )
+    multiplier = settings.REPORT_QUOTA_ROLE_MULTIPLIER["admin"]
+    assert argv[1] == settings.REPORT_QUOTA_RATE_PER_MINUTE * multiplier / 60
+    assert argv[2] == settings.REPORT_QUOTA_BURST * multiplier
+    assert argv[3] == int(settings.REPORT_QUOTA_MAX_ACTIVE_PER_USER * multiplier)
+    assert argv[5] == "task-1"
+
+
+async def test_cached_result_spends_only_token(script_redis):
+    redis = script_redis([1, 0])
+
+    assert await admit_report(7, None, None) == 0
+    assert redis.args[-1] == ""
+
+
+async def test_out_of_tokens_retries_after_refill(script_redis):
+    script_redis([0, 7])
+
+    with pytest.raises(ReportQuotaExceededException) as error:
+        await admit_report(7, None, "task-1")
+
+    assert error.value.retry_after == 7
+
+
+@pytest.mark.parametrize("depth", [0, 1, 50, 10_000])
+async def test_active_limit_retries_by_queue_depth(script_redis, depth):
+    script_redis([-1, depth])
+
+    with pytest.raises(ReportQuotaExceededException) as error:
+        await admit_report(7, None, "task-1")
+
+    assert error.value.retry_after == _retry_after_for_depth(depth)
+    assert error.value.retry_after >= 1
@@ -0,0 +1,94 @@
+import csv
+import gzip
+from decimal import Decimal
+
+import pytest
+
+from src.utils.report_shards import SHARD_WEIGHT_COLUMN, merge_part_files, reaggregate
+
+HEADER = ["date", "product_name", "total_amount"]
+PARTS = [
+    [["2030-01-01", "чай", "10.00"], ["2030-01-02", "кофе; молотый", "20.50"]],
+    [["2030-01-03", 'сок "яблочный"', "5.00"]],
+    [["2030-01-04", "чай", "7.25"], ["2030-01-05", "вода", "1.00"]],
+]
+
+
+def write_copy_part(path, rows):
+    """Часть в стиле COPY ... CSV: строки через \\n"""
+    with open(path, "w", newline="", encoding="utf-8") as part:
+        csv.writer(part, delimiter=";", lineterminator="\n").writerows([HEADER, *rows])
+
+
+def write_csv_part(path, rows):
+    """Часть, записанная csv-модулем с настройками по умолчанию: \\r\\n"""
+    with open(path, "w", newline="", encoding="utf-8") as part:
+        csv.writer(part, delimiter=";").writerows([HEADER, *rows])
+
+
+def read_output(path, compression) -> str:
+    opener = gzip.open if compression == "gzip" else open
+    with opener(path, "rb") as file:
+        return file.read().decode("utf-8")
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+@pytest.mark.parametrize("limit", [None, 3])
+@pytest.mark.parametrize(
+    "writers, ending",
+    [
+        ((write_copy_part, write_csv_part, write_copy_part), "\n"),
+        ((write_csv_part, write_copy_part, write_csv_part), "\r\n"),
+    ],
+)
+def test_merge_mixed_part_styles(tmp_path, writers, ending, limit, compression):
+    part_paths = []
+    for i, (write, rows) in enumerate(zip(writers, PARTS)):
+        part_paths.append(str(tmp_path / f"report.csv.part{i}"))
+        write(part_paths[-1], rows)
+    file_path = str(tmp_path / "report.csv")
+
+    merge_part_files(part_paths, file_path, limit, compression)
+
+    content = read_output(file_path, compression)
+    expected = [row for rows in PARTS for row in rows][:limit]
+    assert content.count(";".join(HEADER)) == 1
+    assert content.count("\n") == len(expected) + 1
+    assert content.count(ending) == len(expected) + 1
+    if ending == "\n":
+        assert "\r" not in content
+    reader = csv.reader(content.splitlines(keepends=True), delimiter=";")
+    assert list(reader) == [HEADER, *expected]
+
+
+def test_merge_skips_empty_parts(tmp_path):
+    empty = tmp_path / "report.csv.part0"
+    empty.write_text("", encoding="utf-8")
+    part = str(tmp_path / "report.csv.part1")
+    write_csv_part(part, PARTS[0])
+    file_path = str(tmp_path / "report.csv")
+
+    merge_part_files([str(empty), part], file_path)
+
+    content = read_output(file_path, None)
+    assert content.startswith(";".join(HEADER) + "\r\n")
+    assert content.count("\r\n") == len(PARTS[0]) + 1
+
+
+def test_reaggregate_sums_metrics_and_weights_averages():
+    columns = ["product_id", "total_amount", "avg_check", "total_orders"]
+    columns.append(SHARD_WEIGHT_COLUMN)
+    rows = [
+        (1, Decimal("100"), Decimal("10"), 10, 1),
+        (2, Decimal("50"), Decimal("5"), 10, 2),
+        (1, Decimal("300"), Decimal("30"), 10, 3),
+        (3, None, None, None, 1),
+    ]
+
+    out_columns, result = reaggregate(columns, rows, "total_amount", limit=2)
+
+    assert out_columns == columns[:-1]
+    assert result == [
+        (1, Decimal("400"), Decimal("25"), 20),
+        (2, Decimal("50"), Decimal("5"), 10),
+    ]
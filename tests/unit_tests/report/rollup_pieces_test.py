@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from itertools import product
+
+import pytest
+
+from src.utils.report_rollup import ALLOWED_GRAINS, _month_end, rollup_pieces
+
+RANGES = [
+    (date(2024, 3, 13), date(2024, 3, 13)),  # один день
+    (date(2024, 2, 1), date(2024, 2, 29)),  # февраль високосного года
+    (date(2023, 2, 1), date(2023, 2, 28)),
+    (date(2024, 2, 1), date(2024, 2, 28)),  # без последнего дня февраля
+    (date(2024, 1, 15), date(2024, 3, 10)),  # через две границы месяца
+    (date(2024, 3, 4), date(2024, 3, 20)),  # конец в середине недели
+    (date(2023, 12, 25), date(2024, 1, 31)),  # через границу года
+    (date(2023, 11, 29), date(2024, 4, 3)),
+    (date(2024, 1, 1), date(2024, 12, 31)),
+]
+
+
+@pytest.mark.parametrize(
+    "date_from, date_to, granularity",
+    [(*dates, granularity) for dates, granularity in product(RANGES, ALLOWED_GRAINS)],
+)
+def test_pieces_tile_range(date_from, date_to, granularity):
+    pieces = rollup_pieces(date_from, date_to, granularity)
+
+    assert pieces[0][1] == date_from
+    assert pieces[-1][2] == date_to
+    for (grain, start, end), following in zip(pieces, pieces[1:] + [None]):
+        assert start <= end
+        assert grain == "day" or grain in ALLOWED_GRAINS[granularity]
+        if grain == "month":
+            assert start.day == 1 and end == _month_end(end)
+        if grain == "week":
+            assert start.weekday() == 0 and (end - start).days % 7 == 6
+        if grain == "week" and granularity in ("month", "quarter"):
+            # недели сводки по месяцам не переходят через границу месяца
+            assert (start.year, start.month) == (end.year, end.month)
+        if following is not None:
+            # без пропусков и перекрытий, соседние куски одной свёртки склеены
+            assert following[1] == end + timedelta(days=1)
+            assert following[0] != grain
+
+
+@pytest.mark.parametrize(
+    "date_from, date_to, granularity, expected",
+    [
+        (
+            date(2024, 3, 13),
+            date(2024, 3, 13),
+            None,
+            [("day", date(2024, 3, 13), date(2024, 3, 13))],
+        ),
+        (
+            date(2024, 2, 1),
+            date(2024, 2, 29),
+            None,
+            [("month", date(2024, 2, 1), date(2024, 2, 29))],
+        ),
+        (
+            date(2024, 2, 1),
+            date(2024, 2, 28),
+            None,
+            [
+                ("day", date(2024, 2, 1), date(2024, 2, 4)),
+                ("week", date(2024, 2, 5), date(2024, 2, 25)),
+                ("day", date(2024, 2, 26), date(2024, 2, 28)),
+            ],
+        ),
+        (
+            date(2024, 1, 15),
+            date(2024, 3, 10),
+            None,
+            [
+                ("week", date(2024, 1, 15), date(2024, 1, 28)),
+                ("day", date(2024, 1, 29), date(2024, 1, 31)),
+                ("month", date(2024, 2, 1), date(2024, 2, 29)),
+                ("day", date(2024, 3, 1), date(2024, 3, 3)),
+                ("week", date(2024, 3, 4), date(2024, 3, 10)),
+            ],
+        ),
+        (
+            date(2024, 3, 4),
+            date(2024, 3, 20),
+            None,
+            [
+                ("week", date(2024, 3, 4), date(2024, 3, 17)),
+                ("day", date(2024, 3, 18), date(2024, 3, 20)),
+            ],
+        ),
+        (
+            date(2023, 12, 25),
+            date(2024, 1, 31),
+            None,
+            [
+                ("week", date(2023, 12, 25), date(2023, 12, 31)),
+                ("month", date(2024, 1, 1), date(2024, 1, 31)),
+            ],
+        ),
+        (
+            date(2024, 1, 1),
+            date(2024, 2, 29),
+            "week",
+            [
+                ("week", date(2024, 1, 1), date(2024, 2, 25)),
+                ("day", date(2024, 2, 26), date(2024, 2, 29)),
+            ],
+        ),
+        (
+            date(2024, 1, 1),
+            date(2024, 3, 31),
+            "day",
+            [("day", date(2024, 1, 1), date(2024, 3, 31))],
+        ),
+        (
+            date(2024, 1, 1),
+            date(2024, 6, 30),
+            "quarter",
+            [("month", date(2024, 1, 1), date(2024, 6, 30))],
+        ),
+    ],
+)
+def test_pieces_examples(date_from, date_to, granularity, expected):
+    assert rollup_pieces(date_from, date_to, granularity) == expected